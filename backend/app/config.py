@@ -13,6 +13,7 @@ import os
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./photo_contour.db"
+    ASYNC_DATABASE_URL: str = ""   # empty: DATABASE_URL with its async driver (aiosqlite / asyncpg)
     
     # Project paths
     UPLOAD_DIR: str = "./static/uploads"
@@ -28,6 +29,90 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     
+    # Detection backend: "http" (YOLO microservice), "inprocess" (load the
+    # model inside the API worker) or "stub" (deterministic fake, for tests)
+    DETECTION_BACKEND: str = "http"
+    YOLO_SERVICE_URL: str = "http://localhost:8002/detect"
+    YOLO_SERVICE_URLS: List[str] = []          # several nodes; overrides YOLO_SERVICE_URL
+    YOLO_HEALTH_INTERVAL_S: float = 5.0        # active /ready polling (multi-node only)
+    YOLO_EJECT_SECONDS: float = 30.0           # cool-down for a failing / slow node
+    YOLO_EJECT_FAILURES: int = 3               # consecutive errors before ejection
+    YOLO_EJECT_SLOW_FACTOR: float = 3.0        # EWMA latency vs. peer median before ejection
+    YOLO_SERVICE_DIR: str = "./yolo_service"   # where "inprocess" imports yolo_app from
+    STUB_DETECTION_OBJECTS: int = 3
+    STUB_DETECTION_POINTS: int = 200
+    STUB_DETECTION_LATENCY_MS: float = 0.0
+    
+    YOLO_TIMEOUT_S: float = 30.0
+    YOLO_HEDGE_AFTER_MS: float = 0.0           # >0: send a backup request to another node after this delay
+    
+    # Detection admission control
+    DETECTION_MAX_CONCURRENCY: int = 4         # detections running at once
+    DETECTION_MAX_QUEUE: int = 16              # callers allowed to wait; beyond that -> 429
+    DETECTION_QUEUE_TIMEOUT_S: float = 10.0    # max wait for a slot; then -> 503
+    DETECTION_INTERACTIVE_RESERVE: int = 1     # slots background (bulk) work can never take
+    BREAKER_FAILURE_THRESHOLD: int = 5         # consecutive YOLO errors/timeouts before opening
+    BREAKER_RESET_S: float = 15.0              # open -> half-open cool-down
+    
+    # Eager detection: detect in the background right after upload
+    EAGER_DETECTION: bool = True
+    DETECTION_WORKERS: int = 1                 # background detection threads
+    DETECTION_BACKLOG: int = 100               # queued background jobs before eager work is dropped
+    
+    # Bulk upload (POST /images/bulk)
+    BULK_MAX_FILES: int = 5000                 # files (or zip entries) per request
+    BULK_MAX_FILE_MB: float = 50.0             # larger entries are rejected unread
+    BULK_QUALITY_WORKERS: int = 0              # quality-check processes (0 = CPU count)
+    
+    # Bulk detection (POST /hotspots/detect/bulk)
+    BULK_DETECT_CONCURRENCY: int = 2           # default images in flight per request
+    BULK_DETECT_MAX_CONCURRENCY: int = 4       # cap on the caller's `concurrency`
+    BULK_DETECT_SLOT_TIMEOUT_S: float = 300.0  # max wait in the background lane per image or video; then -> 503
+    
+    # Videos: keyframe segmentation + optical-flow tracking in the YOLO service
+    VIDEO_MAX_MB: float = 200.0
+    VIDEO_TIMEOUT_S: float = 600.0             # one /detect-video call
+    VIDEO_KEYFRAME_INTERVAL: int = 10          # default: full detection every N processed frames
+    VIDEO_SVG_MAX_POINTS: int = 64             # contour points per animated overlay path
+    
+    # HTTP backend - how images reach the YOLO service:
+    #   "path" - send the file path, the service reads + decodes it (works remotely)
+    #   "shm"  - decode + pre-resize here and hand over a shared-memory array
+    #            (co-located services only; falls back to "path" if unavailable)
+    YOLO_TRANSPORT: str = "path"
+    YOLO_SHM_MAX_SIDE: int = 1280   # long side of the pre-resized shared array
+    
+    # Response compression (gzip, or brotli if the package is installed)
+    COMPRESSION_MIN_SIZE: int = 1024           # bytes; smaller responses go out as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    
+    # SVG renders
+    SVG_RENDER_CACHE_SIZE: int = 128           # rendered documents kept (with compressed copies)
+    SVG_RENDER_CACHE_MAX_MB: float = 256.0     # total size of those documents and copies
+    SVG_PRECOMPRESS_LEVEL: int = 9             # cached once, so spend more CPU on ratio
+    SVG_PATH_PRECISION: int = 1                # decimals in pixel space (0 = integers)
+    SVG_PATH_RELATIVE: bool = True             # relative (lowercase) commands
+    SVG_PATH_SMOOTH: bool = False              # Catmull-Rom cubic Béziers instead of polylines
+    SVG_EXPORT_MAX_ITEMS: int = 10000          # hotspots per zip export
+    
+    # Hit-testing (GET /hotspots/{id}/hit-test, POST /hotspots/{id}/select)
+    HIT_TEST_INDEX_CACHE_SIZE: int = 64        # spatial indexes kept (one per image + params)
+
+    # Tracing (spans propagate to the YOLO service via `traceparent`)
+    TRACING_EXPORTER: str = "none"             # "none" | "file" | "otlp"
+    TRACING_FILE: str = "./traces/api.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318"
+    TRACING_SAMPLE_RATE: float = 1.0           # fraction of new traces recorded
+
+    # On-demand profiling: requests with `X-Profile: <token>` (or a random
+    # fraction) are sampled; `/admin/profiles` needs `X-Admin-Token: <token>`
+    PROFILING_TOKEN: str = ""                  # empty disables header-triggered profiles and the admin API
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_DIR: str = "./profiles"
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_KEEP: int = 200                  # newest profiles kept on disk
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,168 @@
+"""
+    Response compression.
+
+    ASGI middleware that negotiates gzip or brotli from `Accept-Encoding`
+    (honouring q-values) and compresses compressible responses above a
+    minimum size. Single-body responses are compressed in one shot;
+    streamed responses (e.g. NDJSON) are compressed chunk by chunk with a
+    sync flush so each chunk still reaches the client promptly.
+
+    Responses that already carry `Content-Encoding` (e.g. precompressed SVG
+    renders) or `Cache-Control: no-transform` (e.g. `.svgz` downloads) are
+    passed through untouched. Brotli is used only if the optional `brotli`
+    package is installed.
+"""
+
+
+import gzip
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick "br" or "gzip" from an Accept-Encoding header, or None.
+
+    Prefers the highest q-value; on a tie brotli wins (smaller output).
+    """
+    supported = ["gzip", "br"] if brotli is not None else ["gzip"]
+    explicit = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        explicit[token] = q
+
+    wildcard = explicit.get("*", 0.0)
+    qualities = {token: explicit.get(token, wildcard) for token in supported}
+    best = max(qualities.items(), key=lambda kv: (kv[1], kv[0] == "br"))
+    return best[0] if best[1] > 0 else None
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    """Compress a complete body. `mtime=0` keeps gzip output deterministic (cacheable)."""
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental gzip/brotli compressor with per-chunk flush."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.finish()
+        return self._c.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Content-negotiated gzip/brotli compression for HTTP responses."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        streamer: Optional[_StreamCompressor] = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough, streamer
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message  # hold until we've seen the body
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if streamer is not None:
+                data = streamer.chunk(body) if body else b""
+                if not more_body:
+                    data += streamer.finish()
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(scope=start_message)
+
+            if not more_body:
+                # Whole body in one message
+                if len(body) >= self.minimum_size:
+                    body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+            # Streaming response: compress incrementally
+            streamer = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            await send(start_message)
+            await send({"type": "http.response.body", "body": streamer.chunk(body), "more_body": True})
+
+        await self.app(scope, receive, send_wrapper)
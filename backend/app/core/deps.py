@@ -3,17 +3,20 @@
 
     Defines common dependency injectors such as `get_db` for
     database sessions and `get_current_user` for retrieving
-    the authenticated user from a JWT token.
+    the authenticated user from a JWT token (on the async session,
+    so auth never blocks the event loop).
 """
 
 
 from fastapi import Depends, HTTPException, status
 #from fastapi.security import OAuth2PasswordBearer
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.base import get_db
+from app.db.base import get_async_db
 from app.models import User
+from photo_contour_shared import tracing
 from app.core.security import decode_access_token
 
 
@@ -23,9 +26,18 @@ security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     """Extract user from Bearer token."""
+    with tracing.span("auth.get_current_user"):
+        user_id = _token_user_id(credentials)
+        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        return user
+
+
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> str:
     if credentials.scheme != "Bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth scheme")
     
@@ -37,22 +49,14 @@ async def get_current_user(
     
     try:
         payload = decode_access_token(token)
-        print(f"DEBUG: decode_access_token result: {payload}")
-        print(f"DEBUG: payload type: {type(payload)}")
     except Exception as e:
-        print(f"DEBUG: decode_access_token EXCEPTION: {e}")
         raise HTTPException(status_code=401, detail=f"Decode error: {e}")
     
     if payload is None:
-        print("DEBUG: payload is None - token invalid/expired")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid/expired token")
     
     user_id = payload.get("sub")
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token structure")
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    
-    return user
\ No newline at end of file
+    return user_id
\ No newline at end of file
@@ -12,10 +12,13 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.config import settings
+from photo_contour_shared.metrics import REGISTRY
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+TOKEN_FAILURES = REGISTRY.counter("auth_token_failures_total", "JWTs rejected by reason", ("reason",))
+
 
 def hash_password(password: str) -> str:
     """Hash a plain text password."""
@@ -62,23 +65,16 @@ def decode_access_token(token: str) -> Optional[dict]:
                 "verify_nbf": False,   # Skip not-before check
             }
         )
-        print(f"DEBUG JWT: payload decoded OK: {payload}")
         return payload
     except jwt.ExpiredSignatureError:
-        print("DEBUG JWT: Token expired")  # Add this
-        return None
-    except jwt.JWTClaimsError as e:
-        print(f"DEBUG JWT: Invalid claims => {e}")  # Add this
+        TOKEN_FAILURES.inc(reason="expired")
         return None
-    except jwt.InvalidAlgorithmError:
-        print("DEBUG JWT: Invalid algorithm")  # Add this
+    except jwt.JWTClaimsError:
+        TOKEN_FAILURES.inc(reason="claims")
         return None
-    except jwt.InvalidTokenError as e:
-        print(f"DEBUG JWT: Invalid token error: {e}")  # Add this
-        return None
-    except JWTError as e:
-        print(f"DEBUG JWT: JWTError: {e}")
+    except JWTError:
+        TOKEN_FAILURES.inc(reason="invalid")
         return None
     except Exception as e:
-        print(f"DEBUG JWT: Unexpected error: {e}")  # Add this
-        return None
\ No newline at end of file
+        TOKEN_FAILURES.inc(reason=type(e).__name__)
+        return None
@@ -0,0 +1,56 @@
+"""
+    Streaming zip archives.
+
+    Writes a zip file through `zipfile` into a non-seekable buffer that is
+    drained after every write, so an archive can be sent to the client
+    while later entries are still being produced. Entry sizes and CRCs go
+    into data descriptors after each entry (zipfile does this by itself
+    when it cannot seek back), so memory holds the current entry, never
+    the archive.
+"""
+
+
+import time
+import zipfile
+from typing import Iterable, Iterator, Tuple, Union
+
+
+class _Sink:
+    """Write-only, unseekable file object collecting bytes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+Entry = Tuple[str, Union[bytes, str], int]   # (name, data, zipfile.ZIP_* compression)
+
+
+def stream_zip(entries: Iterable[Entry], compresslevel: int = 6) -> Iterator[bytes]:
+    """Yield the bytes of a zip archive holding `entries`, one chunk per entry."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for name, data, compression in entries:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, data, compress_type=compression, compresslevel=compresslevel)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    # Central directory, written on close
+    tail = sink.drain()
+    if tail:
+        yield tail
@@ -7,7 +7,7 @@
 
 
 from app.db.base import Base, engine
-from app.models import User, Image, Hotspot
+from app.models import User, Image, Hotspot, Detection, Video
 
 
 def init_db():
@@ -7,13 +7,19 @@
 """
 
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 
 from app.config import settings
-from app.routers import images, auth, hotspots
+from photo_contour_shared import metrics, profiling, tracing
+from app.core.compression import CompressionMiddleware
+from app.db.base import async_engine
+from app.db.init_db import init_db
+from app.routers import images, auth, hotspots, videos
+from app.services import admission, detection_service
+from app.services.detection_backends import get_detection_backend
 
 
 # Create FastAPI app instance
@@ -33,15 +39,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression (gzip / brotli, negotiated per request)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Opt-in sampling profiler for selected requests (folded stacks in PROFILING_DIR)
+profiler = profiling.Profiler(
+    directory=settings.PROFILING_DIR,
+    token=settings.PROFILING_TOKEN,
+    sample_rate=settings.PROFILING_SAMPLE_RATE,
+    interval_ms=settings.PROFILING_INTERVAL_MS,
+    keep=settings.PROFILING_KEEP,
+)
+app.add_middleware(profiling.ProfilingMiddleware, profiler=profiler)
+
+# Per-route latency histograms (outermost, so compression time is included)
+app.add_middleware(metrics.MetricsMiddleware, service="backend")
+
+# Request spans; continues a caller's trace from `traceparent`
+tracing.configure(
+    service="photo-contour-api",
+    exporter=settings.TRACING_EXPORTER,
+    file_path=settings.TRACING_FILE,
+    otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+)
+app.add_middleware(tracing.TracingMiddleware)
+
 # Routers
 app.include_router(auth.router)
 app.include_router(images.router)
 app.include_router(hotspots.router)
+app.include_router(videos.router)
+app.include_router(profiling.admin_router(profiler))
 
 # Serve static files (uploads folder)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+@app.on_event("startup")
+def start_detection_backend():
+    """
+    Create any missing tables (e.g. the detection cache) and let the
+    configured detection backend warm up (e.g. load the in-process model).
+    """
+    init_db()
+    get_detection_backend().start()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    """Close the async engine's pooled connections (aiosqlite threads / asyncpg sockets)."""
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     """Root endpoint - basic health check."""
@@ -62,6 +117,26 @@ async def health_check():
     }
     
 
+@app.get("/health/detection")
+async def detection_health():
+    """
+    Detection admission state: limiter occupancy/queue, circuit breaker
+    state, per-node balancer stats (HTTP backend) and the background
+    detection queue.
+    """
+    return {
+        **admission.snapshot(),
+        **get_detection_backend().snapshot(),
+        "pipeline": detection_service.pipeline.snapshot(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage, cache and admission metrics."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/ping")
 async def ping():
     """Simple ping endpoint for load balancer health checks."""
@@ -2,13 +2,15 @@
     SQLAlchemy ORM model package.
 
     Exposes the declarative Base and collects all table models
-    (user, image, hotspot) so Alembic can discover them for migrations.
+    (user, image, hotspot, detection, video) so Alembic can discover them for migrations.
 """
 
 
 from .user import User
 from .image import Image
 from .hotspot import Hotspot
+from .detection import Detection
+from .video import Video
 
 
-__all__ = ["User", "Image", "Hotspot"]
\ No newline at end of file
+__all__ = ["User", "Image", "Hotspot", "Detection", "Video"]
\ No newline at end of file
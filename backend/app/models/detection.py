@@ -0,0 +1,23 @@
+"""
+    Detection model definition.
+
+    Caches the YOLO detection result for an image (one row per image and
+    parameter set) so the studio's detect call can usually be served from
+    the database, e.g. after eager background detection on upload.
+"""
+
+
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class Detection(Base):
+    __tablename__ = "detections"
+    __table_args__ = (UniqueConstraint("image_id", "params_key", name="uq_detection_image_params"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    image_id = Column(Integer, ForeignKey("images.id"), nullable=False, index=True)
+    params_key = Column(String, nullable=False, default="")  # canonical JSON of DetectionParams ("" = defaults)
+    result_json = Column(Text, nullable=False)               # serialized DetectionResult
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
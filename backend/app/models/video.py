@@ -0,0 +1,28 @@
+"""
+    Video model definition.
+
+    Stores metadata for uploaded product videos and the cached object
+    timeline (keyframe detections plus tracked trajectories) that drives
+    their animated hotspot overlays.
+"""
+
+
+from sqlalchemy import Column, Integer, Float, String, Text, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class Video(Base):
+    __tablename__ = "videos"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    filepath = Column(String, nullable=False)  # path to static/uploads/videos/
+    user_id = Column(Integer, ForeignKey("users.id"))
+    width = Column(Integer)
+    height = Column(Integer)
+    fps = Column(Float)
+    frame_count = Column(Integer)
+    timeline_json = Column(Text)                 # serialized VideoTimeline, once detected
+    timeline_params_key = Column(String)         # the VideoDetectParams it was computed with
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
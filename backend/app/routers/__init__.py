@@ -1,6 +1,6 @@
 """
     API router package.
 
-    Groups all FastAPI router modules (auth, images, hotspots)
+    Groups all FastAPI router modules (auth, images, hotspots, videos)
     so they can be included into the main application instance.
 """
\ No newline at end of file
@@ -7,9 +7,11 @@
 
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.base import get_db
+from app.db.base import get_async_db
 from app import schemas
 from app.models import User
 from app.core.security import hash_password, verify_password, create_access_token
@@ -20,31 +22,32 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user with email and password.
     """
-    existing = db.query(User).filter(User.email == user_in.email).first()
+    existing = (await db.execute(select(User).where(User.email == user_in.email))).scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    # bcrypt is deliberately slow - keep it off the event loop
     user = User(
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=await run_in_threadpool(hash_password, user_in.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(user_in: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Login with email and password and receive a JWT access token.
     """
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if not user or not verify_password(user_in.password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.email == user_in.email))).scalar_one_or_none()
+    if not user or not await run_in_threadpool(verify_password, user_in.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     token = create_access_token({"sub": str(user.id)})
@@ -52,7 +55,7 @@ def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=schemas.UserOut)
-def read_me(current_user: User = Depends(deps.get_current_user)):
+async def read_me(current_user: User = Depends(deps.get_current_user)):
     """
     Get the currently authenticated user's basic information.
     """
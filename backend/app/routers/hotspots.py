@@ -7,12 +7,23 @@
 """
 
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Literal, Optional
 
-from app.db.base import get_db
-from app.schemas.hotspots import DetectionResult, HotspotCreate, SvgResponse
-from app.services import detection_service, svg_service
+from app.config import settings
+from app.db.base import get_async_db, get_db
+from app.schemas.hotspots import (
+    BulkDetectRequest, DetectionParams, DetectionResult, HitTestResponse, HotspotCreate, RoiDetectRequest,
+    SelectionRequest, SvgExportRequest, SvgResponse,
+)
+from app.services import detection_service, hit_testing, svg_service
+from app.core.compression import negotiate_encoding
+from app.core.zipstream import stream_zip
 from app.core.deps import get_current_user
 from app.models import User
 
@@ -20,17 +31,121 @@ from app.models import User
 router = APIRouter(prefix="/hotspots", tags=["hotspots"])
 
 
+# Declared before /detect/{image_id} so "bulk" isn't taken for an image id
+@router.post("/detect/bulk")
+def detect_bulk(
+    request: BulkDetectRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Detect many images in one call, streaming results as NDJSON.
+
+    Images are given as `image_ids` or selected by `created_after`/`limit`.
+    With `skip_cached` (default) images that already have a stored result
+    for these params are reported as skipped. One JSON line is written per
+    image as soon as it finishes, then a final `{"summary": ...}` line.
+    """
+    image_ids = detection_service.select_images(db, request.image_ids, request.created_after, request.limit)
+    key = detection_service.params_key(request.params)
+    skip = detection_service.cached_image_ids(db, image_ids, key) if request.skip_cached else set()
+    concurrency = min(request.concurrency or settings.BULK_DETECT_CONCURRENCY, settings.BULK_DETECT_MAX_CONCURRENCY)
+
+    missing = sorted(set(request.image_ids or ()) - set(image_ids))
+
+    def lines():
+        started = time.perf_counter()
+        counts = {"ok": 0, "skipped": 0, "error": 0}
+        for image_id in missing:
+            counts["error"] += 1
+            yield json.dumps({"image_id": image_id, "status": "error", "code": 404, "detail": "Image not found"}) + "\n"
+        for line in detection_service.detect_many(
+            image_ids, request.params, skip, concurrency, request.include_results,
+        ):
+            counts[line["status"]] += 1
+            yield json.dumps(line) + "\n"
+        counts["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        yield json.dumps({"summary": counts}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/detect/{image_id}", response_model=DetectionResult)
-def detect_objects(image_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def detect_objects(
+    image_id: int,
+    params: Optional[DetectionParams] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
     """
     Run YOLOv8 SEGMENTATION on the given image.
 
-    Returns object contours (not rectangles).
+    Returns object contours (not rectangles). An optional body with a
+    `quality` tier ("fast" | "balanced" | "high") and/or `latency_budget_ms`
+    controls the inference size; the chosen parameters come back in `params`.
+    `classes`, `min_score`, `max_det` and `min_area` filter objects inside the
+    YOLO service, before any contour work is done for them.
     """
-    result = detection_service.run_yolo_detection(db, image_id)
+    result = await detection_service.run_yolo_detection_async(db, image_id, params)
     return result
+
+
+@router.post("/detect/{image_id}/roi", response_model=DetectionResult)
+def detect_roi(
+    image_id: int,
+    request: RoiDetectRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Re-detect inside a normalized region (`roi`), optionally at a larger
+    `imgsz`, and merge what is found into the stored detection for `params`.
+
+    Only the crop is sent through the model. Returns the merged result;
+    objects that were already known keep their ids.
+    """
+    return detection_service.detect_roi(db, image_id, request)
     
     
+@router.get("/{image_id}/hit-test", response_model=HitTestResponse)
+def hit_test_point(
+    image_id: int,
+    x: float,
+    y: float,
+    normalized: bool = False,
+    params_key: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Which detected objects contain the point (x, y)?
+
+    Coordinates are image pixels (or 0-1 with `normalized=true`). Objects
+    are returned smallest first, so the first one is the innermost.
+    `params_key` selects a non-default detection (e.g. a quality tier or
+    one that ROI re-detection merged into): the same DetectionParams as
+    the POST routes, as JSON, e.g. `{"quality":"high"}`.
+    """
+    params = detection_service.parse_params_key(params_key)
+    return hit_testing.hit_test(db, image_id, x, y, normalized, params)
+
+
+@router.post("/{image_id}/select", response_model=HitTestResponse)
+def select_objects(
+    image_id: int,
+    request: SelectionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Rectangle (`rect`) or lasso (`lasso` polygon) selection.
+
+    `mode="intersects"` returns objects touching the selection,
+    `mode="contains"` only those lying entirely inside it.
+    """
+    return hit_testing.select_objects(db, image_id, request)
+
+
 @router.post("/generate-svg", response_model=SvgResponse)
 def generate_svg(hotspot: HotspotCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
@@ -40,29 +155,71 @@ def generate_svg(hotspot: HotspotCreate, db: Session = Depends(get_db), current_
     return svg_service.generate_interactive_svg(db, hotspot)
 
 
+@router.post("/export-svg")
+def export_svg(request: SvgExportRequest, current_user: User = Depends(get_current_user)):
+    """
+    Render many hotspots and stream them back as one zip archive.
+
+    Each image is detected and encoded once for all of its objects, and
+    entries are sent as they are rendered. Hotspots that can't be rendered
+    are listed under `errors` in the archive's `manifest.json`.
+    """
+    if len(request.items) > settings.SVG_EXPORT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.SVG_EXPORT_MAX_ITEMS} items per export")
+
+    entries = svg_service.export_svgs(request.items, request.format)
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="hotspots_{int(time.time())}.zip"'},
+    )
+
+
 @router.get("/{image_id}/{object_id}/download-svg", response_class=Response)
 def download_svg(
+    request: Request,
     image_id: int,
     object_id: int,
     text: str = "object",
     link: str = "https://example.com",
+    format: Literal["svg", "svgz"] = "svg",
+    theme: Literal["light", "dark"] = "light",
+    layout: Literal["card", "compact"] = "card",
     db: Session = Depends(get_db)
 ):
+    """
+    Download the interactive SVG as a file.
+
+    `format=svgz` returns the gzip-compressed `.svgz` file itself. For plain
+    `.svg`, clients that accept gzip/brotli get the cached precompressed body
+    with a matching Content-Encoding, so nothing is recompressed per request.
+    """
     hotspot = HotspotCreate(
         image_id=image_id,
         object_id=object_id,
         text=text,
         link=link,
+        theme=theme,
+        layout=layout,
     )
 
-    result = svg_service.generate_interactive_svg(db, hotspot)
+    rendered = svg_service.render_svg(db, hotspot)
+    filename = f"image_{image_id}_obj_{object_id}_{svg_service.safe_filename(text)}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "svgz":
+        # The file *is* gzip data; no-transform keeps the middleware off it
+        headers["Cache-Control"] = "no-transform"
+        return Response(content=rendered.encoded("gzip"), media_type="image/svg+xml", headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+        return Response(content=rendered.encoded(encoding), media_type="image/svg+xml", headers=headers)
 
     return Response(
-        content=result.svg,
+        content=rendered.svg,
         media_type="image/svg+xml",
-        headers={
-            "Content-Disposition": (
-                f'attachment; filename="image_{image_id}_obj_{object_id}_{text}.svg"'
-            ),
-        },
+        headers=headers,
     )
\ No newline at end of file
@@ -8,34 +8,54 @@
 
 import os
 import shutil
+import uuid
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 
-from app import schemas, services
-from app.db.base import get_db
-from app.models import Image
+from app import schemas
+from app.services import detection_service
+from app.db.base import get_async_db, get_db
 from app.config import settings
+from photo_contour_shared.metrics import timed
 from app.core.deps import get_current_user
 from app.models import User
-from app.services.image_service import check_image_quality
+from app.services import image_service
+from app.services.detection_pipeline import PRIORITY_BULK
 
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 
+def _store_upload(file: UploadFile, filepath: str):
+    """Write the upload to disk and validate it (blocking; runs on the threadpool)."""
+    with timed("upload_write"), open(filepath, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+    with timed("quality_check"):
+        passed, reason, width, height = image_service.inspect_image(filepath)
+    if not passed:
+        # Remove the file — we don't want to keep rejected uploads
+        os.remove(filepath)
+        raise HTTPException(status_code=422, detail=reason)
+    return width, height
+
+
 @router.post("/", response_model=schemas.ImageResponse)
 async def upload_image(
     file: UploadFile = File(..., description="Image file to upload"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Upload a new image.
     
     Validates image quality (resolution + sharpness) before saving.
-    Saves file to static/uploads/ and creates database record.
+    Saves file to static/uploads/ and creates database record, then
+    queues eager background detection (dropped if the service is busy).
     """
     if not file.content_type.startswith("image/"):
         raise HTTPException(400, "File must be an image")
@@ -44,48 +64,123 @@ async def upload_image(
     filename = f"{file.filename}"
     filepath = os.path.join(settings.UPLOAD_DIR, filename)
     
-    # Save file
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # ── Quality validation ────────────────────────────────────────────────────
-    passed, reason = check_image_quality(filepath)
-    if not passed:
-        # Remove the file — we don't want to keep rejected uploads
-        os.remove(filepath)
-        raise HTTPException(status_code=422, detail=reason)
+    # Save file and validate quality (resolution + sharpness) off the event loop
+    width, height = await run_in_threadpool(_store_upload, file, filepath)
 
     # Quality passed — create DB record
-    image = services.save_uploaded_image(db, filepath, filename)
+    image = await image_service.save_uploaded_image_async(db, filepath, filename, width, height)
+
+    # Start detection now so the studio's detect call is usually a lookup
+    if settings.EAGER_DETECTION:
+        detection_service.enqueue_detection(image.id)
     
     return image
 
 
+@router.post("/bulk", response_model=schemas.BulkUploadResponse)
+def upload_images_bulk(
+    files: List[UploadFile] = File(..., description="Image files and/or zip archives of images"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Upload many images at once (individual files and/or zip archives).
+
+    Entries are streamed to disk under unique names (the original name is
+    kept in `filename`), then decoded and quality-checked in parallel
+    worker processes. Accepted images are inserted in a single
+    transaction and queued for background detection; rejected files are
+    deleted. Returns one report item per file, in upload order.
+    """
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    items: List[schemas.BulkUploadItem] = []
+    staged = []  # (item index, filepath, filename)
+    seen = set()
+
+    try:
+        for filename, stream, reason in image_service.iter_upload_entries(files):
+            if len(items) >= settings.BULK_MAX_FILES:
+                raise HTTPException(413, f"Too many files (max {settings.BULK_MAX_FILES} per request)")
+            if stream is not None and filename in seen:
+                reason, stream = "Duplicate file name in this upload", None
+            if stream is None:
+                items.append(schemas.BulkUploadItem(filename=filename, accepted=False, reason=reason))
+                continue
+
+            seen.add(filename)
+            # Catalog zips reuse names like IMG_0001.jpg: store under a unique
+            # name so no entry can overwrite (or later delete) another image's file
+            ext = os.path.splitext(filename)[1].lower()
+            filepath = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}")
+            with timed("upload_write"), open(filepath, "wb") as buffer:
+                shutil.copyfileobj(stream, buffer)
+            staged.append((len(items), filepath, filename))
+            items.append(schemas.BulkUploadItem(filename=filename, accepted=False))
+
+        # ── Quality validation (process pool) ─────────────────────────────────
+        with timed("quality_check"):
+            checks = image_service.inspect_images([path for _, path, _ in staged])
+
+        accepted = []
+        for (index, filepath, filename), (passed, reason, width, height) in zip(staged, checks):
+            if passed:
+                accepted.append((index, (filepath, filename, width, height)))
+            else:
+                items[index].reason = reason
+                os.remove(filepath)
+
+        images = image_service.save_uploaded_images(db, [entry for _, entry in accepted])
+    except BaseException:
+        # Nothing was stored: don't leave orphaned files behind
+        for _, filepath, _ in staged:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        raise
+
+    for (index, _), image in zip(accepted, images):
+        item = items[index]
+        item.accepted = True
+        item.image = schemas.ImageResponse.model_validate(image)
+        if settings.EAGER_DETECTION:
+            item.detection_queued = (
+                detection_service.enqueue_detection(image.id, priority=PRIORITY_BULK) is not None
+            )
+
+    return schemas.BulkUploadResponse(
+        accepted=len(images),
+        rejected=len(items) - len(images),
+        items=items,
+    )
+
+
 @router.get("/{image_id}", response_model=schemas.ImageResponse)
-def get_image(image_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_image(
+    image_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user),
+):
     """Get image metadata by ID."""
-    image = services.get_image_by_id(db, image_id)
+    image = await image_service.get_image_by_id_async(db, image_id)
     if not image:
         raise HTTPException(404, "Image not found")
     return image
 
 
 @router.get("/", response_model=List[schemas.ImageResponse])
-def list_images(db: Session = Depends(get_db)):
+async def list_images(db: AsyncSession = Depends(get_async_db)):
     """List all images (no auth yet)."""
-    images = db.query(Image).all()
-    return images
+    return await image_service.list_images_async(db)
 
 
 @router.get("/{image_id}/file")
-def get_image_file(image_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_image_file(
+    image_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user),
+):
     """
     Return the raw image file for a given image ID.
 
     This will be used by the studio frontend to display
     the original image in the browser.
     """
-    image = services.get_image_by_id(db, image_id)
+    image = await image_service.get_image_by_id_async(db, image_id)
     if not image:
         raise HTTPException(404, "Image not found")
     
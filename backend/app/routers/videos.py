@@ -0,0 +1,89 @@
+"""
+    Video hotspot API endpoints.
+
+    Implements routes to upload short product videos, run keyframe
+    detection with tracking, and fetch the resulting object timeline as
+    JSON or as an animated SVG overlay.
+"""
+
+
+import os
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.base import get_db
+from app.schemas.videos import VideoDetectParams, VideoResponse, VideoTimeline
+from app.services import video_service
+from app.core.deps import get_current_user
+from app.models import User
+
+
+router = APIRouter(prefix="/videos", tags=["videos"])
+
+
+def _response(video) -> VideoResponse:
+    response = VideoResponse.model_validate(video)
+    response.has_timeline = video.timeline_json is not None
+    return response
+
+
+@router.post("/", response_model=VideoResponse)
+def upload_video(
+    file: UploadFile = File(..., description="Video file to upload"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Upload a video (mp4/mov/webm/...); its metadata is read on upload."""
+    return _response(video_service.save_uploaded_video(db, file))
+
+
+@router.get("/{video_id}", response_model=VideoResponse)
+def get_video(video_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Get video metadata by ID."""
+    return _response(video_service.get_video(db, video_id))
+
+
+@router.get("/{video_id}/file")
+def get_video_file(video_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Return the raw video file (the overlay is laid over it in the player)."""
+    video = video_service.get_video(db, video_id)
+    if not os.path.exists(video.filepath):
+        raise HTTPException(404, "Video file not found on disk")
+    return FileResponse(video.filepath, media_type="video/*", filename=video.filename)
+
+
+@router.post("/{video_id}/detect", response_model=VideoTimeline)
+def detect_video(
+    video_id: int,
+    params: Optional[VideoDetectParams] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Detect and track objects through the video.
+
+    Full segmentation runs only every `keyframe_interval` processed frames;
+    objects are followed with optical flow in between. The timeline is
+    stored, so repeating the call with the same parameters is a lookup.
+    """
+    return video_service.detect_video(db, video_id, params)
+
+
+@router.get("/{video_id}/timeline", response_model=VideoTimeline)
+def get_timeline(video_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """The stored object timeline (404 until the video has been detected)."""
+    return video_service.get_timeline(db, video_id)
+
+
+@router.get("/{video_id}/timeline.svg", response_class=Response)
+def get_timeline_svg(
+    video_id: int,
+    color: str = "#3b82f6",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Animated SVG overlay whose hotspot outlines follow the tracked objects."""
+    timeline = video_service.get_timeline(db, video_id)
+    return Response(content=video_service.render_timeline_svg(timeline, color), media_type="image/svg+xml")
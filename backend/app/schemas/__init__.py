@@ -2,17 +2,26 @@
     Pydantic schema definitions used by the API layer.
 
     Re-exports request and response models for authentication, images,
-    and hotspots so they can be imported from a single package namespace.
+    hotspots and videos so they can be imported from a single package
+    namespace.
 """
 
 
-from .images import ImageResponse, ImageCreate, ImageBase
+from .images import ImageResponse, ImageCreate, ImageBase, BulkUploadItem, BulkUploadResponse
 from .auth import UserCreate, UserLogin, Token, UserOut
-from .hotspots import BBox, DetectedObject, DetectionResult, HotspotCreate, SvgResponse
+from .hotspots import (
+    BBox, Polygon, RleMask, DetectedObject, DetectionParams, InferenceParams, DetectionResult,
+    RoiDetectionParams, RoiDetectRequest, BulkDetectRequest,
+    HitTestObject, HitTestResponse, SelectionRequest, HotspotCreate, SvgExportRequest, SvgResponse,
+)
+from .videos import VideoResponse, VideoDetectParams, TrackFrame, Track, VideoTimeline
 
 
 __all__ = [
-    "ImageResponse", "ImageCreate", "ImageBase",
+    "ImageResponse", "ImageCreate", "ImageBase", "BulkUploadItem", "BulkUploadResponse",
     "UserCreate", "UserLogin", "Token", "UserOut",
-    "BBox", "DetectedObject", "DetectionResult", "HotspotCreate", "SvgResponse",
+    "BBox", "Polygon", "RleMask", "DetectedObject", "DetectionParams", "InferenceParams", "DetectionResult",
+    "RoiDetectionParams", "RoiDetectRequest", "BulkDetectRequest",
+    "HitTestObject", "HitTestResponse", "SelectionRequest", "HotspotCreate", "SvgExportRequest", "SvgResponse",
+    "VideoResponse", "VideoDetectParams", "TrackFrame", "Track", "VideoTimeline",
 ]
\ No newline at end of file
@@ -7,8 +7,9 @@
 """
 
 
-from pydantic import BaseModel
-from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Tuple
 
 
 class Point(BaseModel):
@@ -25,6 +26,18 @@ class BBox(BaseModel):
     y2: float
     
     
+class Polygon(BaseModel):
+    """One connected part of an object mask, with its holes (normalized 0-1)."""
+    exterior: List[List[float]]
+    holes: List[List[List[float]]] = []
+
+
+class RleMask(BaseModel):
+    """Lossless object mask in COCO RLE form (see `photo_contour_shared.rle`)."""
+    size: List[int]      # [height, width] of the image, in pixels
+    counts: str          # compressed COCO counts string
+
+
 class DetectedObject(BaseModel):
     """Single detected object returned by detection service."""
     id: int              # simple index
@@ -32,16 +45,93 @@ class DetectedObject(BaseModel):
     score: float         # confidence (stubbed)
     contour: Optional[List[List[float]]] = None  # [[x1,y1], [x2,y2], ...] normalized 0-1
     bbox: BBox
+    polygons: Optional[List[Polygon]] = None  # all parts + holes (low-res mask mode only)
+    mask_rle: Optional[RleMask] = None        # only when requested with `rle`
     
     
+class DetectionParams(BaseModel):
+    """Optional knobs a caller can pass to trade detection quality for latency."""
+    quality: Optional[Literal["fast", "balanced", "high"]] = None
+    latency_budget_ms: Optional[float] = None
+    mask_mode: Optional[Literal["retina", "proto"]] = None  # "proto" skips full-res mask upsampling
+    subpixel: Optional[bool] = None                         # refine "proto" contours below a pixel
+    classes: Optional[List[str]] = None  # only return these labels
+    min_score: Optional[float] = None    # confidence threshold
+    max_det: Optional[int] = None        # keep at most N objects (highest scores first)
+    min_area: Optional[float] = None     # minimum bbox area, fraction of the image (0-1)
+    rle: Optional[bool] = None           # also return masks as COCO RLE (`mask_rle`)
+
+
+class InferenceParams(BaseModel):
+    """Inference parameters the YOLO service actually used."""
+    quality: str
+    imgsz: int
+    conf: float
+    max_det: int
+    latency_budget_ms: Optional[float] = None
+    classes: Optional[List[str]] = None
+    min_area: Optional[float] = None
+    estimated_ms: Optional[float] = None
+    inference_ms: float = 0.0
+    roi: Optional[List[float]] = None
+
+
 class DetectionResult(BaseModel):
     """List of detected objects for an image."""
     image_id: int
     width: Optional[float] = None
     height: Optional[float] = None
     objects: List[DetectedObject]
+    params: Optional[InferenceParams] = None
     
     
+class RoiDetectionParams(DetectionParams):
+    """Detection params plus a crop; sent to the backend for ROI re-detection."""
+    roi: List[float]                     # normalized x1, y1, x2, y2
+    imgsz: Optional[int] = None
+
+
+class RoiDetectRequest(BaseModel):
+    """Re-detect inside a region and merge the results into the stored detection."""
+    roi: BBox                            # normalized 0-1
+    imgsz: Optional[int] = Field(default=None, ge=32, le=4096)  # e.g. higher than the full pass used
+    params: Optional[DetectionParams] = None   # identifies the stored detection to merge into
+    iou_threshold: float = Field(default=0.5, gt=0, le=1)     # same-label overlap treated as one object
+
+
+class BulkDetectRequest(BaseModel):
+    """Images to detect in one call: explicit ids, or a filter over all images."""
+    image_ids: Optional[List[int]] = None
+    created_after: Optional[datetime] = None   # filter, used when image_ids is not given
+    limit: Optional[int] = Field(default=None, gt=0)
+    params: Optional[DetectionParams] = None
+    skip_cached: bool = True                   # don't re-detect images with a stored result
+    include_results: bool = False              # full objects/contours in each line (large)
+    concurrency: Optional[int] = Field(default=None, gt=0)
+
+
+class HitTestObject(BaseModel):
+    """An object found by a hit-test or selection query."""
+    id: int
+    label: str
+    score: float
+
+
+class HitTestResponse(BaseModel):
+    """Matching objects, smallest (innermost) first."""
+    image_id: int
+    objects: List[HitTestObject]
+
+
+class SelectionRequest(BaseModel):
+    """Rectangle or lasso selection over an image's detected objects."""
+    rect: Optional[BBox] = None
+    lasso: Optional[List[Tuple[float, float]]] = Field(default=None, min_length=3)  # [[x, y], ...]
+    mode: Literal["intersects", "contains"] = "intersects"
+    normalized: bool = False          # coordinates are 0-1 instead of pixels
+    params: Optional[DetectionParams] = None
+
+
 class HotspotCreate(BaseModel):
     """Data needed to create a hotspot and generate SVG."""
     image_id: int
@@ -49,8 +139,16 @@ class HotspotCreate(BaseModel):
     text: str
     link: str
     color: Optional[str] = "#3b82f6"
+    theme: Literal["light", "dark"] = "light"
+    layout: Literal["card", "compact"] = "card"   # popup style
     
     
+class SvgExportRequest(BaseModel):
+    """Hotspots to render into one zip archive."""
+    items: List[HotspotCreate] = Field(min_length=1)
+    format: Literal["svg", "svgz"] = "svg"
+
+
 class SvgResponse(BaseModel):
     """Generated SVG document as a string."""
     image_id: int
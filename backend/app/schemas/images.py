@@ -7,7 +7,7 @@
 
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -27,4 +27,19 @@ class ImageResponse(ImageBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class BulkUploadItem(BaseModel):
+    """Outcome for one uploaded file or zip entry."""
+    filename: str
+    accepted: bool
+    reason: Optional[str] = None               # why it was rejected
+    image: Optional[ImageResponse] = None      # the stored record, if accepted
+    detection_queued: bool = False
+
+
+class BulkUploadResponse(BaseModel):
+    accepted: int
+    rejected: int
+    items: List[BulkUploadItem]
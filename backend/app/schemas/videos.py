@@ -0,0 +1,73 @@
+"""
+    Pydantic models for video upload and object timelines.
+
+    Defines schemas for video metadata, the knobs of keyframe detection
+    and tracking, and the per-object trajectories returned by the YOLO
+    service's video endpoint.
+"""
+
+
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+
+from .hotspots import BBox, InferenceParams
+
+
+class VideoResponse(BaseModel):
+    id: int
+    filename: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    frame_count: Optional[int] = None
+    has_timeline: bool = False
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class VideoDetectParams(BaseModel):
+    """How densely to detect; everything else is tracked in between."""
+    keyframe_interval: Optional[int] = Field(default=None, ge=1)   # default: VIDEO_KEYFRAME_INTERVAL
+    frame_stride: int = Field(default=1, ge=1)                     # process every Nth frame
+    max_frames: Optional[int] = Field(default=None, ge=1)
+    quality: Optional[Literal["fast", "balanced", "high"]] = None
+    classes: Optional[List[str]] = None
+    min_score: Optional[float] = None
+    max_det: Optional[int] = None
+    min_area: Optional[float] = None
+
+
+class TrackFrame(BaseModel):
+    """Where one object is on one processed frame (normalized coordinates)."""
+    frame: int
+    t: float                                     # seconds from the start
+    keyframe: bool
+    bbox: BBox
+    contour: Optional[List[List[float]]] = None  # keyframes: the detected outline
+    transform: Optional[List[float]] = None      # others: SVG matrix(a b c d e f) of the last keyframe contour
+
+
+class Track(BaseModel):
+    """One object followed through the video."""
+    id: int
+    label: str
+    score: float
+    frames: List[TrackFrame]
+
+
+class VideoTimeline(BaseModel):
+    """Per-object trajectories for a video."""
+    video_id: int
+    fps: float
+    frame_count: int
+    width: int
+    height: int
+    processed_frames: int
+    frame_stride: int
+    keyframes: List[int]
+    tracks: List[Track]
+    timings_ms: Dict[str, float] = {}
+    params: Optional[InferenceParams] = None
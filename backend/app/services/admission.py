@@ -0,0 +1,288 @@
+"""
+    Admission control for detection calls.
+
+    A slow YOLO service must not be allowed to tie up every worker thread
+    (auth and image endpoints share the same threadpool). Two guards wrap
+    each detection:
+
+      - `ConcurrencyLimiter`: at most N detections run at once and at most
+        M more wait for a slot. A full queue answers 429, a wait that
+        times out answers 503 - both with a Retry-After hint. Background
+        (bulk) work waits in a separate lane: it only starts when no
+        interactive caller is queued and never takes the reserved slots.
+      - `CircuitBreaker`: after K consecutive YOLO errors/timeouts the
+        breaker opens and calls fail fast with 503 until a cool-down
+        passes; then a single probe call decides whether to close again.
+
+    Both expose `snapshot()` for the health/metrics endpoints.
+"""
+
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from photo_contour_shared.metrics import REGISTRY
+
+
+class ConcurrencyLimiter:
+    """Bounded-concurrency gate with a bounded wait queue."""
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.background_waiting = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.timeouts_total = 0
+        self._avg_hold_s = 1.0  # EWMA of how long a slot is held, for Retry-After
+        self._cond = threading.Condition()
+
+    def _retry_after(self) -> int:
+        # Roughly how long until the queue ahead of a new caller drains
+        return max(1, math.ceil(self._avg_hold_s * (self.waiting + 1) / self.limit))
+
+    def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raise 429/503 when overloaded."""
+        with self._cond:
+            if self.in_flight < self.limit and self.waiting == 0:
+                self.in_flight += 1
+                self.admitted_total += 1
+                return
+
+            if self.waiting >= self.max_queue:
+                self.rejected_total += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Detection queue is full, try again shortly",
+                    headers={"Retry-After": str(self._retry_after())},
+                )
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self.in_flight < self.limit:
+                            break
+                        self.timeouts_total += 1
+                        raise HTTPException(
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Timed out waiting for a detection slot",
+                            headers={"Retry-After": str(self._retry_after())},
+                        )
+            finally:
+                self.waiting -= 1
+                if self.waiting == 0 and self.background_waiting:
+                    # Background waiters were held back by us; let them re-check
+                    self._cond.notify_all()
+            self.in_flight += 1
+            self.admitted_total += 1
+
+    def acquire_background(self, timeout: float, reserve: int = 0) -> None:
+        """
+        Take a slot for low-priority work, waiting up to `timeout` (then 503).
+
+        Only admitted while no interactive caller is queued and fewer than
+        `limit - reserve` slots are in use, so interactive requests always
+        find a slot or a short queue. Background waiters don't count against
+        `max_queue`.
+        """
+        cap = max(1, self.limit - reserve)
+        with self._cond:
+            deadline = time.monotonic() + timeout
+            self.background_waiting += 1
+            try:
+                while self.waiting > 0 or self.in_flight >= cap:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts_total += 1
+                        raise HTTPException(
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Timed out waiting for a background detection slot",
+                            headers={"Retry-After": str(self._retry_after())},
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self.background_waiting -= 1
+            self.in_flight += 1
+            self.admitted_total += 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free *and* nobody is queued (for background work)."""
+        with self._cond:
+            if self.in_flight < self.limit and self.waiting == 0:
+                self.in_flight += 1
+                self.admitted_total += 1
+                return True
+            return False
+
+    def release(self, held_s: Optional[float] = None) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if held_s is not None:
+                self._avg_hold_s += 0.2 * (held_s - self._avg_hold_s)
+            # Interactive and background waiters share the condition: wake all,
+            # each re-checks its own admission rule
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "background_waiting": self.background_waiting,
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "timeouts_total": self.timeouts_total,
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed → open → half-open → closed)."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_total = 0
+        self.short_circuited_total = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise 503 while open; let exactly one probe through once the cool-down passed."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.short_circuited_total += 1
+            retry_after = max(1, math.ceil(self.reset_timeout - elapsed))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Detection service is failing, circuit open",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.open_total += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """A half-open probe ended without a verdict (e.g. a 4xx): let another one through."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "open_total": self.open_total,
+            "short_circuited_total": self.short_circuited_total,
+        }
+
+
+detection_limiter = ConcurrencyLimiter(
+    limit=settings.DETECTION_MAX_CONCURRENCY,
+    max_queue=settings.DETECTION_MAX_QUEUE,
+    queue_timeout=settings.DETECTION_QUEUE_TIMEOUT_S,
+)
+detection_breaker = CircuitBreaker(
+    failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.BREAKER_RESET_S,
+)
+
+
+_BREAKER_STATES = (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN)
+
+REGISTRY.gauge(
+    "detection_limiter", "Detection limiter occupancy and totals", ("field",),
+    callback=lambda: {(k,): v for k, v in detection_limiter.snapshot().items()},
+)
+REGISTRY.gauge(
+    "detection_breaker_state", "1 for the circuit breaker's current state", ("state",),
+    callback=lambda: {(s,): int(detection_breaker.state == s) for s in _BREAKER_STATES},
+)
+REGISTRY.gauge(
+    "detection_breaker", "Circuit breaker counters", ("field",),
+    callback=lambda: {
+        (k,): v for k, v in detection_breaker.snapshot().items() if isinstance(v, (int, float))
+    },
+)
+
+
+@contextmanager
+def detection_slot(wait: bool = True, background: bool = False, sample_hold: bool = True):
+    """
+    Guard one detection call with the breaker and the limiter.
+
+    RuntimeError (service unreachable, timeout, 5xx) counts as a breaker
+    failure; any other exception leaves the breaker untouched. With
+    `wait=False` the call is rejected with 503 instead of queueing; with
+    `background=True` it waits in the low-priority lane (bulk work,
+    videos). `sample_hold=False` keeps a long call's hold time out of the
+    average that image callers' Retry-After hints are computed from.
+    """
+    detection_breaker.before_call()
+    try:
+        if background:
+            detection_limiter.acquire_background(
+                settings.BULK_DETECT_SLOT_TIMEOUT_S, settings.DETECTION_INTERACTIVE_RESERVE,
+            )
+        elif wait:
+            detection_limiter.acquire()
+        elif not detection_limiter.try_acquire():
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Detection busy")
+    except HTTPException:
+        detection_breaker.release_probe()
+        raise
+
+    started = time.monotonic()
+    try:
+        yield
+    except RuntimeError:
+        detection_breaker.record_failure()
+        raise
+    except BaseException:
+        detection_breaker.release_probe()
+        raise
+    else:
+        detection_breaker.record_success()
+    finally:
+        detection_limiter.release(time.monotonic() - started if sample_hold else None)
+
+
+def snapshot() -> dict:
+    return {"limiter": detection_limiter.snapshot(), "breaker": detection_breaker.snapshot()}
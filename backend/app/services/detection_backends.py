@@ -0,0 +1,449 @@
+"""
+    Detection backends.
+
+    `run_yolo_detection` talks to the segmentation model through the
+    `DetectionBackend` interface. Three implementations exist:
+
+      - "http":       POST to the standalone YOLO microservice (default)
+      - "inprocess":  load the model inside the API worker and call it directly
+      - "stub":       deterministic fake detections for tests and benchmarks
+
+    The backend is selected with `settings.DETECTION_BACKEND`. Every backend
+    returns the YOLO service's JSON shape: {"objects": [...], "params": {...}}.
+"""
+
+
+import hashlib
+import logging
+import math
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+import requests
+from PIL import Image as PILImage, ImageDraw
+
+from app.config import settings
+from photo_contour_shared import rle, tracing
+from photo_contour_shared.metrics import ERRORS, REGISTRY, STAGE_LATENCY
+from app.schemas.hotspots import DetectionParams
+from app.schemas.videos import VideoDetectParams
+from app.services.yolo_pool import YoloNodePool
+
+
+logger = logging.getLogger(__name__)
+
+HEDGED_REQUESTS = REGISTRY.counter(
+    "yolo_hedged_requests_total", "Detection requests duplicated to a second YOLO node",
+)
+
+
+class DetectionBackend(ABC):
+    """Runs segmentation on one image and returns the raw response dict."""
+
+    name = "base"
+
+    def start(self) -> None:
+        """Called once at application startup (e.g. to begin loading a model)."""
+
+    def snapshot(self) -> dict:
+        """Backend state for health/metrics endpoints."""
+        return {"backend": self.name}
+
+    @abstractmethod
+    def detect(
+        self,
+        image_path: str,
+        pil_img: PILImage.Image,
+        params: Optional[DetectionParams] = None,
+    ) -> dict:
+        """
+        Detect objects in the image at `image_path`.
+
+        `pil_img` is the already-opened (lazy) PIL image, so backends that can
+        use decoded pixels don't have to open the file again.
+        """
+
+    @abstractmethod
+    def detect_video(self, video_path: str, params: VideoDetectParams) -> dict:
+        """Keyframe detection + tracking over a video; the `/detect-video` JSON shape."""
+
+
+class HttpDetectionBackend(DetectionBackend):
+    """
+    Calls the YOLO microservice over HTTP (path or shared-memory transport),
+    balancing across one or more nodes. A request that fails on one node
+    is retried once on another.
+
+    With `hedge_after_ms` set (and several nodes, path transport), a request
+    still unanswered after that delay is duplicated to a second node and
+    the first response wins - trading a little extra load for tail latency.
+    `max_in_flight` is how many detections may run at once (the admission
+    limit); the hedging threads are sized from it.
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        pool: YoloNodePool,
+        transport: str = "path",
+        timeout: float = 30,
+        hedge_after_ms: float = 0.0,
+        max_in_flight: int = 4,
+    ):
+        self.pool = pool
+        self.transport = transport
+        self.timeout = timeout
+        self.hedge_after_ms = hedge_after_ms
+        self._hedge_executor = None
+        if hedge_after_ms > 0 and len(pool.nodes) > 1:
+            # A primary and a backup for every detection the limiter lets run at once,
+            # so backups never queue behind slow primaries
+            self._hedge_executor = ThreadPoolExecutor(max_workers=2 * max_in_flight, thread_name_prefix="yolo-hedge")
+
+    def start(self):
+        if len(self.pool.nodes) > 1:
+            self.pool.start_health_checks()
+
+    def snapshot(self):
+        return {"backend": self.name, "hedged_total": int(HEDGED_REQUESTS.value()), "nodes": self.pool.snapshot()}
+
+    def detect(self, image_path, pil_img, params=None):
+        payload = {"image_path": image_path}
+        if params is not None:
+            payload.update(params.model_dump(exclude_none=True))
+
+        shm = None
+        if self.transport == "shm":
+            with tracing.span("detection.share_image"):
+                shm = _share_image(pil_img, payload)
+        try:
+            node = self.pool.acquire()
+            if self._hedge_executor is not None and shm is None:
+                resp = self._hedged_post(node, payload)
+            else:
+                try:
+                    resp = self._post(node, payload, shm)
+                except RuntimeError:
+                    if len(self.pool.nodes) == 1:
+                        raise
+                    resp = self._post(self.pool.acquire(exclude=node), payload, shm)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+        return resp.json()
+
+    def detect_video(self, video_path, params):
+        payload = {"video_path": video_path, **params.model_dump(exclude_none=True)}
+        node = self.pool.acquire()
+        # Long-running: no retry or hedging, a second node would redo all the work
+        resp = self._post(
+            node, payload, None, url=node.base_url + "/detect-video", timeout=settings.VIDEO_TIMEOUT_S,
+            stage="yolo_http_video",
+        )
+        return resp.json()
+
+    def _hedged_post(self, node, payload: dict) -> requests.Response:
+        """Send to `node`; if it hasn't answered within the hedge delay, race a second node."""
+        primary = self._hedge_executor.submit(tracing.wrap(self._post), node, payload, None)
+        done, _ = wait([primary], timeout=self.hedge_after_ms / 1000)
+        if done:
+            try:
+                return primary.result()
+            except RuntimeError:
+                return self._post(self.pool.acquire(exclude=node), payload, None)
+
+        HEDGED_REQUESTS.inc()
+        backup = self._hedge_executor.submit(tracing.wrap(self._post), self.pool.acquire(exclude=node), payload, None)
+        error = None
+        for future in as_completed([primary, backup]):
+            try:
+                return future.result()  # the loser finishes in the background
+            except RuntimeError as e:
+                error = e
+        raise error
+
+    def _post(self, node, payload: dict, shm, url: Optional[str] = None, timeout: Optional[float] = None,
+              stage: str = "yolo_http") -> requests.Response:
+        """
+        POST to one node, recording latency/failure in the pool.
+
+        Only "yolo_http" (single-image) calls feed the node's latency EWMA;
+        other stages are timed under their own name and only count as
+        success or failure.
+        """
+        url = url or node.detect_url
+        timeout = timeout or self.timeout
+        with tracing.span("yolo.http", tracing.CLIENT, **{"http.url": url}) as span:
+            started = time.perf_counter()
+            ok = False
+            try:
+                # `traceparent` lets the service continue this trace
+                headers = tracing.inject({})
+                resp = requests.post(url, json=payload, headers=headers, timeout=timeout)
+                if shm is not None and resp.status_code == 409:
+                    # Service can't see our segment (not co-located) - send the path instead
+                    payload.pop("shm", None)
+                    resp = requests.post(url, json=payload, headers=headers, timeout=timeout)
+                # 4xx means a bad request, not a sick node
+                ok = resp.status_code < 500
+            except requests.RequestException as e:
+                ERRORS.inc(stage=stage, kind=type(e).__name__)
+                raise RuntimeError(f"YOLO service unreachable: {e}")
+            finally:
+                elapsed = time.perf_counter() - started
+                STAGE_LATENCY.observe(elapsed, stage=stage)
+                self.pool.release(node, elapsed * 1000, ok, sample=stage == "yolo_http")
+            if span is not None:
+                span.set("http.status_code", resp.status_code)
+
+        if resp.status_code >= 500:
+            ERRORS.inc(stage=stage, kind=str(resp.status_code))
+            raise RuntimeError(f"YOLO service error: {resp.status_code} {resp.text}")
+        if resp.status_code != 200:
+            raise ValueError(f"YOLO service rejected request: {resp.status_code} {resp.text}")
+        return resp
+
+
+class InProcessDetectionBackend(DetectionBackend):
+    """
+    Runs the YOLO service code inside this process - no HTTP hop, no JSON.
+
+    Imports `yolo_app` from `settings.YOLO_SERVICE_DIR`, so ultralytics/torch
+    must be installed in the API environment. `yolo_app` serializes model
+    calls itself, so a video only holds the model while a keyframe is being
+    segmented and image detections run in between.
+    """
+
+    name = "inprocess"
+
+    def __init__(self, service_dir: str):
+        self.service_dir = str(Path(service_dir).resolve())
+        self._yolo_app = None
+
+    @property
+    def yolo_app(self):
+        if self._yolo_app is None:
+            if self.service_dir not in sys.path:
+                sys.path.insert(0, self.service_dir)
+            import yolo_app
+            self._yolo_app = yolo_app
+        return self._yolo_app
+
+    def start(self):
+        threading.Thread(target=self.yolo_app.load_model, name="model-loader", daemon=True).start()
+
+    def detect(self, image_path, pil_img, params=None):
+        yolo_app = self.yolo_app
+        yolo_app.load_model()  # no-op once loaded; blocks if still warming up
+
+        fields = params.model_dump(exclude_none=True) if params is not None else {}
+        req = yolo_app.DetectRequest(image_path=image_path, **fields)
+        return yolo_app.detect(req).model_dump()
+
+    def detect_video(self, video_path, params):
+        yolo_app = self.yolo_app
+        yolo_app.load_model()
+
+        req = yolo_app.VideoDetectRequest(video_path=video_path, **params.model_dump(exclude_none=True))
+        return yolo_app.detect_video(req).model_dump()
+
+
+class StubDetectionBackend(DetectionBackend):
+    """
+    Deterministic fake detections: the same image path always yields the same
+    objects. Object count, contour size and latency come from settings so
+    benchmarks can shape the workload.
+    """
+
+    name = "stub"
+    LABELS = ["person", "bottle", "chair", "cup", "laptop", "handbag"]
+
+    def __init__(self, objects: int = 3, points: int = 200, latency_ms: float = 0.0):
+        self.objects = objects
+        self.points = points
+        self.latency_ms = latency_ms
+
+    def detect(self, image_path, pil_img, params=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        # ROI requests get their own objects, placed inside the crop like the service would
+        roi = getattr(params, "roi", None) or [0.0, 0.0, 1.0, 1.0]
+        seed = int.from_bytes(hashlib.sha1(f"{image_path}{roi}".encode()).digest()[:4], "little")
+        rng = np.random.default_rng(seed)
+        rw, rh = roi[2] - roi[0], roi[3] - roi[1]
+
+        objects = []
+        for i in range(self.objects):
+            label = self.LABELS[(seed + i) % len(self.LABELS)]
+            score = round(float(rng.uniform(0.3, 0.99)), 4)
+            cx, cy = rng.uniform(0.25, 0.75, size=2) * (rw, rh) + roi[:2]
+            rx, ry = rng.uniform(0.05, 0.2, size=2) * (rw, rh)
+            contour = _ellipse(cx, cy, rx, ry, self.points)
+            objects.append({
+                "id": i,
+                "label": label,
+                "score": score,
+                "bbox": {"x1": cx - rx, "y1": cy - ry, "x2": cx + rx, "y2": cy + ry},
+                "contour": contour,
+            })
+            if params is not None and params.rle:
+                objects[-1]["mask_rle"] = _rasterize(contour, pil_img.size)
+
+        if params is not None:
+            objects = _apply_filters(objects, params)
+
+        return {"objects": objects, "params": None}
+
+    def detect_video(self, video_path, params):
+        """Objects drifting across the frame: contours on keyframes, translations between."""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Could not open video")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+
+        frames = list(range(0, frame_count, params.frame_stride))[:params.max_frames]
+        interval = params.keyframe_interval or settings.VIDEO_KEYFRAME_INTERVAL
+        keyframes = frames[::interval]
+        detected = self.detect(video_path, None)["objects"]
+
+        tracks = []
+        for obj in detected:
+            rng = np.random.default_rng(obj["id"])
+            vx, vy = rng.uniform(-0.002, 0.002, size=2)
+            track = {"id": obj["id"], "label": obj["label"], "score": obj["score"], "frames": []}
+            base = np.asarray(obj["contour"])
+            for n, frame in enumerate(frames):
+                key = frames[(n // interval) * interval]
+                dx, dy = vx * frame, vy * frame
+                b = obj["bbox"]
+                entry = {
+                    "frame": frame, "t": round(frame / fps, 4), "keyframe": frame == key,
+                    "bbox": {"x1": b["x1"] + dx, "y1": b["y1"] + dy, "x2": b["x2"] + dx, "y2": b["y2"] + dy},
+                }
+                if frame == key:
+                    entry["contour"] = (base + (dx, dy)).tolist()
+                else:
+                    entry["transform"] = [1.0, 0.0, 0.0, 1.0, vx * (frame - key), vy * (frame - key)]
+                track["frames"].append(entry)
+            tracks.append(track)
+
+        return {
+            "fps": fps, "frame_count": frame_count, "width": width, "height": height,
+            "processed_frames": len(frames), "frame_stride": params.frame_stride,
+            "keyframes": keyframes, "tracks": tracks, "timings_ms": {}, "params": None,
+        }
+
+
+def _ellipse(cx: float, cy: float, rx: float, ry: float, n: int) -> list:
+    """Closed, slightly wobbly ellipse with `n` normalized points."""
+    t = np.linspace(0, 2 * math.pi, n, endpoint=False)
+    wobble = 1 + 0.05 * np.sin(7 * t)
+    pts = np.stack([cx + rx * wobble * np.cos(t), cy + ry * wobble * np.sin(t)], axis=1)
+    return np.clip(pts, 0.0, 1.0).tolist()
+
+
+def _rasterize(contour: list, image_size) -> dict:
+    """RLE of a normalized polygon, drawn only over its own box."""
+    w, h = image_size
+    pts = np.asarray(contour) * (w, h)
+    x0, y0 = np.maximum(np.floor(pts.min(axis=0)).astype(int), 0)
+    x1, y1 = np.minimum(np.ceil(pts.max(axis=0)).astype(int) + 1, (w, h))
+    canvas = PILImage.new("1", (int(x1 - x0), int(y1 - y0)))
+    ImageDraw.Draw(canvas).polygon([tuple(p) for p in (pts - (x0, y0)).tolist()], fill=1)
+    return rle.encode_batch(np.asarray(canvas)[None], offset=(int(x0), int(y0)), size=(h, w))[0]
+
+
+def _apply_filters(objects: list, params: DetectionParams) -> list:
+    """Mimic the YOLO service's class/score/area/max_det filtering."""
+    if params.classes:
+        objects = [o for o in objects if o["label"] in params.classes]
+    if params.min_score is not None:
+        objects = [o for o in objects if o["score"] >= params.min_score]
+    if params.min_area:
+        objects = [
+            o for o in objects
+            if (o["bbox"]["x2"] - o["bbox"]["x1"]) * (o["bbox"]["y2"] - o["bbox"]["y1"]) >= params.min_area
+        ]
+    if params.max_det is not None:
+        objects = sorted(objects, key=lambda o: o["score"], reverse=True)[:params.max_det]
+    return objects
+
+
+def _share_image(pil_img: PILImage.Image, payload: dict) -> Optional[shared_memory.SharedMemory]:
+    """
+    Decode the image as RGB, pre-resized to at most YOLO_SHM_MAX_SIDE, into a
+    new shared-memory segment and describe it in `payload["shm"]`. The
+    original size goes along, so the service returns masks in its pixels.
+
+    Returns the segment (the caller must close + unlink it), or None if shared
+    memory is unavailable, in which case the path transport is used.
+    """
+    max_side = settings.YOLO_SHM_MAX_SIDE
+    w, h = pil_img.size
+    scale = min(1.0, max_side / max(w, h))
+    target = (max(1, round(w * scale)), max(1, round(h * scale)))
+
+    # JPEG can decode straight at a reduced DCT scale - much cheaper than resizing later
+    pil_img.draft("RGB", target)
+    rgb = pil_img.convert("RGB")
+    if rgb.size != target:
+        rgb = rgb.resize(target, PILImage.BILINEAR)
+    arr = np.asarray(rgb)
+
+    try:
+        shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    except OSError as e:
+        logger.warning("Shared memory unavailable, using path transport: %s", e)
+        return None
+
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+    payload["shm"] = {
+        "name": shm.name, "shape": list(arr.shape), "dtype": str(arr.dtype), "source_size": [h, w],
+    }
+    return shm
+
+
+@lru_cache(maxsize=1)
+def get_detection_backend() -> DetectionBackend:
+    """Build the backend selected in settings (once per process)."""
+    kind = settings.DETECTION_BACKEND
+    if kind == "http":
+        pool = YoloNodePool(
+            settings.YOLO_SERVICE_URLS or [settings.YOLO_SERVICE_URL],
+            health_interval=settings.YOLO_HEALTH_INTERVAL_S,
+            eject_seconds=settings.YOLO_EJECT_SECONDS,
+            max_failures=settings.YOLO_EJECT_FAILURES,
+            slow_factor=settings.YOLO_EJECT_SLOW_FACTOR,
+        )
+        return HttpDetectionBackend(
+            pool,
+            transport=settings.YOLO_TRANSPORT,
+            timeout=settings.YOLO_TIMEOUT_S,
+            hedge_after_ms=settings.YOLO_HEDGE_AFTER_MS,
+            max_in_flight=settings.DETECTION_MAX_CONCURRENCY,
+        )
+    if kind == "inprocess":
+        return InProcessDetectionBackend(settings.YOLO_SERVICE_DIR)
+    if kind == "stub":
+        return StubDetectionBackend(
+            objects=settings.STUB_DETECTION_OBJECTS,
+            points=settings.STUB_DETECTION_POINTS,
+            latency_ms=settings.STUB_DETECTION_LATENCY_MS,
+        )
+    raise ValueError(f"Unknown DETECTION_BACKEND: {kind!r}")
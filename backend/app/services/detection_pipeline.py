@@ -0,0 +1,131 @@
+"""
+    Background detection pipeline.
+
+    A small priority queue drained by worker threads. It is used to run
+    detection eagerly right after an upload so the studio's detect call is
+    usually a cache lookup. Jobs carry a priority (lower runs first) and are
+    de-duplicated per (image, params). The queue is bounded: when it is full,
+    low-priority (eager) work is dropped rather than allowed to build up.
+
+    Interactive requests don't go through this queue. They wait in the
+    detection limiter, and eager jobs only take a limiter slot when one is
+    free and nobody is queued, so interactive work always goes first.
+"""
+
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 5
+PRIORITY_EAGER = 10
+
+
+JobKey = Tuple[int, str]  # (image_id, params_key)
+
+
+class DetectionPipeline:
+    """Bounded priority queue of detection jobs with de-duplication."""
+
+    def __init__(self, run: Callable[[int, object], object], workers: int = 1, max_queue: int = 100):
+        self._run = run
+        self.workers = workers
+        self.max_queue = max_queue
+        self._heap = []
+        self._seq = itertools.count()
+        self._jobs: Dict[JobKey, Future] = {}    # queued or running
+        self._running: Dict[JobKey, Future] = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self.completed_total = 0
+        self.dropped_total = 0
+        self.failed_total = 0
+
+    def _ensure_started(self) -> None:
+        if not self._threads:
+            for n in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"detect-worker-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, image_id: int, params=None, params_key: str = "",
+               priority: int = PRIORITY_EAGER) -> Optional[Future]:
+        """
+        Queue a job; returns its Future, or None if it was dropped.
+
+        A job already queued or running for the same key is reused. When the
+        queue is full, a new job only gets in if it outranks the
+        lowest-priority queued job, which is then dropped.
+        """
+        key = (image_id, params_key)
+        with self._cond:
+            self._ensure_started()
+            if key in self._jobs:
+                return self._jobs[key]
+
+            if len(self._heap) >= self.max_queue:
+                worst = max(self._heap)
+                if worst[0] <= priority:
+                    self.dropped_total += 1
+                    return None
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                self._drop(worst)
+
+            future = Future()
+            self._jobs[key] = future
+            heapq.heappush(self._heap, (priority, next(self._seq), key, params, future))
+            self._cond.notify()
+            return future
+
+    def running(self, image_id: int, params_key: str = "") -> Optional[Future]:
+        """Future of a job for this key that a worker has already started, if any."""
+        with self._cond:
+            return self._running.get((image_id, params_key))
+
+    def _drop(self, entry) -> None:
+        _, _, key, _, future = entry
+        self._jobs.pop(key, None)
+        future.cancel()
+        self.dropped_total += 1
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, key, params, future = heapq.heappop(self._heap)
+                if not future.set_running_or_notify_cancel():
+                    self._jobs.pop(key, None)
+                    continue
+                self._running[key] = future
+
+            try:
+                result = self._run(key[0], params)
+            except Exception as e:
+                with self._cond:
+                    self.failed_total += 1
+                future.set_exception(e)
+            else:
+                with self._cond:
+                    self.completed_total += 1
+                future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running.pop(key, None)
+                    self._jobs.pop(key, None)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "running": len(self._running),
+                "max_queue": self.max_queue,
+                "completed_total": self.completed_total,
+                "dropped_total": self.dropped_total,
+                "failed_total": self.failed_total,
+            }
@@ -1,23 +1,39 @@
 """
     Object detection service.
 
-    Wraps the computer vision model (e.g. Detectron2) used to
-    automatically detect objects in an uploaded image and return
-    their coordinates and labels for use in the studio UI.
+    Wraps the computer vision model (YOLOv8 segmentation, reached through
+    a configurable `DetectionBackend`) used to automatically detect objects
+    in an uploaded image and return their coordinates and labels for use
+    in the studio UI.
 """
 
 
 import os
-import requests
+import json
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+import numpy as np
 from pathlib import Path
 from PIL import Image as PILImage
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Iterator, List, Optional
 
-from app.models import Image
-from app.schemas.hotspots import BBox, DetectedObject, DetectionResult
-
-
-YOLO_SERVICE_URL = "http://localhost:8002/detect"
+from app.config import settings
+from photo_contour_shared import rle, tracing
+from photo_contour_shared.metrics import REGISTRY, cache_result
+from app.db.base import SessionLocal
+from app.models import Image, Detection
+from app.schemas.hotspots import (
+    BBox, DetectedObject, DetectionParams, DetectionResult, RoiDetectionParams, RoiDetectRequest,
+)
+from app.services.admission import detection_slot
+from app.services.detection_backends import get_detection_backend
+from app.services.detection_pipeline import DetectionPipeline, PRIORITY_EAGER
 
 # # Basic Object detection
 # COCO_CLASSES = [
@@ -36,38 +52,249 @@ YOLO_SERVICE_URL = "http://localhost:8002/detect"
 # ]
 
 
-def run_yolo_detection(db: Session, image_id: int) -> DetectionResult:
-    """Run REAL YOLOv8 detection on the image."""
+def params_key(params: Optional[DetectionParams]) -> str:
+    """Canonical cache key for a parameter set ("" for the defaults)."""
+    if params is None:
+        return ""
+    fields = params.model_dump(exclude_none=True)
+    return json.dumps(fields, sort_keys=True, separators=(",", ":")) if fields else ""
+
+
+def parse_params_key(key: Optional[str]) -> Optional[DetectionParams]:
+    """
+    The parameter set for a `params_key` string (a JSON object of
+    DetectionParams fields), so GET routes can address non-default
+    detections. 422 if it isn't one.
+    """
+    if not key:
+        return None
+    try:
+        return DetectionParams.model_validate_json(key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid params_key: {e}")
+
+
+def get_stored_detection_json(db: Session, image_id: int, key: str = "") -> Optional[str]:
+    """Serialized stored detection for the image and parameter key, if any (not parsed)."""
+    return (
+        db.query(Detection.result_json)
+        .filter(Detection.image_id == image_id, Detection.params_key == key)
+        .scalar()
+    )
+
+
+def get_cached_detection(db: Session, image_id: int, key: str = "") -> Optional[DetectionResult]:
+    """Stored detection result for the image and parameter key, if any."""
+    stored = get_stored_detection_json(db, image_id, key)
+    if stored is None:
+        return None
+    return DetectionResult.model_validate_json(stored)
+
+
+async def get_cached_detection_async(db: AsyncSession, image_id: int, key: str = "") -> Optional[DetectionResult]:
+    """`get_cached_detection` on an async session."""
+    payload = (
+        await db.execute(
+            select(Detection.result_json)
+            .where(Detection.image_id == image_id, Detection.params_key == key)
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+    if payload is None:
+        return None
+    return DetectionResult.model_validate_json(payload)
+
+
+def store_detection(db: Session, result: DetectionResult, key: str = "") -> None:
+    """Insert or replace the stored detection for (image, params)."""
+    payload = result.model_dump_json()
+    row = (
+        db.query(Detection)
+        .filter(Detection.image_id == result.image_id, Detection.params_key == key)
+        .first()
+    )
+    if row is None:
+        db.add(Detection(image_id=result.image_id, params_key=key, result_json=payload))
+    else:
+        row.result_json = payload
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same detection concurrently - keep theirs
+        db.rollback()
+
+
+def select_images(
+    db: Session,
+    image_ids: Optional[List[int]] = None,
+    created_after: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[int]:
+    """Existing image ids from an explicit list, or all images matching the filter (oldest first)."""
+    query = db.query(Image.id)
+    if image_ids is not None:
+        query = query.filter(Image.id.in_(image_ids))
+    elif created_after is not None:
+        query = query.filter(Image.created_at > created_after)
+    query = query.order_by(Image.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [row.id for row in query]
+
+
+def cached_image_ids(db: Session, image_ids: List[int], key: str = "") -> set:
+    """Which of these images already have a stored detection for the key (chunked IN queries)."""
+    found = set()
+    for start in range(0, len(image_ids), 500):
+        chunk = image_ids[start:start + 500]
+        rows = db.query(Detection.image_id).filter(Detection.image_id.in_(chunk), Detection.params_key == key)
+        found.update(row.image_id for row in rows)
+    return found
+
+
+def _detect_isolated(image_id: int, params: Optional[DetectionParams], background: bool = False) -> DetectionResult:
+    """`run_yolo_detection` with its own session (for worker threads)."""
+    db = SessionLocal()
+    try:
+        return run_yolo_detection(db, image_id, params, background=background)
+    finally:
+        db.close()
+
+
+def detect_many(
+    image_ids: List[int],
+    params: Optional[DetectionParams] = None,
+    skip: Optional[set] = None,
+    concurrency: int = 2,
+    include_results: bool = False,
+) -> Iterator[dict]:
+    """
+    Detect many images with at most `concurrency` in flight, yielding one
+    status dict per image as it finishes (skipped ones first).
+
+    Each detection waits in the limiter's background lane: it starts only
+    when no interactive caller is queued, never takes the reserved slots
+    and doesn't use up the interactive queue, so bulk work queues behind -
+    not around - interactive traffic. Closing the iterator early (client
+    gone) cancels everything not yet started.
+    """
+    skip = skip or set()
+    for image_id in image_ids:
+        if image_id in skip:
+            yield {"image_id": image_id, "status": "skipped", "reason": "cached"}
+
+    todo = [image_id for image_id in image_ids if image_id not in skip]
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-detect")
+    try:
+        futures = {
+            executor.submit(tracing.wrap(_detect_isolated), image_id, params, True): image_id
+            for image_id in todo
+        }
+        for future in as_completed(futures):
+            image_id = futures[future]
+            try:
+                result = future.result()
+            except HTTPException as e:
+                yield {"image_id": image_id, "status": "error", "code": e.status_code, "detail": e.detail}
+                continue
+            except Exception as e:
+                yield {"image_id": image_id, "status": "error", "detail": str(e)}
+                continue
+            line = {"image_id": image_id, "status": "ok", "objects": len(result.objects)}
+            if include_results:
+                line["result"] = result.model_dump(mode="json")
+            yield line
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_yolo_detection(
+    db: Session,
+    image_id: int,
+    params: Optional[DetectionParams] = None,
+    use_cache: bool = True,
+    wait: bool = True,
+    background: bool = False,
+) -> DetectionResult:
+    """
+    Run REAL YOLOv8 detection on the image.
+
+    `params` lets the caller pick a quality tier or latency budget; the YOLO
+    service chooses the inference size and reports what it used.
+
+    Results are stored per (image, params). With `use_cache` a stored result
+    is returned directly, and if a background job is already detecting the
+    same image we wait for it instead of running a second inference.
+    `wait=False` fails fast with 503 instead of queueing for a slot, and
+    never blocks on a running background job. `background=True` waits in the limiter's low-priority lane instead of
+    the interactive queue.
+    """
+    key = params_key(params)
+    with tracing.span("detection", image_id=image_id, params_key=key) as span:
+        if use_cache:
+            cached = get_cached_detection(db, image_id, key)
+            cache_result("detection", cached is not None)
+            if span is not None:
+                span.set("cache_hit", cached is not None)
+            if cached is not None:
+                return cached
+
+            # Pipeline workers call with wait=False - they would find their own job here
+            running = pipeline.running(image_id, key) if wait else None
+            if running is not None:
+                try:
+                    return running.result(timeout=settings.YOLO_TIMEOUT_S)
+                except Exception:
+                    pass  # fall through and detect ourselves
+
+        result = _detect(db, image_id, params, wait, background)
+        store_detection(db, result, key)
+        return result
+
+
+async def run_yolo_detection_async(
+    db: AsyncSession,
+    image_id: int,
+    params: Optional[DetectionParams] = None,
+) -> DetectionResult:
+    """
+    `run_yolo_detection` for async routes.
+
+    The stored-result lookup - the common case after eager detection -
+    awaits the async session, so a cache hit never takes a threadpool
+    thread. Only a miss hands off to a worker thread (with its own sync
+    session) for the blocking inference.
+    """
+    key = params_key(params)
+    with tracing.span("detection.lookup", image_id=image_id, params_key=key):
+        cached = await get_cached_detection_async(db, image_id, key)
+    if cached is not None:
+        cache_result("detection", True)
+        return cached
+    return await run_in_threadpool(_detect_isolated, image_id, params)
+
+
+def _detect(db: Session, image_id: int, params: Optional[DetectionParams], wait: bool,
+            background: bool = False) -> DetectionResult:
+    """Run the detection backend on one image."""
     image = db.query(Image).filter(Image.id == image_id).first()
     if image is None:
         raise ValueError("Image not found")
     
     abs_filepath = os.path.abspath(image.filepath)
     
-    correct_filepath = image.filepath.replace("app/static/uploads/", "static/uploads/")
-    
-    print(f"🔍 Original: {image.filepath}")
-    print(f"🔍 Corrected: {correct_filepath}")
-    print(f"🔍 Absolute: {abs_filepath}")
-    
     if not Path(abs_filepath).exists():  # Also fix this check!
         raise ValueError(f"Absolute image file not found: {abs_filepath}")
     
     # Get image dimensions from file
-    pil_img = PILImage.open(abs_filepath)
-    img_width, img_height = pil_img.size
-    
-    # Run YOLOv8 inference
-    payload = {"image_path": abs_filepath}
-    try:
-        resp = requests.post(YOLO_SERVICE_URL, json=payload, timeout=30)
-    except requests.RequestException as e:
-        raise RuntimeError(f"YOLO service unreachable: {e}")
-
-    if resp.status_code != 200:
-        raise RuntimeError(f"YOLO service error: {resp.status_code} {resp.text}")
+    with tracing.span("detection.open_image"):
+        pil_img = PILImage.open(abs_filepath)
+        img_width, img_height = pil_img.size
     
-    data = resp.json()
+    # Run YOLOv8 inference (HTTP service, in-process model or stub - see settings),
+    # behind the concurrency limiter and circuit breaker
+    with detection_slot(wait=wait, background=background):
+        data = get_detection_backend().detect(abs_filepath, pil_img, params)
 
     objects = [
         DetectedObject(
@@ -75,9 +302,132 @@ def run_yolo_detection(db: Session, image_id: int) -> DetectionResult:
             label=o["label"],
             score=o["score"],
             bbox=BBox(**o["bbox"]),
-            contour=o.get("contour", [])
+            contour=o.get("contour", []),
+            polygons=o.get("polygons"),
+            mask_rle=o.get("mask_rle"),
         )
         for o in data["objects"]
     ]
 
-    return DetectionResult(image_id=image_id, objects=objects, width=img_width, height=img_height)
\ No newline at end of file
+    return DetectionResult(
+        image_id=image_id,
+        objects=objects,
+        width=img_width,
+        height=img_height,
+        params=data.get("params"),
+    )
+
+
+def detect_roi(db: Session, image_id: int, request: RoiDetectRequest) -> DetectionResult:
+    """
+    Re-detect inside a region and merge the new objects into the stored result.
+
+    The full-image detection for `request.params` (cached, or run now) is
+    the base. Only the ROI crop goes through the model, optionally at a
+    larger `imgsz` so small objects resolve. Each new object replaces the
+    same-label base object it overlaps by at least `iou_threshold` (keeping
+    its id, so existing hotspots stay bound) or is appended with a new id.
+    """
+    roi = request.roi
+    if not (0 <= roi.x1 < roi.x2 <= 1 and 0 <= roi.y1 < roi.y2 <= 1):
+        raise HTTPException(status_code=422, detail="ROI must be normalized with x1 < x2 and y1 < y2")
+
+    key = params_key(request.params)
+    base = run_yolo_detection(db, image_id, request.params)
+
+    fields = request.params.model_dump(exclude_none=True) if request.params is not None else {}
+    roi_params = RoiDetectionParams(**fields, roi=[roi.x1, roi.y1, roi.x2, roi.y2], imgsz=request.imgsz)
+    with tracing.span("detection.roi", image_id=image_id, imgsz=request.imgsz):
+        try:
+            found = _detect(db, image_id, roi_params, wait=True)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    merged = base.model_copy(update={
+        "objects": merge_objects(base.objects, found.objects, (roi.x1, roi.y1, roi.x2, roi.y2),
+                                 request.iou_threshold),
+    })
+    store_detection(db, merged, key)
+    return merged
+
+
+def _box_overlap(boxes, box):
+    """Intersection areas and IoUs of `box` against an (n, 4) array of boxes."""
+    ix = np.clip(np.minimum(boxes[:, 2], box[2]) - np.maximum(boxes[:, 0], box[0]), 0, None)
+    iy = np.clip(np.minimum(boxes[:, 3], box[3]) - np.maximum(boxes[:, 1], box[1]), 0, None)
+    inter = ix * iy
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    own = (box[2] - box[0]) * (box[3] - box[1])
+    return inter, inter / np.maximum(areas + own - inter, 1e-12)
+
+
+def merge_objects(existing, found, roi, iou_threshold: float = 0.5, edge_eps: float = 1e-3):
+    """
+    Merge ROI detections into an object list (IoU dedupe per label).
+
+    New objects cut by an ROI edge that lies inside the image are
+    truncated views of something larger; if a base object of the same
+    label already covers most of one, it is dropped rather than added.
+    """
+    objects = list(existing)
+    next_id = max((o.id for o in objects), default=-1) + 1
+    for obj in found:
+        box = np.array([obj.bbox.x1, obj.bbox.y1, obj.bbox.x2, obj.bbox.y2])
+        same = [i for i, o in enumerate(objects) if o.label == obj.label]
+        if same:
+            boxes = np.array([[objects[i].bbox.x1, objects[i].bbox.y1, objects[i].bbox.x2, objects[i].bbox.y2]
+                              for i in same])
+            inter, iou = _box_overlap(boxes, box)
+            best = int(np.argmax(iou))
+            match, candidate = iou[best], objects[same[best]]
+            if match > 0 and obj.mask_rle is not None and candidate.mask_rle is not None:
+                # Boxes overstate the overlap of thin or hollow shapes; masks don't
+                match = rle.iou(obj.mask_rle.model_dump(), candidate.mask_rle.model_dump())
+            if match >= iou_threshold:
+                objects[same[best]] = obj.model_copy(update={"id": candidate.id})
+                continue
+
+            clipped = (
+                (roi[0] > 0 and box[0] <= roi[0] + edge_eps) or (roi[1] > 0 and box[1] <= roi[1] + edge_eps)
+                or (roi[2] < 1 and box[2] >= roi[2] - edge_eps) or (roi[3] < 1 and box[3] >= roi[3] - edge_eps)
+            )
+            own = max((box[2] - box[0]) * (box[3] - box[1]), 1e-12)
+            if clipped and inter.max() / own >= 0.5:
+                continue
+
+        objects.append(obj.model_copy(update={"id": next_id}))
+        next_id += 1
+    return objects
+
+
+def _run_background(image_id: int, params: Optional[DetectionParams]) -> DetectionResult:
+    """Pipeline worker: detect (or reuse the cached result) with a fresh session."""
+    db = SessionLocal()
+    try:
+        # Background work never queues for a slot - it is dropped under load
+        with tracing.span("detection.background", image_id=image_id):
+            return run_yolo_detection(db, image_id, params, wait=False)
+    finally:
+        db.close()
+
+
+pipeline = DetectionPipeline(
+    run=_run_background,
+    workers=settings.DETECTION_WORKERS,
+    max_queue=settings.DETECTION_BACKLOG,
+)
+
+
+REGISTRY.gauge(
+    "detection_pipeline", "Background detection queue state and totals", ("field",),
+    callback=lambda: {(k,): v for k, v in pipeline.snapshot().items()},
+)
+
+
+def enqueue_detection(
+    image_id: int,
+    params: Optional[DetectionParams] = None,
+    priority: int = PRIORITY_EAGER,
+) -> Optional[Future]:
+    """Schedule background detection; returns None if the job was dropped."""
+    return pipeline.submit(image_id, params, params_key(params), priority)
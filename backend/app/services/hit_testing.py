@@ -0,0 +1,289 @@
+"""
+    Hit-testing over detected objects.
+
+    Answers "which objects are under this point / inside this rectangle or
+    lasso" on the server, from a spatial index built once per detection
+    result. Object bounding boxes are bucketed into a uniform grid, so a
+    query only looks at objects whose box overlaps the cells it touches;
+    the survivors are then tested exactly against their contours with
+    vectorized (numpy) even-odd ray casting and segment intersection.
+
+    Indexes are cached per image and detection parameters, keyed on a
+    digest of the stored detection row: a query reads and hashes the
+    stored JSON and only parses it and looks up (or builds) an index when
+    it changed, so a re-detected image never answers from a stale index.
+    Built indexes are shared by object geometry. All coordinates are normalized (0-1), like the contours.
+    Objects that carry an RLE mask are point-tested against the mask
+    itself (a binary search over its runs) instead of the polygon.
+"""
+
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from photo_contour_shared import rle
+from photo_contour_shared.metrics import cache_result
+from app.schemas.hotspots import (
+    DetectionParams, DetectionResult, HitTestObject, HitTestResponse, SelectionRequest,
+)
+from app.services import detection_service
+from app.services.path_encoding import geometry_digest, object_rings
+
+
+def _ring_edges(ring: Sequence[Sequence[float]]) -> np.ndarray:
+    """(n, 4) array of closed-ring edges as x1, y1, x2, y2."""
+    pts = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 3:
+        return np.empty((0, 4))
+    return np.hstack([pts, np.roll(pts, -1, axis=0)])
+
+
+def crossings_parity(points: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Even-odd point-in-polygon for many points against one edge set.
+
+    `edges` may hold several rings (parts and holes together): a point is
+    inside when a ray to +x crosses an odd number of edges.
+    """
+    inside = np.zeros(len(points), dtype=bool)
+    if len(edges) == 0 or len(points) == 0:
+        return inside
+    x1, y1, x2, y2 = (edges[:, i] for i in range(4))
+    dy = np.where(y2 == y1, np.inf, y2 - y1)
+    # Blocks of points keep the (points x edges) temporaries small
+    for start in range(0, len(points), 256):
+        px = points[start:start + 256, 0:1]
+        py = points[start:start + 256, 1:2]
+        straddles = (y1 > py) != (y2 > py)
+        x_at = x1 + (py - y1) * (x2 - x1) / dy
+        inside[start:start + 256] = np.count_nonzero(straddles & (px < x_at), axis=1) % 2 == 1
+    return inside
+
+
+def edges_intersect(a: np.ndarray, b: np.ndarray) -> bool:
+    """Whether any segment of edge set `a` properly crosses one of `b`."""
+    if len(a) == 0 or len(b) == 0:
+        return False
+    bx1, by1, bx2, by2 = (b[:, i] for i in range(4))
+    for start in range(0, len(a), 256):
+        chunk = a[start:start + 256]
+        ax1, ay1, ax2, ay2 = (chunk[:, i:i + 1] for i in range(4))
+        d1 = (bx2 - bx1) * (ay1 - by1) - (by2 - by1) * (ax1 - bx1)
+        d2 = (bx2 - bx1) * (ay2 - by1) - (by2 - by1) * (ax2 - bx1)
+        d3 = (ax2 - ax1) * (by1 - ay1) - (ay2 - ay1) * (bx1 - ax1)
+        d4 = (ax2 - ax1) * (by2 - ay1) - (ay2 - ay1) * (bx2 - ax1)
+        if np.any((d1 * d2 < 0) & (d3 * d4 < 0)):
+            return True
+    return False
+
+
+class SpatialIndex:
+    """Uniform grid over object bounding boxes plus per-object edge arrays."""
+
+    def __init__(self, result: DetectionResult):
+        self.objects = result.objects
+        boxes, self.edges, self.vertices = [], [], []
+        self.masks = [obj.mask_rle.model_dump() if obj.mask_rle is not None else None for obj in result.objects]
+        for obj in result.objects:
+            edges = [_ring_edges(ring) for ring in object_rings(obj)]
+            self.edges.append(np.vstack(edges) if edges else np.empty((0, 4)))
+            self.vertices.append(self.edges[-1][:, :2])
+            boxes.append((obj.bbox.x1, obj.bbox.y1, obj.bbox.x2, obj.bbox.y2))
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.areas = (self.boxes[:, 2] - self.boxes[:, 0]) * (self.boxes[:, 3] - self.boxes[:, 1])
+
+        # About two objects per cell on average, within sane bounds
+        self.size = max(1, min(64, math.ceil(math.sqrt(len(self.objects) / 2))))
+        members = [[[] for _ in range(self.size)] for _ in range(self.size)]
+        for i, (x1, y1, x2, y2) in enumerate(self.boxes):
+            for cy in range(self._cell(y1), self._cell(y2) + 1):
+                for cx in range(self._cell(x1), self._cell(x2) + 1):
+                    members[cy][cx].append(i)
+        self.cells = [[np.asarray(m, dtype=np.intp) for m in row] for row in members]
+
+    def _cell(self, v: float) -> int:
+        return min(self.size - 1, max(0, int(v * self.size)))
+
+    def _candidates(self, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+        """Objects whose bbox overlaps the query box (grid lookup, then exact box test)."""
+        cx1, cy1, cx2, cy2 = self._cell(x1), self._cell(y1), self._cell(x2), self._cell(y2)
+        found = [self.cells[cy][cx] for cy in range(cy1, cy2 + 1) for cx in range(cx1, cx2 + 1)]
+        idx = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+        b = self.boxes[idx]
+        keep = (b[:, 0] <= x2) & (b[:, 2] >= x1) & (b[:, 1] <= y2) & (b[:, 3] >= y1)
+        return idx[keep]
+
+    def _ordered(self, idx) -> List[int]:
+        # Smallest first: on overlap, the innermost object is the one meant
+        idx = sorted(idx, key=lambda i: self.areas[i])
+        return [self.objects[i].id for i in idx]
+
+    def hit(self, x: float, y: float) -> List[int]:
+        """Ids of the objects containing the point, smallest first."""
+        point = np.array([[x, y]])
+        hits = []
+        for i in self._candidates(x, y, x, y):
+            mask = self.masks[i]
+            if mask is not None:
+                h, w = mask["size"]
+                inside = rle.contains(mask, int(x * w), int(y * h))
+            else:
+                inside = crossings_parity(point, self.edges[i])[0]
+            if inside:
+                hits.append(i)
+        return self._ordered(hits)
+
+    def select_polygon(self, polygon: Sequence[Sequence[float]], contains: bool = False) -> List[int]:
+        """
+        Ids of the objects touching (or, with `contains`, lying entirely
+        inside) a selection polygon - a rectangle or a free-hand lasso.
+        """
+        ring = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        sel_edges = _ring_edges(ring)
+        if len(sel_edges) == 0:
+            return []
+        (x1, y1), (x2, y2) = ring.min(axis=0), ring.max(axis=0)
+
+        hits = []
+        for i in self._candidates(x1, y1, x2, y2):
+            if len(self.edges[i]) == 0:
+                continue
+            vertices_in = crossings_parity(self.vertices[i], sel_edges)
+            crossing = edges_intersect(self.edges[i], sel_edges)
+            if contains:
+                if vertices_in.all() and not crossing:
+                    hits.append(i)
+            elif (
+                vertices_in.any()
+                or crossing
+                or crossings_parity(ring[:1], self.edges[i])[0]   # selection inside the object
+            ):
+                hits.append(i)
+        return self._ordered(hits)
+
+
+# LRU of built indexes: (image, params key, geometry) -> SpatialIndex
+_index_cache: "OrderedDict[tuple, SpatialIndex]" = OrderedDict()
+# Last index served per stored detection: (image, params key) -> (row digest, result, index)
+_loaded: "OrderedDict[tuple, tuple]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _index_key(result: DetectionResult, key: str) -> tuple:
+    geometry = tuple(
+        (o.id, o.bbox.x1, o.bbox.y1, o.bbox.x2, o.bbox.y2, geometry_digest(o)) for o in result.objects
+    )
+    return (result.image_id, key, geometry)
+
+
+def _trim(cache: OrderedDict) -> None:
+    while len(cache) > settings.HIT_TEST_INDEX_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def get_index(result: DetectionResult, key: str = "") -> SpatialIndex:
+    """The spatial index for a detection result, built on first use."""
+    cache_key = _index_key(result, key)
+    with _index_cache_lock:
+        index = _index_cache.get(cache_key)
+        if index is not None:
+            _index_cache.move_to_end(cache_key)
+    cache_result("hit_test_index", index is not None)
+    if index is None:
+        index = SpatialIndex(result)
+        with _index_cache_lock:
+            _index_cache[cache_key] = index
+            _trim(_index_cache)
+    return index
+
+
+def _row_digest(result_json: str) -> bytes:
+    return hashlib.blake2b(result_json.encode(), digest_size=16).digest()
+
+
+def _load(db: Session, image_id: int, params: Optional[DetectionParams]) -> Tuple[DetectionResult, SpatialIndex]:
+    """
+    The detection result and its index for an image.
+
+    While the stored row is unchanged, repeated queries reuse the parsed
+    result and index; only a missing row runs detection.
+    """
+    key = detection_service.params_key(params)
+    slot = (image_id, key)
+    stored = detection_service.get_stored_detection_json(db, image_id, key)
+    if stored is None:
+        result = detection_service.run_yolo_detection(db, image_id, params)
+        digest = _row_digest(result.model_dump_json())   # what store_detection wrote
+    else:
+        cache_result("detection", True)
+        digest = _row_digest(stored)
+        with _index_cache_lock:
+            entry = _loaded.get(slot)
+            fresh = entry is not None and entry[0] == digest
+            if fresh:
+                _loaded.move_to_end(slot)
+        if fresh:
+            cache_result("hit_test_index", True)
+            return entry[1], entry[2]
+        result = DetectionResult.model_validate_json(stored)
+
+    index = get_index(result, key)
+    with _index_cache_lock:
+        _loaded[slot] = (digest, result, index)
+        _loaded.move_to_end(slot)
+        _trim(_loaded)
+    return result, index
+
+
+def _to_normalized(points: Sequence[Sequence[float]], result: DetectionResult, normalized: bool) -> List[List[float]]:
+    """Query points in index space (pixel input is scaled by the image size)."""
+    if normalized:
+        return [[float(x), float(y)] for x, y in points]
+    if not result.width or not result.height:
+        raise HTTPException(status_code=422, detail="Image size unknown; send normalized coordinates")
+    return [[x / result.width, y / result.height] for x, y in points]
+
+
+def _response(result: DetectionResult, ids: List[int]) -> HitTestResponse:
+    by_id = {o.id: o for o in result.objects}
+    return HitTestResponse(
+        image_id=result.image_id,
+        objects=[HitTestObject(id=i, label=by_id[i].label, score=by_id[i].score) for i in ids],
+    )
+
+
+def hit_test(
+    db: Session,
+    image_id: int,
+    x: float,
+    y: float,
+    normalized: bool = False,
+    params: Optional[DetectionParams] = None,
+) -> HitTestResponse:
+    """Objects under the point (x, y), smallest first."""
+    result, index = _load(db, image_id, params)
+    (x, y), = _to_normalized([(x, y)], result, normalized)
+    return _response(result, index.hit(x, y))
+
+
+def select_objects(db: Session, image_id: int, request: SelectionRequest) -> HitTestResponse:
+    """Objects touched by (or, in "contains" mode, inside) a rectangle or lasso."""
+    if (request.rect is None) == (request.lasso is None):
+        raise HTTPException(status_code=422, detail="Give exactly one of `rect` or `lasso`")
+    if request.rect is not None:
+        r = request.rect
+        polygon = [[r.x1, r.y1], [r.x2, r.y1], [r.x2, r.y2], [r.x1, r.y2]]
+    else:
+        polygon = request.lasso
+
+    result, index = _load(db, image_id, request.params)
+    polygon = _to_normalized(polygon, result, request.normalized)
+    return _response(result, index.select_polygon(polygon, contains=request.mode == "contains"))
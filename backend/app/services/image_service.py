@@ -3,15 +3,23 @@
 
     Provides high-level operations for saving uploaded image files,
     loading them from storage, and updating related database records.
+    The `*_async` variants run the same queries on an AsyncSession.
 """
 
 
 import os
+import multiprocessing
+import threading
+import zipfile
 import cv2
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from app.config import settings
 from app import models, schemas
@@ -115,6 +123,141 @@ def save_uploaded_image(db: Session, file_path: str, filename: str) -> models.Im
     return db_image
 
 
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+
+def iter_upload_entries(files: Iterable) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    Flatten uploaded files and zip archives into (filename, stream, reason).
+
+    `stream` is a readable file object (a zip entry is decompressed as it
+    is read, never held in memory) or None when the entry is rejected, in
+    which case `reason` says why. Names are reduced to their basename so
+    archive paths can't escape the upload directory.
+    """
+    max_bytes = settings.BULK_MAX_FILE_MB * 1024 * 1024
+    for upload in files:
+        name = os.path.basename(upload.filename or "")
+        if name.lower().endswith(".zip") or upload.content_type in ZIP_CONTENT_TYPES:
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                yield name, None, "Not a valid zip archive"
+                continue
+            with archive:
+                for info in archive.infolist():
+                    entry = os.path.basename(info.filename)
+                    if info.is_dir() or not entry or entry.startswith(".") or "__MACOSX" in info.filename:
+                        continue
+                    if Path(entry).suffix.lower() not in IMAGE_EXTENSIONS:
+                        yield entry, None, "Not an image file"
+                    elif info.file_size > max_bytes:
+                        yield entry, None, f"File is larger than {settings.BULK_MAX_FILE_MB:g} MB"
+                    else:
+                        with archive.open(info) as stream:
+                            yield entry, stream, None
+        elif not (upload.content_type or "").startswith("image/"):
+            yield name, None, "File must be an image"
+        elif upload.size is not None and upload.size > max_bytes:
+            yield name, None, f"File is larger than {settings.BULK_MAX_FILE_MB:g} MB"
+        else:
+            yield name, upload.file, None
+
+
+def inspect_image(filepath: str) -> Tuple[bool, str, int, int]:
+    """Quality check plus dimensions in one call (runs in the bulk worker processes)."""
+    passed, reason = check_image_quality(filepath)
+    width, height = 0, 0
+    if passed:
+        with Image.open(filepath) as img:
+            width, height = img.size
+    return passed, reason, width, height
+
+
+_quality_pool: Optional[ProcessPoolExecutor] = None
+_quality_pool_lock = threading.Lock()
+
+
+def _get_quality_pool() -> ProcessPoolExecutor:
+    global _quality_pool
+    with _quality_pool_lock:
+        if _quality_pool is None:
+            # "spawn": forking a process that already runs worker threads is unsafe
+            _quality_pool = ProcessPoolExecutor(
+                max_workers=settings.BULK_QUALITY_WORKERS or None,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _quality_pool
+
+
+def inspect_images(filepaths: Sequence[str]) -> List[Tuple[bool, str, int, int]]:
+    """
+    Decode + blur/resolution checks for many files in the process pool.
+
+    Results come back in input order; a file that crashes its check is
+    reported as rejected rather than failing the batch.
+    """
+    if not filepaths:
+        return []
+    pool = _get_quality_pool()
+    futures = [pool.submit(inspect_image, path) for path in filepaths]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append((False, f"Could not process image: {e}", 0, 0))
+    return results
+
+
+def save_uploaded_images(db: Session, entries: Sequence[Tuple[str, str, int, int]]) -> List[models.Image]:
+    """
+    Insert many (file_path, filename, width, height) records in one transaction.
+
+    Either every record is stored or none is.
+    """
+    images = [
+        models.Image(filename=filename, filepath=file_path, width=width, height=height)
+        for file_path, filename, width, height in entries
+    ]
+    db.add_all(images)
+    try:
+        db.flush()
+        ids = [image.id for image in images]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # Reload the expired rows in a few IN queries instead of one refresh per image
+    for start in range(0, len(ids), 500):
+        db.query(models.Image).filter(models.Image.id.in_(ids[start:start + 500])).all()
+    return images
+
+
 def get_image_by_id(db: Session, image_id: int) -> models.Image:
     """Get image by ID."""
-    return db.query(models.Image).filter(models.Image.id == image_id).first()
\ No newline at end of file
+    return db.query(models.Image).filter(models.Image.id == image_id).first()
+
+
+# ── Async queries (AsyncSession) ──────────────────────────────────────────────
+
+async def save_uploaded_image_async(
+    db: AsyncSession, file_path: str, filename: str, width: int, height: int,
+) -> models.Image:
+    """Create the Image record for an already-validated upload."""
+    db_image = models.Image(filename=filename, filepath=file_path, width=width, height=height)
+    db.add(db_image)
+    await db.commit()
+    await db.refresh(db_image)
+    return db_image
+
+
+async def get_image_by_id_async(db: AsyncSession, image_id: int) -> Optional[models.Image]:
+    """Get image by ID."""
+    return await db.get(models.Image, image_id)
+
+
+async def list_images_async(db: AsyncSession) -> List[models.Image]:
+    """All images."""
+    return list((await db.execute(select(models.Image))).scalars())
@@ -8,16 +8,33 @@
 
 
 import base64
+import gzip
+import json
+import logging
+import re
+import threading
+import zipfile
+from collections import OrderedDict
 from pathlib import Path
+from typing import Iterator, List, Optional
 from PIL import Image as PilImage
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
+from app.config import settings
+from app.core.compression import compress
+from photo_contour_shared import tracing
+from photo_contour_shared.metrics import REGISTRY, cache_result, timed
+from app.core.zipstream import Entry
+from app.db.base import SessionLocal
 from app.models import Image
-from app.schemas.hotspots import HotspotCreate, SvgResponse
-from app.services import detection_service
+from app.schemas.hotspots import DetectedObject, DetectionResult, HotspotCreate, SvgResponse
+from app.services import detection_service, svg_template
+from app.services.path_encoding import encode_rings, geometry_digest, object_rings
 
 
+logger = logging.getLogger(__name__)
+
 
 # def _image_to_base64(filepath: str) -> tuple[str, int, int]:
 #     """Convert image file to data URI + dimensions."""
@@ -31,10 +48,129 @@ from app.services import detection_service
 #     return f"data:{mime};base64,{data}", w, h
 
 
+class RenderedSvg:
+    """
+    A rendered SVG document plus its compressed forms.
+
+    Compressed bodies are produced on first use and kept with the cache
+    entry, so repeated downloads of the same render never recompress.
+    `nbytes` counts the document and every compressed copy.
+    """
+
+    __slots__ = ("svg", "nbytes", "_encoded", "_lock", "_cache_key", "_charged")
+
+    def __init__(self, svg: str):
+        self.svg = svg
+        self.nbytes = len(svg)  # base64 and markup: ASCII apart from user text
+        self._encoded = {}
+        self._lock = threading.Lock()
+        self._cache_key = None  # set by the render cache; `_charged` is what it accounted
+        self._charged = 0
+
+    def encoded(self, encoding: str) -> bytes:
+        """The document compressed with "gzip" or "br" (computed once)."""
+        with self._lock:
+            body = self._encoded.get(encoding)
+            if body is not None:
+                return body
+            body = self._encoded[encoding] = compress(
+                self.svg.encode("utf-8"),
+                encoding,
+                gzip_level=settings.SVG_PRECOMPRESS_LEVEL,
+                brotli_quality=settings.SVG_PRECOMPRESS_LEVEL,
+            )
+            self.nbytes += len(body)
+        _cache_resized(self)
+        return body
+
+
+# LRU of recent renders: (image, object geometry, text, link, colour, theme, layout) -> RenderedSvg.
+# Bounded by entry count and by total bytes (documents embed the base64 image, and
+# each entry grows by its gzip/brotli copies after insertion).
+_render_cache: "OrderedDict[tuple, RenderedSvg]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+_render_cache_bytes = 0
+
+
+def _render_key(image: Image, obj: DetectedObject, w, h, hotspot: HotspotCreate) -> tuple:
+    # Object geometry goes into the key so a changed detection never serves a stale render
+    geometry = (obj.label, obj.bbox.x1, obj.bbox.y1, obj.bbox.x2, obj.bbox.y2, geometry_digest(obj))
+    return (
+        image.id, image.filepath, w, h, geometry,
+        hotspot.text, hotspot.link, hotspot.color, hotspot.theme, hotspot.layout,
+    )
+
+
+def _cache_get(key: tuple) -> Optional[RenderedSvg]:
+    with _render_cache_lock:
+        rendered = _render_cache.get(key)
+        if rendered is not None:
+            _render_cache.move_to_end(key)
+        return rendered
+
+
+def _cache_evict() -> None:
+    """Drop least recently used renders until both bounds hold (call with the lock held)."""
+    global _render_cache_bytes
+    max_bytes = settings.SVG_RENDER_CACHE_MAX_MB * 1024 * 1024
+    while _render_cache and (
+        len(_render_cache) > settings.SVG_RENDER_CACHE_SIZE or _render_cache_bytes > max_bytes
+    ):
+        _, evicted = _render_cache.popitem(last=False)
+        _render_cache_bytes -= evicted._charged
+        evicted._cache_key = None
+
+
+def _cache_put(key: tuple, rendered: RenderedSvg) -> None:
+    global _render_cache_bytes
+    with _render_cache_lock:
+        previous = _render_cache.pop(key, None)
+        if previous is not None:
+            _render_cache_bytes -= previous._charged
+            previous._cache_key = None
+        rendered._cache_key = key
+        rendered._charged = rendered.nbytes
+        _render_cache[key] = rendered
+        _render_cache_bytes += rendered._charged
+        _cache_evict()
+
+
+def _cache_resized(rendered: RenderedSvg) -> None:
+    """Charge a cached render for copies added after insertion (no-op once evicted)."""
+    global _render_cache_bytes
+    with _render_cache_lock:
+        if rendered._cache_key is None or _render_cache.get(rendered._cache_key) is not rendered:
+            return
+        _render_cache_bytes += rendered.nbytes - rendered._charged
+        rendered._charged = rendered.nbytes
+        _cache_evict()
+
+
+def _cache_clear() -> None:
+    global _render_cache_bytes
+    with _render_cache_lock:
+        for rendered in _render_cache.values():
+            rendered._cache_key = None
+        _render_cache.clear()
+        _render_cache_bytes = 0
+
+
+REGISTRY.gauge(
+    "svg_render_cache", "SVG render cache occupancy", ("field",),
+    callback=lambda: {("entries",): len(_render_cache), ("bytes",): _render_cache_bytes},
+)
+
+
 def generate_interactive_svg(
     db: Session,
     hotspot: HotspotCreate,
 ) -> SvgResponse:
+    rendered = render_svg(db, hotspot)
+    return SvgResponse(image_id=hotspot.image_id, svg=rendered.svg, preview_url=f"/images/{hotspot.image_id}/file")
+
+
+def render_svg(db: Session, hotspot: HotspotCreate) -> RenderedSvg:
+    """Render (or fetch from the render cache) the interactive SVG for a hotspot."""
     image = db.query(Image).filter(Image.id == hotspot.image_id).first()
     detection_result = detection_service.run_yolo_detection(db, hotspot.image_id)
     
@@ -43,180 +179,158 @@ def generate_interactive_svg(
         raise HTTPException(status_code=404, detail="Image or object not found")
     
     w, h = detection_result.width, detection_result.height
-    
-    # Build contour path (normalized → pixel coords)
-    contour_points = obj.contour
-    scaled_points = [(x * w, y * h) for x, y in contour_points]
-    path_data = "M " + " ".join([f"{x:.1f},{y:.1f}" for x, y in scaled_points]) + " Z"
-    
-    print("Image size:", w, h)
-    print("First 5 contour points (raw):", contour_points[:5])
-    print("First 5 contour points (scaled):", scaled_points[:5])
-    
-    # ✅ FIXED: User-controlled styling (not system colors)
-    # User picks color via frontend or defaults to professional blue
-    stroke_color = hotspot.color or "#3b82f6"  # Blue (tailwind-blue-500)
-    
-    # Embed image
+
+    key = _render_key(image, obj, w, h, hotspot)
+    rendered = _cache_get(key)
+    cache_result("svg_render", rendered is not None)
+    if rendered is None:
+        with timed("svg_render"), tracing.span("svg.render", object_id=obj.id):
+            rendered = RenderedSvg(_build_svg(image, obj, w, h, hotspot))
+        _cache_put(key, rendered)
+    return rendered
+
+
+def safe_filename(text: str, limit: int = 40) -> str:
+    """`text` reduced to a short [A-Za-z0-9_-] slug for file names."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", text)[:limit] or "object"
+
+
+def export_svgs(hotspots: List[HotspotCreate], format: str = "svg") -> Iterator[Entry]:
+    """
+    Zip entries for many hotspots, rendered one image at a time.
+
+    Specs are grouped by image, so each image is detected (or read from
+    the detection cache) and base64-encoded once however many objects it
+    exports. Renders already in the render cache are reused, but new
+    ones are not added to it - a large export would only evict the
+    interactive working set. Detection waits in the limiter's background
+    lane, so a bulk export never queues ahead of interactive requests.
+    Failures don't abort the archive; they are listed in a trailing
+    `manifest.json` next to the exported files.
+    """
+    groups: "OrderedDict[int, List[HotspotCreate]]" = OrderedDict()
+    for hotspot in hotspots:
+        groups.setdefault(hotspot.image_id, []).append(hotspot)
+
+    manifest = {"files": [], "errors": []}
+    names = set()
+    db = SessionLocal()
+    try:
+        for image_id, group in groups.items():
+            try:
+                image = db.query(Image).filter(Image.id == image_id).first()
+                if image is None:
+                    raise HTTPException(status_code=404, detail="Image not found")
+                detection_result = detection_service.run_yolo_detection(db, image_id, background=True)
+            except Exception as e:
+                # The archive is already streaming: record the failure, never raise
+                db.rollback()
+                manifest["errors"].extend(
+                    {"image_id": image_id, "object_id": h.object_id, "detail": _error_detail(e)} for h in group
+                )
+                continue
+
+            objects = {o.id: o for o in detection_result.objects}
+            img_data = None
+            for hotspot in group:
+                obj = objects.get(hotspot.object_id)
+                if obj is None:
+                    manifest["errors"].append(
+                        {"image_id": image_id, "object_id": hotspot.object_id, "detail": "Object not found"}
+                    )
+                    continue
+                try:
+                    svg, img_data = _render_for_export(image, obj, detection_result, hotspot, img_data)
+                except Exception as e:
+                    manifest["errors"].append(
+                        {"image_id": image_id, "object_id": hotspot.object_id, "detail": _error_detail(e)}
+                    )
+                    continue
+
+                name = _unique_name(
+                    f"image_{image_id}/obj_{obj.id}_{safe_filename(hotspot.text)}.{format}", names,
+                )
+                manifest["files"].append({"name": name, "image_id": image_id, "object_id": obj.id})
+                if format == "svgz":
+                    # Already gzip data: storing it again compressed would gain nothing
+                    yield name, gzip.compress(svg.encode("utf-8"), settings.SVG_PRECOMPRESS_LEVEL), zipfile.ZIP_STORED
+                else:
+                    yield name, svg, zipfile.ZIP_DEFLATED
+            # Let the session drop what this image loaded before moving on
+            db.expunge_all()
+    finally:
+        db.close()
+
+    yield "manifest.json", json.dumps(manifest, indent=2), zipfile.ZIP_DEFLATED
+
+
+def _error_detail(e: Exception) -> str:
+    """Manifest text for a failed entry (unexpected errors are logged, not echoed with paths)."""
+    if isinstance(e, HTTPException):
+        return e.detail
+    logger.warning("SVG export entry failed", exc_info=e)
+    return f"Export failed ({type(e).__name__})"
+
+
+def _render_for_export(image: Image, obj: DetectedObject, detection_result: DetectionResult,
+                       hotspot: HotspotCreate, img_data: Optional[str]):
+    """(svg, img_data): from the render cache, or built with the image encoded at most once."""
+    w, h = detection_result.width, detection_result.height
+    rendered = _cache_get(_render_key(image, obj, w, h, hotspot))
+    cache_result("svg_render", rendered is not None)
+    if rendered is not None:
+        return rendered.svg, img_data
+    if img_data is None:
+        img_data = _encode_image(image)
+    with timed("svg_render"), tracing.span("svg.render", object_id=obj.id):
+        return _build_svg(image, obj, w, h, hotspot, img_data), img_data
+
+
+def _unique_name(name: str, taken: set) -> str:
+    stem, dot, ext = name.rpartition(".")
+    candidate, n = name, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{stem}_{n}{dot}{ext}"
+    taken.add(candidate)
+    return candidate
+
+
+def _encode_image(image: Image) -> str:
+    """Base64 of the image file, for embedding as a data URI."""
     with open(image.filepath, "rb") as f:
-        img_data = base64.b64encode(f.read()).decode()
-        
-    
-    # ── Proportional scaling ──────────────────────────────────────────────────
-    # Base reference is 400px wide. Everything scales from that.
-    scale       = w / 400.0
-
-    popup_w     = w * 0.42           # ~42% of image width
-    popup_h     = h * 0.22           # ~22% of image height
-    font_label  = max(10, 13 * scale)
-    font_text   = max(9,  11 * scale)
-    font_btn    = max(8,  10 * scale)
-    header_h    = popup_h * 0.28
-    padding     = popup_w * 0.06
-    radius      = max(4, 8 * scale)
-    stroke_w    = max(1.5, 2.5 * scale)
-    btn_w       = popup_w * 0.52
-    btn_h       = popup_h * 0.22
-    shadow_off  = max(2, 3 * scale)
-
-    # ── Popup card positioning ────────────────────────────────────────────────
-    bbox_x1 = obj.bbox.x1 * w
-    bbox_y1 = obj.bbox.y1 * h
-    bbox_x2 = obj.bbox.x2 * w
-    bbox_y2 = obj.bbox.y2 * h
-    bbox_cx = (bbox_x1 + bbox_x2) / 2
-
-    # Horizontally center on object; clamp inside image bounds
-    popup_x = max(4, min(bbox_cx - popup_w / 2, w - popup_w - 4))
-
-    # Prefer placing popup above the object; fall back to below
-    if bbox_y1 > popup_h + 20 * scale:
-        popup_y = bbox_y1 - popup_h - 12 * scale
-    else:
-        popup_y = bbox_y2 + 12 * scale
-
-    # Final clamp so card never leaves the image
-    popup_y = max(4, min(popup_y, h - popup_h - 4))
-
-    # ── Derived positions ─────────────────────────────────────────────────────
-    header_bottom = popup_y + header_h
-    text_y1       = header_bottom + popup_h * 0.22
-    text_y2       = header_bottom + popup_h * 0.42
-    btn_x         = popup_x + (popup_w - btn_w) / 2
-    btn_y         = popup_y + popup_h - btn_h - popup_h * 0.08
-    btn_text_y    = btn_y + btn_h * 0.65
-    label_y       = popup_y + header_h * 0.68
-    shadow_x      = popup_x + shadow_off
-    shadow_y      = popup_y + shadow_off
-
-    # ── Text truncation ───────────────────────────────────────────────────────
-    # Estimate chars per line based on popup width and font size
-    chars_per_line = max(20, int(popup_w / (font_text * 0.6)))
-    line1 = hotspot.text[:chars_per_line]
-    line2 = hotspot.text[chars_per_line: chars_per_line * 2] if len(hotspot.text) > chars_per_line else ""
-
-    line2_svg = (
-        f'<text x="{popup_x + padding:.1f}" y="{text_y2:.1f}" '
-        f'font-family="Arial, sans-serif" font-size="{font_text:.1f}" '
-        f'fill="#374151">{line2}</text>'
-        if line2 else ""
+        raw = f.read()
+    with timed("base64_encode"), tracing.span("svg.base64", bytes=len(raw)):
+        return base64.b64encode(raw).decode()
+
+
+def _build_svg(image: Image, obj: DetectedObject, w, h, hotspot: HotspotCreate,
+               img_data: Optional[str] = None) -> str:
+    """Lay out and serialize the SVG document for one object."""
+    # Build contour path (normalized → pixel coords). Multi-part objects
+    # (low-res mask mode) get one subpath per ring; holes cut out via evenodd.
+    path_data = encode_rings(
+        object_rings(obj), w, h,
+        precision=settings.SVG_PATH_PRECISION,
+        relative=settings.SVG_PATH_RELATIVE,
+        smooth=settings.SVG_PATH_SMOOTH,
     )
     
-    # ── SVG ──────────────────────────────────────────────────────────────────
-    svg = f"""<?xml version="1.0" encoding="UTF-8"?>
-    <svg xmlns="http://www.w3.org/2000/svg"
-        xmlns:xlink="http://www.w3.org/1999/xlink"
-        viewBox="0 0 {w} {h}"
-        style="width:100%;height:auto;display:block;max-height:100vh;">
-
-    <style>
-        .hotspot-path {{ cursor: pointer; }}
-        .hotspot-path:hover {{ fill: rgba(59,130,246,0.35); }}
-        .popup {{ visibility: hidden; opacity: 0; transition: opacity 0.18s; pointer-events: none; }}
-        .hotspot-group:hover .popup {{ visibility: visible; opacity: 1; pointer-events: all; }}
-        .visit-btn rect {{ transition: fill 0.15s; }}
-        .visit-btn:hover rect {{ fill: #1d4ed8; }}
-    </style>
-
-    <!-- Original image -->
-    <image href="data:image/jpeg;base64,{img_data}"
-            x="0" y="0" width="{w}" height="{h}"
-            preserveAspectRatio="xMidYMid meet"/>
-
-    <!-- Interactive group: contour + popup card -->
-    <g class="hotspot-group">
-
-        <!-- Object contour path -->
-        <path class="hotspot-path"
-            d="{path_data}"
-            fill="rgba(59,130,246,0.18)"
-            stroke="{stroke_color}"
-            stroke-width="{stroke_w:.1f}"
-            stroke-linejoin="round"
-            stroke-linecap="round">
-        <animate attributeName="stroke-opacity"
-                values="0.5;1;0.5" dur="2.5s" repeatCount="indefinite"/>
-        </path>
-
-        <!-- Popup card (shown on hover) -->
-        <g class="popup">
-
-        <!-- Drop shadow -->
-        <rect x="{shadow_x:.1f}" y="{shadow_y:.1f}"
-                width="{popup_w:.1f}" height="{popup_h:.1f}"
-                rx="{radius:.1f}" ry="{radius:.1f}"
-                fill="rgba(0,0,0,0.18)"/>
-
-        <!-- Card body -->
-        <rect x="{popup_x:.1f}" y="{popup_y:.1f}"
-                width="{popup_w:.1f}" height="{popup_h:.1f}"
-                rx="{radius:.1f}" ry="{radius:.1f}"
-                fill="white" stroke="#e2e8f0" stroke-width="1"/>
-
-        <!-- Coloured header band -->
-        <rect x="{popup_x:.1f}" y="{popup_y:.1f}"
-                width="{popup_w:.1f}" height="{header_h:.1f}"
-                rx="{radius:.1f}" ry="{radius:.1f}"
-                fill="{stroke_color}"/>
-        <!-- Square off bottom corners of header -->
-        <rect x="{popup_x:.1f}" y="{header_bottom - radius:.1f}"
-                width="{popup_w:.1f}" height="{radius:.1f}"
-                fill="{stroke_color}"/>
-
-        <!-- Object label in header -->
-        <text x="{popup_x + popup_w / 2:.1f}" y="{label_y:.1f}"
-                text-anchor="middle"
-                font-family="Arial, sans-serif"
-                font-size="{font_label:.1f}"
-                font-weight="bold"
-                fill="white">{obj.label.upper()}</text>
-
-        <!-- User description -->
-        <text x="{popup_x + padding:.1f}" y="{text_y1:.1f}"
-                font-family="Arial, sans-serif"
-                font-size="{font_text:.1f}"
-                fill="#374151">{line1}</text>
-        {line2_svg}
-
-        <!-- Visit link button -->
-        <a href="{hotspot.link}" target="_blank">
-            <g class="visit-btn">
-            <rect x="{btn_x:.1f}" y="{btn_y:.1f}"
-                    width="{btn_w:.1f}" height="{btn_h:.1f}"
-                    rx="{radius * 0.5:.1f}" ry="{radius * 0.5:.1f}"
-                    fill="{stroke_color}"/>
-            <text x="{btn_x + btn_w / 2:.1f}" y="{btn_text_y:.1f}"
-                    text-anchor="middle"
-                    font-family="Arial, sans-serif"
-                    font-size="{font_btn:.1f}"
-                    font-weight="bold"
-                    fill="white">Visit Link \u2192</text>
-            </g>
-        </a>
-
-        </g>
-    </g>
-
-    </svg>"""
-
-    return SvgResponse(image_id=image.id, svg=svg, preview_url=f"/images/{image.id}/file")
\ No newline at end of file
+    # Embed image (callers rendering several objects pass it in, encoded once)
+    if img_data is None:
+        img_data = _encode_image(image)
+
+    # Layout, escaping and theming live in the precompiled templates
+    return svg_template.render_hotspot(
+        w=w,
+        h=h,
+        bbox=(obj.bbox.x1, obj.bbox.y1, obj.bbox.x2, obj.bbox.y2),
+        label=obj.label,
+        path_data=path_data,
+        img_data=img_data,
+        text=hotspot.text,
+        link=hotspot.link,
+        color=hotspot.color,
+        theme=hotspot.theme,
+        layout=hotspot.layout,
+    )
@@ -0,0 +1,346 @@
+"""
+    Precompiled SVG templates for hotspot documents.
+
+    Each popup layout ("card", "compact") is an SVG skeleton with `${name}`
+    slots. Skeletons are split into static chunks and slots once at import,
+    and the theme palette is baked in right away, so a render only copies a
+    pre-sized list of parts, drops the per-request values into their slots
+    and joins it.
+
+    Everything user-provided goes through `escape_text` / `safe_link` /
+    `safe_color` before it reaches a slot: text is XML-escaped, links are
+    limited to http(s) and mailto, and colours must look like a CSS colour.
+"""
+
+
+import html
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+_SLOT = re.compile(r"\$\{(\w+)\}")
+
+
+class SvgTemplate:
+    """An SVG skeleton split into static chunks (even indexes) and named slots (odd indexes)."""
+
+    __slots__ = ("_parts", "_slots")
+
+    def __init__(self, source: Optional[str] = None, parts: Optional[List[str]] = None):
+        self._parts = parts if parts is not None else _SLOT.split(source)
+        self._slots = [(i, name) for i, name in enumerate(self._parts) if i % 2]
+
+    @property
+    def slots(self) -> List[str]:
+        return [name for _, name in self._slots]
+
+    def partial(self, **values: str) -> "SvgTemplate":
+        """A new template with some slots filled in for good (e.g. the theme palette)."""
+        parts = [""]
+        for i, part in enumerate(self._parts):
+            if i % 2 == 0:
+                parts[-1] += part
+            elif part in values:
+                parts[-1] += values[part]
+            else:
+                parts.extend([part, ""])
+        return SvgTemplate(parts=parts)
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Fill every remaining slot; values must already be escaped strings."""
+        buf = self._parts.copy()
+        for i, name in self._slots:
+            buf[i] = values[name]
+        return "".join(buf)
+
+
+# ── Escaping ──────────────────────────────────────────────────────────────────
+
+SAFE_LINK_SCHEMES = ("http", "https", "mailto")
+_COLOR = re.compile(r"^(#[0-9a-fA-F]{3,8}|[a-zA-Z]{3,20}|rgba?\([\d\s.,%]+\))$")
+
+
+def escape_text(value: str) -> str:
+    """XML-escape text for element content or attribute values."""
+    return html.escape(value or "", quote=True)
+
+
+def safe_link(url: str) -> str:
+    """Escaped link, or "#" unless it is an absolute http(s)/mailto URL."""
+    url = (url or "").strip()
+    try:
+        scheme = urlsplit(url).scheme.lower()
+    except ValueError:
+        return "#"
+    if scheme not in SAFE_LINK_SCHEMES:
+        return "#"
+    return html.escape(url, quote=True)
+
+
+def safe_color(value: Optional[str], default: str = "#3b82f6") -> str:
+    """A CSS colour (hex, name, rgb/rgba) or the default."""
+    value = (value or "").strip()
+    return value if _COLOR.match(value) else default
+
+
+# ── Themes ────────────────────────────────────────────────────────────────────
+
+THEMES: Dict[str, Dict[str, str]] = {
+    "light": {
+        "region_fill": "rgba(59,130,246,0.18)",
+        "region_hover": "rgba(59,130,246,0.35)",
+        "card_fill": "white",
+        "card_stroke": "#e2e8f0",
+        "body_fill": "#374151",
+        "shadow_fill": "rgba(0,0,0,0.18)",
+        "button_hover": "#1d4ed8",
+    },
+    "dark": {
+        "region_fill": "rgba(96,165,250,0.22)",
+        "region_hover": "rgba(96,165,250,0.40)",
+        "card_fill": "#1f2937",
+        "card_stroke": "#374151",
+        "body_fill": "#e5e7eb",
+        "shadow_fill": "rgba(0,0,0,0.45)",
+        "button_hover": "#60a5fa",
+    },
+}
+
+
+# ── Skeletons ─────────────────────────────────────────────────────────────────
+
+_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+    xmlns:xlink="http://www.w3.org/1999/xlink"
+    viewBox="0 0 ${w} ${h}"
+    style="width:100%;height:auto;display:block;max-height:100vh;">
+
+<style>
+    .hotspot-path { cursor: pointer; }
+    .hotspot-path:hover { fill: ${region_hover}; }
+    .popup { visibility: hidden; opacity: 0; transition: opacity 0.18s; pointer-events: none; }
+    .hotspot-group:hover .popup { visibility: visible; opacity: 1; pointer-events: all; }
+    .visit-btn rect { transition: fill 0.15s; }
+    .visit-btn:hover rect { fill: ${button_hover}; }
+</style>
+
+<!-- Original image -->
+<image href="data:image/jpeg;base64,${img_data}"
+    x="0" y="0" width="${w}" height="${h}"
+    preserveAspectRatio="xMidYMid meet"/>
+
+<!-- Interactive group: contour + popup -->
+<g class="hotspot-group">
+
+    <!-- Object contour path -->
+    <path class="hotspot-path"
+        d="${path_data}"
+        fill-rule="evenodd"
+        fill="${region_fill}"
+        stroke="${color}"
+        stroke-width="${stroke_w}"
+        stroke-linejoin="round"
+        stroke-linecap="round">
+    <animate attributeName="stroke-opacity"
+        values="0.5;1;0.5" dur="2.5s" repeatCount="indefinite"/>
+    </path>
+
+    <!-- Popup (shown on hover) -->
+    <g class="popup">
+"""
+
+_CARD = """
+    <!-- Drop shadow -->
+    <rect x="${shadow_x}" y="${shadow_y}" width="${popup_w}" height="${popup_h}"
+        rx="${radius}" ry="${radius}" fill="${shadow_fill}"/>
+
+    <!-- Card body -->
+    <rect x="${popup_x}" y="${popup_y}" width="${popup_w}" height="${popup_h}"
+        rx="${radius}" ry="${radius}" fill="${card_fill}" stroke="${card_stroke}" stroke-width="1"/>
+
+    <!-- Coloured header band, bottom corners squared off -->
+    <rect x="${popup_x}" y="${popup_y}" width="${popup_w}" height="${header_h}"
+        rx="${radius}" ry="${radius}" fill="${color}"/>
+    <rect x="${popup_x}" y="${header_square_y}" width="${popup_w}" height="${radius}" fill="${color}"/>
+
+    <!-- Object label in header -->
+    <text x="${label_x}" y="${label_y}" text-anchor="middle"
+        font-family="Arial, sans-serif" font-size="${font_label}"
+        font-weight="bold" fill="white">${label}</text>
+
+    <!-- User description -->
+    <text x="${text_x}" y="${text_y1}" font-family="Arial, sans-serif"
+        font-size="${font_text}" fill="${body_fill}">${line1}</text>
+    <text x="${text_x}" y="${text_y2}" font-family="Arial, sans-serif"
+        font-size="${font_text}" fill="${body_fill}">${line2}</text>
+
+    <!-- Visit link button -->
+    <a href="${link}" target="_blank">
+        <g class="visit-btn">
+        <rect x="${btn_x}" y="${btn_y}" width="${btn_w}" height="${btn_h}"
+            rx="${btn_radius}" ry="${btn_radius}" fill="${color}"/>
+        <text x="${btn_text_x}" y="${btn_text_y}" text-anchor="middle"
+            font-family="Arial, sans-serif" font-size="${font_btn}"
+            font-weight="bold" fill="white">Visit Link →</text>
+        </g>
+    </a>
+"""
+
+_COMPACT = """
+    <!-- Pill: label and description on one line, the whole pill is the link -->
+    <a href="${link}" target="_blank">
+        <g class="visit-btn">
+        <rect x="${popup_x}" y="${popup_y}" width="${popup_w}" height="${popup_h}"
+            rx="${radius}" ry="${radius}" fill="${color}"/>
+        <text x="${text_x}" y="${text_y1}" font-family="Arial, sans-serif"
+            font-size="${font_text}" fill="white"><tspan font-weight="bold">${label}</tspan> ${line1} →</text>
+        </g>
+    </a>
+"""
+
+_TAIL = """
+    </g>
+</g>
+
+</svg>"""
+
+LAYOUTS = ("card", "compact")
+
+# (layout, theme) -> template with the palette already baked in
+_COMPILED: Dict[Tuple[str, str], SvgTemplate] = {
+    (layout, theme): SvgTemplate(_HEAD + body + _TAIL).partial(**palette)
+    for layout, body in (("card", _CARD), ("compact", _COMPACT))
+    for theme, palette in THEMES.items()
+}
+
+
+# ── Layout ────────────────────────────────────────────────────────────────────
+
+_f = "{:.1f}".format
+
+
+@lru_cache(maxsize=256)
+def _metrics(layout: str, w: int, h: int) -> Dict[str, float]:
+    """Size-only layout values; they depend on the image size, not the object."""
+    scale = w / 400.0  # base reference is 400px wide, everything scales from that
+    if layout == "compact":
+        popup_h = max(18.0, 26 * scale)
+        return {
+            "scale": scale,
+            "popup_w": w * 0.45,
+            "popup_h": popup_h,
+            "font_text": max(9.0, 11 * scale),
+            "padding": popup_h * 0.45,
+            "radius": popup_h / 2,
+            "stroke_w": max(1.5, 2.5 * scale),
+        }
+    popup_w = w * 0.42  # ~42% of image width
+    popup_h = h * 0.22  # ~22% of image height
+    return {
+        "scale": scale,
+        "popup_w": popup_w,
+        "popup_h": popup_h,
+        "font_label": max(10.0, 13 * scale),
+        "font_text": max(9.0, 11 * scale),
+        "font_btn": max(8.0, 10 * scale),
+        "header_h": popup_h * 0.28,
+        "padding": popup_w * 0.06,
+        "radius": max(4.0, 8 * scale),
+        "stroke_w": max(1.5, 2.5 * scale),
+        "btn_w": popup_w * 0.52,
+        "btn_h": popup_h * 0.22,
+        "shadow_off": max(2.0, 3 * scale),
+    }
+
+
+def _place(m: Dict[str, float], w: int, h: int, bbox: Tuple[float, float, float, float]) -> Tuple[float, float]:
+    """Centre the popup on the object, above it if there is room, clamped inside the image."""
+    x1, y1, x2, y2 = bbox[0] * w, bbox[1] * h, bbox[2] * w, bbox[3] * h
+    popup_w, popup_h, scale = m["popup_w"], m["popup_h"], m["scale"]
+    popup_x = max(4, min((x1 + x2) / 2 - popup_w / 2, w - popup_w - 4))
+    if y1 > popup_h + 20 * scale:
+        popup_y = y1 - popup_h - 12 * scale
+    else:
+        popup_y = y2 + 12 * scale
+    popup_y = max(4, min(popup_y, h - popup_h - 4))
+    return popup_x, popup_y
+
+
+def _card_values(m, popup_x, popup_y, text: str) -> Dict[str, str]:
+    popup_w, popup_h, header_h, radius = m["popup_w"], m["popup_h"], m["header_h"], m["radius"]
+    header_bottom = popup_y + header_h
+    btn_x = popup_x + (popup_w - m["btn_w"]) / 2
+    btn_y = popup_y + popup_h - m["btn_h"] - popup_h * 0.08
+
+    # Estimate chars per line from popup width and font size; escape after cutting
+    per_line = max(20, int(popup_w / (m["font_text"] * 0.6)))
+    return {
+        "popup_x": _f(popup_x), "popup_y": _f(popup_y),
+        "popup_w": _f(popup_w), "popup_h": _f(popup_h),
+        "shadow_x": _f(popup_x + m["shadow_off"]), "shadow_y": _f(popup_y + m["shadow_off"]),
+        "radius": _f(radius), "header_h": _f(header_h),
+        "header_square_y": _f(header_bottom - radius),
+        "label_x": _f(popup_x + popup_w / 2), "label_y": _f(popup_y + header_h * 0.68),
+        "font_label": _f(m["font_label"]), "font_text": _f(m["font_text"]), "font_btn": _f(m["font_btn"]),
+        "text_x": _f(popup_x + m["padding"]),
+        "text_y1": _f(header_bottom + popup_h * 0.22), "text_y2": _f(header_bottom + popup_h * 0.42),
+        "line1": escape_text(text[:per_line]),
+        "line2": escape_text(text[per_line:per_line * 2]),
+        "btn_x": _f(btn_x), "btn_y": _f(btn_y), "btn_w": _f(m["btn_w"]), "btn_h": _f(m["btn_h"]),
+        "btn_radius": _f(radius * 0.5),
+        "btn_text_x": _f(btn_x + m["btn_w"] / 2), "btn_text_y": _f(btn_y + m["btn_h"] * 0.65),
+    }
+
+
+def _compact_values(m, popup_x, popup_y, text: str, label: str) -> Dict[str, str]:
+    popup_w, popup_h = m["popup_w"], m["popup_h"]
+    per_line = max(8, int((popup_w - 2 * m["padding"]) / (m["font_text"] * 0.6)) - len(label) - 3)
+    line = text if len(text) <= per_line else text[:per_line - 1] + "…"
+    return {
+        "popup_x": _f(popup_x), "popup_y": _f(popup_y),
+        "popup_w": _f(popup_w), "popup_h": _f(popup_h),
+        "radius": _f(m["radius"]),
+        "font_text": _f(m["font_text"]),
+        "text_x": _f(popup_x + m["padding"]),
+        "text_y1": _f(popup_y + popup_h * 0.66),
+        "line1": escape_text(line),
+    }
+
+
+def render_hotspot(
+    *,
+    w: int,
+    h: int,
+    bbox: Tuple[float, float, float, float],
+    label: str,
+    path_data: str,
+    img_data: str,
+    text: str,
+    link: str,
+    color: Optional[str],
+    theme: str = "light",
+    layout: str = "card",
+) -> str:
+    """Render one hotspot document. `bbox` is normalized (x1, y1, x2, y2)."""
+    template = _COMPILED.get((layout, theme)) or _COMPILED[("card", "light")]
+    m = _metrics(layout if layout in LAYOUTS else "card", w, h)
+    popup_x, popup_y = _place(m, w, h, bbox)
+
+    if layout == "compact":
+        values = _compact_values(m, popup_x, popup_y, text or "", label.upper())
+    else:
+        values = _card_values(m, popup_x, popup_y, text or "")
+
+    values.update(
+        w=str(w),
+        h=str(h),
+        img_data=img_data,
+        path_data=path_data,
+        color=escape_text(safe_color(color)),
+        stroke_w=_f(m["stroke_w"]),
+        label=escape_text(label.upper()),
+        link=safe_link(link),
+    )
+    return template.render(values)
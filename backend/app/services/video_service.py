@@ -0,0 +1,217 @@
+"""
+    Video hotspot service.
+
+    Stores uploaded product videos, asks the detection backend for an
+    object timeline (segmentation on keyframes, optical-flow tracking in
+    between) and turns that timeline into an animated SVG overlay that
+    can sit on top of the playing video.
+"""
+
+
+import json
+import os
+import uuid
+from typing import List, Optional
+from xml.sax.saxutils import escape
+
+import cv2
+import numpy as np
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from photo_contour_shared import tracing
+from photo_contour_shared.metrics import cache_result, timed
+from app.models import Video
+from app.schemas.videos import VideoDetectParams, VideoTimeline
+from app.services.admission import detection_slot
+from app.services.detection_backends import get_detection_backend
+from app.services.svg_template import safe_color
+
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".m4v", ".webm", ".mkv", ".avi"}
+VIDEO_DIR = os.path.join(settings.UPLOAD_DIR, "videos")
+
+
+def save_uploaded_video(db: Session, file: UploadFile) -> Video:
+    """Stream the upload to disk (size-capped), read its metadata and store the record."""
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in VIDEO_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported video type: {ext or 'none'}")
+
+    os.makedirs(VIDEO_DIR, exist_ok=True)
+    filepath = os.path.join(VIDEO_DIR, f"{uuid.uuid4().hex}{ext}")
+    limit = int(settings.VIDEO_MAX_MB * 1024 * 1024)
+    written = 0
+    with timed("upload_write"), open(filepath, "wb") as out:
+        while chunk := file.file.read(1024 * 1024):
+            written += len(chunk)
+            if written > limit:
+                out.close()
+                os.remove(filepath)
+                raise HTTPException(status_code=413, detail=f"Video larger than {settings.VIDEO_MAX_MB:g} MB")
+            out.write(chunk)
+
+    cap = cv2.VideoCapture(filepath)
+    try:
+        if not cap.isOpened() or not cap.grab():
+            os.remove(filepath)
+            raise HTTPException(status_code=422, detail="Could not decode video")
+        video = Video(
+            filename=file.filename,
+            filepath=filepath,
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            fps=float(cap.get(cv2.CAP_PROP_FPS)) or None,
+            frame_count=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        )
+    finally:
+        cap.release()
+
+    db.add(video)
+    db.commit()
+    db.refresh(video)
+    return video
+
+
+def get_video(db: Session, video_id: int) -> Video:
+    video = db.query(Video).filter(Video.id == video_id).first()
+    if video is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return video
+
+
+def _params_key(params: VideoDetectParams) -> str:
+    fields = params.model_dump(exclude_none=True)
+    fields.setdefault("keyframe_interval", settings.VIDEO_KEYFRAME_INTERVAL)
+    return json.dumps(fields, sort_keys=True, separators=(",", ":"))
+
+
+def detect_video(db: Session, video_id: int, params: Optional[VideoDetectParams] = None,
+                 use_cache: bool = True) -> VideoTimeline:
+    """
+    The object timeline for a video, computed once per parameter set.
+
+    Runs as one call behind the detection breaker, in the limiter's
+    background lane so interactive image detection keeps its slots; the
+    YOLO service decodes the video itself and only segments keyframes.
+    """
+    params = params or VideoDetectParams()
+    key = _params_key(params)
+    video = get_video(db, video_id)
+
+    cached = use_cache and video.timeline_json is not None and video.timeline_params_key == key
+    cache_result("video_timeline", cached)
+    if cached:
+        return VideoTimeline.model_validate_json(video.timeline_json)
+
+    if params.keyframe_interval is None:
+        params = params.model_copy(update={"keyframe_interval": settings.VIDEO_KEYFRAME_INTERVAL})
+    # A video holds its slot for minutes: low-priority lane, and not counted
+    # in the hold-time average behind image callers' Retry-After
+    with tracing.span("detection.video", video_id=video_id), detection_slot(background=True, sample_hold=False):
+        try:
+            data = get_detection_backend().detect_video(os.path.abspath(video.filepath), params)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    timeline = VideoTimeline(video_id=video_id, **data)
+    video.timeline_json = timeline.model_dump_json()
+    video.timeline_params_key = key
+    # The service saw the real stream; container headers can be wrong
+    video.width, video.height = timeline.width, timeline.height
+    video.fps, video.frame_count = timeline.fps, timeline.frame_count
+    db.commit()
+    return timeline
+
+
+def get_timeline(db: Session, video_id: int) -> VideoTimeline:
+    video = get_video(db, video_id)
+    if video.timeline_json is None:
+        raise HTTPException(status_code=404, detail="Video has not been detected yet")
+    return VideoTimeline.model_validate_json(video.timeline_json)
+
+
+# ── Animated overlay ─────────────────────────────────────────────────────────
+
+def _resample(contour: List[List[float]], n: int) -> np.ndarray:
+    """Exactly `n` points along a closed contour (same count for every frame of a segment)."""
+    pts = np.asarray(contour, dtype=np.float64).reshape(-1, 2)
+    if len(pts) == 0:
+        return np.zeros((0, 2))
+    idx = np.linspace(0, len(pts), n, endpoint=False).astype(int)
+    return pts[idx]
+
+
+def _path(points: np.ndarray, w: int, h: int) -> str:
+    px = np.round(points * (w, h), 1)
+    return "M" + "L".join(f"{x:g},{y:g}" for x, y in px) + "Z"
+
+
+def render_timeline_svg(timeline: VideoTimeline, color: str = "#3b82f6") -> str:
+    """
+    SVG overlay whose hotspot outlines move with the tracked objects (SMIL).
+
+    Each track segment (a keyframe and the tracked frames after it) is one
+    path whose `d` animates through the keyframe contour moved by each
+    frame's transform. It is visible only while that segment is on screen.
+    Contours are resampled to a fixed point count, so every `d` value has
+    the same structure and can be interpolated.
+    """
+    w, h = timeline.width, timeline.height
+    duration = max(timeline.frame_count / timeline.fps if timeline.fps else 0, 1e-3)
+    step = timeline.frame_stride / timeline.fps if timeline.fps else 0
+    color = safe_color(color)
+    n = settings.VIDEO_SVG_MAX_POINTS
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {w} {h}" width="{w}" height="{h}">',
+        f'<style>.hs{{fill:{color};fill-opacity:.25;stroke:{color};stroke-width:{max(w, h) / 400:.1f}}}'
+        f'.hs:hover{{fill-opacity:.45}}</style>',
+    ]
+    for track in timeline.tracks:
+        segments, current = [], None
+        for frame in track.frames:
+            if frame.keyframe and frame.contour:
+                current = {"base": _resample(frame.contour, n), "frames": []}
+                segments.append(current)
+            if current is not None:
+                current["frames"].append(frame)
+
+        parts.append(f'<g class="track" data-track="{track.id}">')
+        for seg in segments:
+            frames, base = seg["frames"], seg["base"]
+            start, end = frames[0].t, min(frames[-1].t + step, duration)
+            values = []
+            for frame in frames:
+                pts = base
+                if frame.transform is not None:
+                    a, b, c, d, e, f = frame.transform
+                    pts = base @ np.array([[a, b], [c, d]]) + (e, f)
+                values.append(_path(pts, w, h))
+            span = max(end - start, 1e-6)
+            # Hold the last position until the segment ends (keyTimes must end at 1)
+            values.append(values[-1])
+            key_times = ";".join([f"{(fr.t - start) / span:.4f}" for fr in frames] + ["1"])
+
+            parts.append(
+                f'<path class="hs" d="{values[0]}" visibility="hidden">'
+                f'<title>{escape(track.label)}</title>'
+                f'<set attributeName="visibility" to="visible" begin="{start:.3f}s;loop.begin+{start:.3f}s" '
+                f'dur="{end - start:.3f}s"/>'
+            )
+            if len(values) > 2:
+                parts.append(
+                    f'<animate attributeName="d" values="{";".join(values)}" keyTimes="{key_times}" '
+                    f'begin="{start:.3f}s;loop.begin+{start:.3f}s" dur="{end - start:.3f}s" calcMode="linear"/>'
+                )
+            parts.append("</path>")
+        parts.append("</g>")
+
+    # Invisible clock that restarts every segment animation when the video loops
+    parts.append(
+        f'<rect width="0" height="0"><animate id="loop" attributeName="x" from="0" to="0" '
+        f'begin="{duration:.3f}s;loop.end" dur="{duration:.3f}s"/></rect>'
+    )
+    parts.append("</svg>")
+    return "".join(parts)
@@ -0,0 +1,170 @@
+"""
+    Client-side load balancing across YOLO service nodes.
+
+    Keeps per-node outstanding-request counts and latency (EWMA) so each
+    detection goes to the healthy node with the fewest in-flight requests.
+    A background thread polls every node's `/ready` endpoint; nodes that
+    fail repeatedly, or are much slower than their peers, are ejected for
+    a cool-down period and only re-admitted once `/ready` succeeds again.
+"""
+
+
+import logging
+import statistics
+import threading
+import time
+from typing import List, Optional
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+class YoloNode:
+    """Bookkeeping for one YOLO service instance."""
+
+    def __init__(self, detect_url: str):
+        self.detect_url = detect_url
+        self.base_url = detect_url.rsplit("/", 1)[0]
+        self.outstanding = 0
+        self.ewma_ms: Optional[float] = None
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.ready = True              # last active health-check result
+        self.ejected_until = 0.0       # monotonic time; 0 = not ejected
+
+    @property
+    def available(self) -> bool:
+        # Ejection is only lifted by a passing health check (see YoloNodePool.check)
+        return self.ready and not self.ejected_until
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.detect_url,
+            "available": self.available,
+            "ready": self.ready,
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected_for_s": max(0.0, round(self.ejected_until - time.monotonic(), 1)),
+        }
+
+
+class YoloNodePool:
+    """Least-outstanding-requests balancer with active health checks and outlier ejection."""
+
+    EWMA_ALPHA = 0.2
+    MIN_SAMPLES = 5  # don't judge a node slow before it has some history
+
+    def __init__(
+        self,
+        detect_urls: List[str],
+        health_interval: float = 5.0,
+        eject_seconds: float = 30.0,
+        max_failures: int = 3,
+        slow_factor: float = 3.0,
+    ):
+        if not detect_urls:
+            raise ValueError("YoloNodePool needs at least one URL")
+        self.nodes = [YoloNode(url) for url in detect_urls]
+        self.health_interval = health_interval
+        self.eject_seconds = eject_seconds
+        self.max_failures = max_failures
+        self.slow_factor = slow_factor
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def acquire(self, exclude: Optional[YoloNode] = None) -> YoloNode:
+        """
+        Pick the available node with the fewest outstanding requests
+        (ties broken by lower latency) and count the request against it.
+
+        If every node is ejected or unready, all nodes are considered
+        ("panic mode") rather than failing every request outright.
+        """
+        with self._lock:
+            candidates = [n for n in self.nodes if n.available and n is not exclude]
+            if not candidates:
+                candidates = [n for n in self.nodes if n is not exclude] or self.nodes
+            node = min(candidates, key=lambda n: (n.outstanding, n.ewma_ms or 0.0))
+            node.outstanding += 1
+            return node
+
+    def release(self, node: YoloNode, elapsed_ms: float, ok: bool, sample: bool = True) -> None:
+        """
+        Record the outcome of a request started with `acquire`.
+
+        `sample=False` counts success/failure but keeps `elapsed_ms` out of
+        the latency EWMA - for long jobs (videos) that aren't comparable to
+        a single-image detection and would get the node ejected as slow.
+        """
+        with self._lock:
+            node.outstanding -= 1
+            if not ok:
+                node.consecutive_failures += 1
+                if node.consecutive_failures >= self.max_failures:
+                    self._eject(node)
+                return
+
+            node.consecutive_failures = 0
+            if not sample:
+                return
+            node.samples += 1
+            if node.ewma_ms is None:
+                node.ewma_ms = elapsed_ms
+            else:
+                node.ewma_ms += self.EWMA_ALPHA * (elapsed_ms - node.ewma_ms)
+            if self._is_outlier(node):
+                self._eject(node)
+
+    def _is_outlier(self, node: YoloNode) -> bool:
+        """A node is slow if its EWMA is `slow_factor`× the median of its available peers."""
+        if node.samples < self.MIN_SAMPLES:
+            return False
+        peers = [
+            n.ewma_ms for n in self.nodes
+            if n is not node and n.available and n.ewma_ms is not None and n.samples >= self.MIN_SAMPLES
+        ]
+        if not peers:
+            return False
+        return node.ewma_ms > self.slow_factor * statistics.median(peers)
+
+    def _eject(self, node: YoloNode) -> None:
+        if len(self.nodes) == 1 or node.ejected_until:
+            return  # single node: nowhere else to send traffic; or already ejected
+        node.ejected_until = time.monotonic() + self.eject_seconds
+        logger.warning("Ejecting YOLO node %s for %.0fs", node.detect_url, self.eject_seconds)
+
+    # ── Active health checks ─────────────────────────────────────────────────
+    def start_health_checks(self) -> None:
+        if self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop, name="yolo-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while True:
+            for node in self.nodes:
+                self.check(node)
+            time.sleep(self.health_interval)
+
+    def check(self, node: YoloNode) -> bool:
+        """Probe `/ready`; a passing node whose ejection has expired starts fresh."""
+        try:
+            ok = requests.get(f"{node.base_url}/ready", timeout=2).status_code == 200
+        except requests.RequestException:
+            ok = False
+        with self._lock:
+            node.ready = ok
+            if ok and node.ejected_until and time.monotonic() >= node.ejected_until:
+                # Re-admitted: forget the history that got it ejected
+                node.ejected_until = 0.0
+                node.consecutive_failures = 0
+                node.ewma_ms = None
+                node.samples = 0
+                logger.info("Re-admitting YOLO node %s", node.detect_url)
+        return ok
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [n.snapshot() for n in self.nodes]
@@ -0,0 +1,20 @@
+"""
+    Micro-benchmarks for the hot backend functions (pytest-benchmark).
+
+    Covers upload quality checks and saving, contour normalization in the
+    YOLO service, SVG path building and full `generate_interactive_svg`
+    (with the stub detection backend, so no model is needed). Inputs are
+    synthetic: JPEGs of several sizes and contours of 100 to 50k points.
+
+    They are skipped in the normal test run (`--benchmark-skip` in
+    pytest.ini); run them explicitly from backend/ (requirements-dev.txt):
+        pytest app/tests/benchmarks --benchmark-only
+
+    No baseline is committed - timings only compare on the same machine.
+    Save one locally, then fail a later run that regresses against it:
+        pytest app/tests/benchmarks --benchmark-only \\
+            --benchmark-storage=app/tests/benchmarks/.baselines --benchmark-save=baseline
+        pytest app/tests/benchmarks --benchmark-only \\
+            --benchmark-storage=app/tests/benchmarks/.baselines \\
+            --benchmark-compare=0001 --benchmark-compare-fail=median:15%
+"""
@@ -0,0 +1,72 @@
+"""
+    Fixtures for the micro-benchmarks.
+
+    The throwaway database, upload directory and stub detection backend
+    come from the shared test conftest (app/tests/conftest.py), so
+    benchmarks never touch real data or need the YOLO model.
+"""
+
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+from app.config import settings
+from app.db.init_db import init_db
+
+
+IMAGE_SIZES = {
+    "small": (640, 480),
+    "medium": (1920, 1080),
+    "large": (4000, 3000),
+}
+CONTOUR_POINTS = [100, 1_000, 10_000, 50_000]
+
+
+def make_image(path: str, width: int, height: int, seed: int = 0) -> str:
+    """A sharp synthetic JPEG (gradients, shapes and noise pass the blur check)."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[..., 0] = (xx * 255 // max(width - 1, 1)).astype(np.uint8)
+    img[..., 1] = (yy * 255 // max(height - 1, 1)).astype(np.uint8)
+    img[..., 2] = (((xx // 40) + (yy // 40)) % 2 * 200).astype(np.uint8)
+    img = np.clip(img.astype(np.int16) + rng.integers(-20, 20, img.shape), 0, 255).astype(np.uint8)
+    PILImage.fromarray(img).save(path, "JPEG", quality=90)
+    return path
+
+
+def make_contour(n_points: int, seed: int = 0) -> np.ndarray:
+    """A wobbly closed blob with `n_points` points, in pixel coordinates of a 1920x1080 image."""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 2 * np.pi, n_points, endpoint=False)
+    r = 300 + 40 * np.sin(7 * t) + rng.normal(0, 2, n_points)
+    return np.stack([960 + r * np.cos(t), 540 + r * np.sin(t)], axis=1).astype(np.float32)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _database():
+    Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    init_db()
+
+
+@pytest.fixture(scope="session")
+def image_files():
+    """Size name -> path of a synthetic JPEG in the upload directory."""
+    return {
+        name: make_image(os.path.join(settings.UPLOAD_DIR, f"bench_{name}.jpg"), w, h)
+        for name, (w, h) in IMAGE_SIZES.items()
+    }
+
+
+@pytest.fixture(params=list(IMAGE_SIZES))
+def image_file(request, image_files):
+    return image_files[request.param]
+
+
+@pytest.fixture(params=CONTOUR_POINTS, ids=lambda n: f"{n}pts")
+def contour(request):
+    return make_contour(request.param)
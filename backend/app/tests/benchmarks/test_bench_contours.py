@@ -0,0 +1,43 @@
+"""
+    Benchmarks for contour handling: normalization in the YOLO service and
+    SVG path building (compact encoder vs the legacy string).
+"""
+
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.services.path_encoding import encode_contour, legacy_path
+
+
+W, H = 1920, 1080
+
+
+def test_normalize_contour(benchmark, yolo_app, contour):
+    benchmark.group = f"normalize_contour {len(contour)}pts"
+    result = benchmark(yolo_app.normalize_contour, contour, W, H)
+    assert len(result) == len(contour)
+
+
+@pytest.fixture
+def normalized(contour):
+    return (contour / [W, H]).tolist()
+
+
+def test_encode_contour(benchmark, normalized):
+    benchmark.group = f"svg path {len(normalized)}pts"
+    d = benchmark(encode_contour, normalized, W, H)
+    assert d.startswith("m ") and d.endswith("z")
+
+
+def test_encode_contour_smooth(benchmark, normalized):
+    benchmark.group = f"svg path {len(normalized)}pts"
+    d = benchmark(encode_contour, normalized, W, H, smooth=True)
+    assert " c " in d
+
+
+def test_legacy_path(benchmark, normalized):
+    benchmark.group = f"svg path {len(normalized)}pts"
+    d = benchmark(legacy_path, normalized, W, H)
+    assert d.startswith("M ")
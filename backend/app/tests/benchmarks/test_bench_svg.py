@@ -0,0 +1,40 @@
+"""
+    Benchmarks for full interactive SVG generation (stub detections).
+
+    The detection is cached after the first call in both cases; "cold"
+    clears the render cache before every round so layout, path encoding
+    and base64 are measured, "cached" measures a render-cache hit.
+"""
+
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.schemas.hotspots import HotspotCreate
+from app.services import image_service, svg_service
+
+
+@pytest.fixture
+def hotspot(db, image_file):
+    image = image_service.save_uploaded_image(db, image_file, "bench.jpg")
+    return HotspotCreate(image_id=image.id, object_id=0, text="Benchmark hotspot", link="https://example.com")
+
+
+def test_generate_interactive_svg_cold(benchmark, db, hotspot):
+    benchmark.group = "generate_interactive_svg cold"
+    result = benchmark.pedantic(
+        svg_service.generate_interactive_svg,
+        args=(db, hotspot),
+        setup=svg_service._cache_clear,
+        rounds=10,
+        warmup_rounds=1,
+    )
+    assert result.svg.startswith("<?xml")
+
+
+def test_generate_interactive_svg_cached(benchmark, db, hotspot):
+    benchmark.group = "generate_interactive_svg cached"
+    svg_service.generate_interactive_svg(db, hotspot)
+    result = benchmark(svg_service.generate_interactive_svg, db, hotspot)
+    assert result.svg.startswith("<?xml")
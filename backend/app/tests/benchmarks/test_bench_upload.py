@@ -0,0 +1,22 @@
+"""
+    Benchmarks for the upload path: quality check and DB record creation.
+"""
+
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.services.image_service import check_image_quality, save_uploaded_image
+
+
+def test_check_image_quality(benchmark, image_file):
+    benchmark.group = "check_image_quality"
+    passed, reason = benchmark(check_image_quality, image_file)
+    assert passed, reason
+
+
+def test_save_uploaded_image(benchmark, db, image_file):
+    benchmark.group = "save_uploaded_image"
+    image = benchmark(save_uploaded_image, db, image_file, "bench.jpg")
+    assert image.id is not None and image.width > 0
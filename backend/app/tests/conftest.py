@@ -0,0 +1,63 @@
+"""
+    Shared test setup.
+
+    Points the app at a throwaway SQLite database and upload directory and
+    at the stub detection backend *before* `app.config` is first imported
+    (by any test module), so tests never touch real data or need the YOLO
+    model.
+"""
+
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_WORKDIR = tempfile.mkdtemp(prefix="photo-contour-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_WORKDIR}/test.db")
+os.environ.setdefault("UPLOAD_DIR", f"{_WORKDIR}/uploads")
+os.environ.setdefault("DETECTION_BACKEND", "stub")
+os.environ.setdefault("EAGER_DETECTION", "false")
+
+
+import pytest
+from PIL import Image as PILImage
+
+from app.db.base import Base, SessionLocal, engine
+from app.models import Image
+
+
+YOLO_SERVICE_DIR = Path(__file__).resolve().parents[2] / "yolo_service"
+
+
+@pytest.fixture
+def db():
+    """A session on the throwaway database (tables created on first use)."""
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_image(db, tmp_path):
+    """Write a JPEG and add its `Image` row; returns the row."""
+    def make(name: str = "photo.jpg", size=(320, 240), color=(120, 90, 60)) -> Image:
+        path = tmp_path / f"{len(list(tmp_path.iterdir()))}_{name}"
+        PILImage.new("RGB", size, color).save(path, "JPEG")
+        image = Image(filename=name, filepath=str(path), width=size[0], height=size[1])
+        db.add(image)
+        db.commit()
+        return image
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def yolo_app():
+    """The YOLO service module (needs cv2/numpy only; the model is never loaded)."""
+    if str(YOLO_SERVICE_DIR) not in sys.path:
+        sys.path.insert(0, str(YOLO_SERVICE_DIR))
+    return pytest.importorskip("yolo_app")
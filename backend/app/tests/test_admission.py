@@ -0,0 +1,113 @@
+"""
+    Tests for detection admission control.
+
+    Bulk detection waits in the limiter's background lane; interactive
+    callers must still get a slot (or the head of the queue) while a bulk
+    run holds everything it is allowed to.
+"""
+
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import admission
+from app.services.admission import ConcurrencyLimiter
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def bulk_run():
+    """Start `n` background holders on a limiter; they keep their slot until released."""
+    done = threading.Event()
+    threads = []
+
+    def start(limiter: ConcurrencyLimiter, n: int, reserve: int = 1):
+        def hold():
+            limiter.acquire_background(timeout=5.0, reserve=reserve)
+            try:
+                done.wait()
+            finally:
+                limiter.release()
+
+        for _ in range(n):
+            t = threading.Thread(target=hold, daemon=True)
+            t.start()
+            threads.append(t)
+
+    yield start
+    done.set()
+    for t in threads:
+        t.join(timeout=2)
+
+
+def test_interactive_gets_in_while_bulk_is_active(bulk_run):
+    limiter = ConcurrencyLimiter(limit=4, max_queue=2, queue_timeout=1.0)
+    bulk_run(limiter, 8, reserve=1)
+    _wait_for(lambda: limiter.in_flight == 3 and limiter.background_waiting == 5)
+
+    # Bulk never takes the reserved slot and doesn't fill the interactive queue
+    assert limiter.waiting == 0
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started < 0.1
+    assert limiter.in_flight == 4
+    limiter.release()
+
+
+def test_queued_interactive_caller_goes_before_bulk(bulk_run):
+    limiter = ConcurrencyLimiter(limit=2, max_queue=2, queue_timeout=2.0)
+    bulk_run(limiter, 3, reserve=1)
+    _wait_for(lambda: limiter.in_flight == 1 and limiter.background_waiting == 2)
+    limiter.acquire()                      # interactive request running in the reserved slot
+
+    admitted = threading.Event()
+
+    def interactive():
+        limiter.acquire()
+        admitted.set()
+
+    threading.Thread(target=interactive, daemon=True).start()
+    _wait_for(lambda: limiter.waiting == 1)
+
+    limiter.release()                      # frees a slot: the queued interactive caller takes it
+    assert admitted.wait(1.0)
+    assert limiter.background_waiting == 2
+    limiter.release()
+
+
+def test_background_wait_times_out_with_503():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=1.0)
+    limiter.acquire()
+    with pytest.raises(HTTPException) as exc:
+        limiter.acquire_background(timeout=0.05)
+    assert exc.value.status_code == 503
+    assert limiter.background_waiting == 0
+    limiter.release()
+
+
+@pytest.mark.parametrize("sample_hold, retry_after", [(True, "121"), (False, "1")])
+def test_long_holds_only_skew_retry_after_when_sampled(monkeypatch, sample_hold, retry_after):
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0, queue_timeout=1.0)
+    monkeypatch.setattr(admission, "detection_limiter", limiter)
+    # Every clock read is 10 minutes after the previous one: a video-length hold
+    ticks = iter(range(0, 10 ** 6, 600))
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: float(next(ticks))))
+
+    with admission.detection_slot(background=True, sample_hold=sample_hold):
+        pass
+
+    limiter.acquire()
+    with pytest.raises(HTTPException) as exc:
+        limiter.acquire()
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == retry_after
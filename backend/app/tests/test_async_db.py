@@ -0,0 +1,80 @@
+"""
+    Tests for the async database layer.
+
+    Covers the sync -> async driver URL mapping and the async
+    `get_current_user` dependency against a real (SQLite/aiosqlite)
+    database.
+"""
+
+
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.deps import get_current_user
+from app.core.security import create_access_token
+from app.db.base import AsyncSessionLocal, Base, SessionLocal, async_database_url, async_engine, engine
+from app.models import User
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./photo_contour.db", "sqlite+aiosqlite:///./photo_contour.db"),
+    ("sqlite:////tmp/x.db", "sqlite+aiosqlite:////tmp/x.db"),
+    ("sqlite://", "sqlite+aiosqlite://"),
+    ("postgresql://app:s3cr%40t@db:5432/photos", "postgresql+asyncpg://app:s3cr%40t@db:5432/photos"),
+    ("postgresql+psycopg2://app@db/photos?sslmode=require", "postgresql+asyncpg://app@db/photos?sslmode=require"),
+])
+def test_async_database_url(url, expected):
+    assert async_database_url(url) == expected
+
+
+def test_async_database_url_rejects_unknown_backends():
+    with pytest.raises(ValueError, match="ASYNC_DATABASE_URL"):
+        async_database_url("mysql://app@db/photos")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def user():
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        row = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(row)
+        db.commit()
+        user_id = row.id
+    yield user_id
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+
+
+async def _current_user(token: str, scheme: str = "Bearer") -> User:
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token), db)
+
+
+@pytest.mark.anyio
+async def test_get_current_user_returns_the_token_subject(user):
+    current = await _current_user(create_access_token({"sub": str(user)}))
+    assert current.id == user
+    assert current.email.endswith("@example.com")
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("claims, scheme, detail", [
+    (None, "Bearer", "Invalid/expired token"),            # not a JWT at all
+    ({"sub": "999999"}, "Bearer", "User not found"),
+    ({"uid": "1"}, "Bearer", "Invalid token structure"),
+    ({"sub": "1"}, "Basic", "Invalid auth scheme"),
+])
+async def test_get_current_user_rejects(user, claims, scheme, detail):
+    token = create_access_token(claims) if claims is not None else "not-a-token"
+    with pytest.raises(HTTPException) as exc:
+        await _current_user(token, scheme)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == detail
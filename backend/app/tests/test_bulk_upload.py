@@ -0,0 +1,130 @@
+"""
+    Tests for bulk image upload (POST /images/bulk).
+
+    Files and zip entries are stored under unique names, so repeated
+    names never overwrite or delete another image's file, and nothing is
+    left on disk when a request fails.
+"""
+
+
+import io
+import os
+import zipfile
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image as PILImage
+
+from app.config import settings
+from app.core.deps import get_current_user
+from app.main import app
+from app.services import image_service
+
+
+def _jpeg(seed: int = 0, sharp: bool = True) -> bytes:
+    """A 400×400 JPEG that passes (noise) or fails (flat: tiny and blurry) the quality check."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (400, 400, 3), dtype=np.uint8) if sharp else np.full((400, 400, 3), 128, np.uint8)
+    buf = io.BytesIO()
+    PILImage.fromarray(pixels).save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+
+def _zip(entries: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def _files(*files):
+    """(name, bytes[, content type]) tuples -> the `files` form field."""
+    return [("files", (f[0], f[1], f[2] if len(f) > 2 else "image/jpeg")) for f in files]
+
+
+def _stored() -> set:
+    return set(os.listdir(settings.UPLOAD_DIR)) if os.path.isdir(settings.UPLOAD_DIR) else set()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(settings, "EAGER_DETECTION", False)
+    app.dependency_overrides[get_current_user] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_mixed_zip_and_plain_files(client):
+    archive = _zip({"shoot/IMG_0001.jpg": _jpeg(1), "IMG_0002.jpg": _jpeg(2), "notes.txt": b"hello"})
+    resp = client.post("/images/bulk", files=_files(("IMG_0003.jpg", _jpeg(3)), ("shoot.zip", archive, "application/zip")))
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [(i["filename"], i["accepted"]) for i in body["items"]] == [
+        ("IMG_0003.jpg", True), ("IMG_0001.jpg", True), ("IMG_0002.jpg", True), ("notes.txt", False),
+    ]
+    assert body["items"][3]["reason"] == "Not an image file"
+    assert (body["accepted"], body["rejected"]) == (3, 1)
+    for item in body["items"][:3]:
+        path = item["image"]["filepath"]
+        assert os.path.basename(path) != item["filename"] and path.endswith(".jpg")
+        assert os.path.exists(path)
+
+
+def test_same_name_as_an_existing_image_keeps_both_files(client):
+    first = client.post("/images/bulk", files=_files(("IMG_0001.jpg", _jpeg(1)))).json()["items"][0]["image"]
+    # Rejected for quality: must not delete the earlier image's file either
+    second = client.post("/images/bulk", files=_files(("IMG_0001.jpg", _jpeg(2)), ("IMG_0002.jpg", _jpeg(3, sharp=False))))
+    items = second.json()["items"]
+
+    assert items[0]["accepted"] and not items[1]["accepted"]
+    assert items[1]["reason"]
+    assert items[0]["image"]["filepath"] != first["filepath"]
+    with open(first["filepath"], "rb") as f:
+        assert f.read() == _jpeg(1)
+
+
+def test_non_image_and_oversize_rejects(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_FILE_MB", 0.1)
+    before = _stored()
+    resp = client.post("/images/bulk", files=_files(
+        ("readme.txt", b"text", "text/plain"),
+        ("big.jpg", _jpeg(1)),
+        ("big.zip", _zip({"inner.jpg": _jpeg(2)}), "application/zip"),
+        ("broken.zip", b"not a zip", "application/zip"),
+    ))
+
+    reasons = [(i["filename"], i["reason"]) for i in resp.json()["items"]]
+    assert reasons == [
+        ("readme.txt", "File must be an image"),
+        ("big.jpg", "File is larger than 0.1 MB"),
+        ("inner.jpg", "File is larger than 0.1 MB"),
+        ("broken.zip", "Not a valid zip archive"),
+    ]
+    assert _stored() == before
+
+
+def test_duplicate_names_in_one_request(client):
+    archive = _zip({"a/IMG_0001.jpg": _jpeg(2)})
+    resp = client.post("/images/bulk", files=_files(("IMG_0001.jpg", _jpeg(1)), ("dupes.zip", archive, "application/zip")))
+
+    items = resp.json()["items"]
+    assert [i["accepted"] for i in items] == [True, False]
+    assert items[1]["reason"] == "Duplicate file name in this upload"
+
+
+def test_failed_insert_removes_only_this_requests_files(client, monkeypatch):
+    existing = client.post("/images/bulk", files=_files(("IMG_0001.jpg", _jpeg(1)))).json()["items"][0]["image"]
+    before = _stored()
+
+    def fail(db, entries):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(image_service, "save_uploaded_images", fail)
+    with pytest.raises(RuntimeError):
+        client.post("/images/bulk", files=_files(("IMG_0001.jpg", _jpeg(2)), ("IMG_0002.jpg", _jpeg(3))))
+
+    assert _stored() == before
+    assert os.path.exists(existing["filepath"])
@@ -0,0 +1,90 @@
+"""
+    Tests for the HTTP detection backend's use of the YOLO node pool.
+
+    Requests are answered by a fake `requests.post`; the clock the backend
+    times calls with is faked where durations matter.
+"""
+
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas.videos import VideoDetectParams
+from app.services import detection_backends
+from app.services.detection_backends import HttpDetectionBackend
+from app.services.yolo_pool import YoloNodePool
+
+
+class _Response:
+    status_code = 200
+    text = ""
+
+    def json(self):
+        return {"objects": [], "tracks": []}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(detection_backends.requests, "post", lambda *a, **kw: _Response())
+    pool = YoloNodePool(["http://a/detect", "http://b/detect"])
+    for node in pool.nodes:
+        for _ in range(pool.MIN_SAMPLES):
+            pool.release(pool.acquire(exclude=next(n for n in pool.nodes if n is not node)), 100.0, True)
+    return HttpDetectionBackend(pool)
+
+
+def _slow_clock(monkeypatch, seconds: float) -> None:
+    """Each call the backend times appears to take `seconds`."""
+    ticks = iter(range(0, 10 ** 9, int(seconds)))
+    monkeypatch.setattr(detection_backends, "time", SimpleNamespace(perf_counter=lambda: float(next(ticks))))
+
+
+def test_video_calls_do_not_feed_node_latency(backend, monkeypatch):
+    _slow_clock(monkeypatch, 600)
+    for _ in range(10):
+        backend.detect_video("/tmp/v.mp4", VideoDetectParams(keyframe_interval=5))
+
+    nodes = backend.snapshot()["nodes"]
+    assert [n["available"] for n in nodes] == [True, True]
+    assert [n["ewma_ms"] for n in nodes] == [100.0, 100.0]
+
+
+def test_slow_image_calls_still_eject_the_node(backend, monkeypatch):
+    _slow_clock(monkeypatch, 600)
+    backend.detect("/tmp/i.jpg", None)
+
+    assert [n["available"] for n in backend.snapshot()["nodes"]].count(False) == 1
+
+
+def test_backups_do_not_queue_behind_slow_primaries(monkeypatch):
+    # Every first attempt hangs, every retry answers at once: all callers depend on their backup
+    seen, lock = set(), threading.Lock()
+
+    def post(url, json, **kwargs):
+        with lock:
+            first = json["image_path"] not in seen
+            seen.add(json["image_path"])
+        if first:
+            time.sleep(1.0)
+        return _Response()
+
+    monkeypatch.setattr(detection_backends.requests, "post", post)
+    callers = 8
+    backend = HttpDetectionBackend(
+        YoloNodePool(["http://a/detect", "http://b/detect"]), hedge_after_ms=20, max_in_flight=callers,
+    )
+    barrier = threading.Barrier(callers)
+
+    def detect(i):
+        barrier.wait()
+        started = time.monotonic()
+        backend.detect(f"/tmp/{i}.jpg", None)
+        return time.monotonic() - started
+
+    with ThreadPoolExecutor(callers) as executor:
+        durations = list(executor.map(detect, range(callers)))
+    assert max(durations) < 0.5
@@ -0,0 +1,27 @@
+"""
+    Tests for eager (background) detection.
+
+    A pipeline worker must detect right away: it may not wait on its own
+    running job the way an interactive caller joins one.
+"""
+
+
+import time
+
+from app.config import settings
+from app.services import detection_service
+
+
+def test_background_job_does_not_wait_on_itself(make_image, monkeypatch):
+    monkeypatch.setattr(settings, "YOLO_TIMEOUT_S", 30.0)
+    image = make_image()
+
+    started = time.monotonic()
+    future = detection_service.enqueue_detection(image.id)
+    result = future.result(timeout=10)
+
+    assert time.monotonic() - started < 5
+    assert result.image_id == image.id
+    with detection_service.SessionLocal() as db:
+        assert detection_service.get_cached_detection(db, image.id) is not None
+
@@ -0,0 +1,83 @@
+"""
+    Tests for server-side hit-testing and selection.
+
+    Repeated queries on an unchanged detection reuse the parsed result and
+    index, a changed detection is never answered from a stale index, and
+    malformed lasso points are rejected with 422.
+"""
+
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.deps import get_current_user
+from app.main import app
+from app.schemas.hotspots import BBox, DetectedObject, DetectionResult, SelectionRequest
+from app.services import detection_service, hit_testing
+
+
+def _square(obj_id: int, x1: float, y1: float, x2: float, y2: float, contour=None) -> DetectedObject:
+    return DetectedObject(
+        id=obj_id, label="poster", score=0.9,
+        contour=contour or [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+        bbox=BBox(x1=x1, y1=y1, x2=x2, y2=y2),
+    )
+
+
+def _store(db, image_id: int, *objects: DetectedObject) -> None:
+    result = DetectionResult(image_id=image_id, width=100, height=100, objects=list(objects))
+    detection_service.store_detection(db, result)
+
+
+@pytest.fixture
+def image_id(db, make_image, monkeypatch):
+    def no_detection(*args, **kwargs):
+        raise AssertionError("stored detection expected")
+
+    monkeypatch.setattr(detection_service, "run_yolo_detection", no_detection)
+    return make_image().id
+
+
+def test_repeated_queries_do_not_reparse(db, image_id, monkeypatch):
+    _store(db, image_id, _square(0, 0.1, 0.1, 0.5, 0.5))
+    parses = []
+
+    class CountingResult:
+        @staticmethod
+        def model_validate_json(data):
+            parses.append(data)
+            return DetectionResult.model_validate_json(data)
+
+    monkeypatch.setattr(hit_testing, "DetectionResult", CountingResult)
+
+    for _ in range(3):
+        assert [o.id for o in hit_testing.hit_test(db, image_id, 30, 30).objects] == [0]
+    lasso = SelectionRequest(lasso=[(0, 0), (60, 0), (60, 60)])
+    assert [o.id for o in hit_testing.select_objects(db, image_id, lasso).objects] == [0]
+    assert len(parses) == 1
+
+
+def test_changed_geometry_is_not_served_from_a_stale_index(db, image_id):
+    # Same bbox and point count, different shape: a concave sliver along the top and left edges
+    square = _square(0, 0.1, 0.1, 0.5, 0.5)
+    sliver = _square(0, 0.1, 0.1, 0.5, 0.5, contour=[[0.1, 0.1], [0.5, 0.1], [0.15, 0.15], [0.1, 0.5]])
+    _store(db, image_id, square)
+    assert [o.id for o in hit_testing.hit_test(db, image_id, 40, 40).objects] == [0]
+
+    _store(db, image_id, sliver)
+    assert hit_testing.hit_test(db, image_id, 40, 40).objects == []
+    assert [o.id for o in hit_testing.hit_test(db, image_id, 12, 30).objects] == [0]
+
+
+@pytest.mark.parametrize("lasso", [
+    [[0, 0, 1], [1, 0], [1, 1]],     # three coordinates
+    [[0], [1, 0], [1, 1]],           # one coordinate
+    [["a", "b"], [1, 0], [1, 1]],    # not numbers
+])
+def test_malformed_lasso_is_rejected(image_id, lasso):
+    app.dependency_overrides[get_current_user] = lambda: None
+    try:
+        response = TestClient(app).post(f"/hotspots/{image_id}/select", json={"lasso": lasso})
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert response.status_code == 422
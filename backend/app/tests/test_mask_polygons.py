@@ -0,0 +1,33 @@
+"""
+    Tests for tracing YOLO masks into polygons (`yolo_app.mask_to_polygons`).
+
+    Sub-pixel refinement traces an upsampled copy of the mask; mapping it
+    back must undo the resize's half-pixel offset, or every refined ring
+    lands shifted right and down compared with the pixel-accurate one.
+"""
+
+
+import numpy as np
+import pytest
+
+
+def _extent(yolo_app, mask, orig_shape, subpixel):
+    """Min and max corner of the first polygon's exterior, in original-image pixels."""
+    polygon, = yolo_app.mask_to_polygons(mask, orig_shape, subpixel=subpixel)
+    ring = np.asarray(polygon.exterior) * np.array([orig_shape[1], orig_shape[0]])
+    return ring.min(axis=0), ring.max(axis=0)
+
+
+@pytest.mark.parametrize("orig_shape", [(160, 160), (80, 160), (320, 160)], ids=["square", "wide", "tall"])
+def test_subpixel_rings_stay_centred_on_the_mask(yolo_app, orig_shape):
+    mask = np.zeros((160, 160), dtype=np.float32)
+    mask[50:110, 50:110] = 1.0   # inside the content area for every letterbox here
+
+    lo, hi = _extent(yolo_app, mask, orig_shape, subpixel=False)
+    sub_lo, sub_hi = _extent(yolo_app, mask, orig_shape, subpixel=True)
+
+    # Sub-pixel edges sit up to half a pixel further out, symmetrically on both sides
+    gain = min(160 / orig_shape[0], 160 / orig_shape[1])
+    np.testing.assert_allclose((sub_lo + sub_hi) / 2, (lo + hi) / 2, atol=0.05 / gain)
+    assert np.all(sub_lo <= lo) and np.all(sub_hi >= hi)
+    assert np.all((sub_hi - sub_lo) - (hi - lo) <= 1.0 / gain)
@@ -0,0 +1,119 @@
+"""
+    Tests for the shared COCO RLE mask helpers.
+
+    Results are checked against the same operation done on dense numpy
+    masks, plus a few hand-encoded COCO strings for the counts codec.
+"""
+
+
+import numpy as np
+import pytest
+
+from photo_contour_shared import rle
+
+
+def _mask(shape, seed: int = 0) -> np.ndarray:
+    """A random mask whose first and last pixels are set (runs touching the frame edges)."""
+    rng = np.random.default_rng(seed)
+    mask = rng.random(shape) > 0.6
+    mask[0, :3] = mask[-1, -3:] = True
+    return mask
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (1, 7), (7, 1), (40, 30), (37, 53)])
+@pytest.mark.parametrize("fill", ["random", "empty", "full"])
+def test_encode_decode_round_trip(shape, fill):
+    mask = {"random": _mask, "empty": np.zeros, "full": np.ones}[fill](shape).astype(bool)
+    encoded = rle.encode(mask)
+    assert encoded["size"] == list(shape)
+    np.testing.assert_array_equal(rle.decode(encoded), mask)
+    assert rle.area(encoded) == mask.sum()
+
+
+def test_counts_match_coco_strings():
+    # Column-major runs: [[0, 1], [1, 1]] -> 1 zero, 3 ones
+    assert rle.encode(np.array([[0, 1], [1, 1]], dtype=bool)) == {"size": [2, 2], "counts": "13"}
+    assert rle.encode(np.ones((3, 3), dtype=bool)) == {"size": [3, 3], "counts": "09"}
+    assert rle.empty((2, 3)) == {"size": [2, 3], "counts": "6"}
+
+
+def test_counts_codec_round_trip():
+    rng = np.random.default_rng(1)
+    # Large values and runs shorter than the one two before (negative deltas)
+    counts = [0, 1, 5, 3, 1, 2, 100000, 1, 31, 32, 33, 7] + rng.integers(1, 5000, 200).tolist()
+    assert rle.decompress_counts(rle.compress_counts(counts)) == counts
+
+
+def test_encode_batch_places_masks_in_a_larger_frame():
+    masks = np.stack([_mask((10, 12), seed) for seed in range(3)])
+    placed = rle.encode_batch(masks, offset=(5, 7), size=(30, 25))
+    for mask, encoded in zip(masks, placed):
+        full = np.zeros((30, 25), dtype=bool)
+        full[7:17, 5:17] = mask
+        assert encoded["size"] == [30, 25]
+        np.testing.assert_array_equal(rle.decode(encoded), full)
+
+
+def test_translate_matches_dense_placement():
+    mask = _mask((10, 12))
+    moved = rle.translate(rle.encode(mask), (13, 4), (20, 30))
+    full = np.zeros((20, 30), dtype=bool)
+    full[4:14, 13:25] = mask
+    assert moved["size"] == [20, 30]
+    np.testing.assert_array_equal(rle.decode(moved), full)
+    assert rle.bbox(moved) == (13, 4, 25, 14)
+
+
+@pytest.mark.parametrize("n", [1, 2, 4])
+def test_merge_matches_dense_union_and_intersection(n):
+    masks = [_mask((25, 18), seed) for seed in range(n)]
+    encoded = [rle.encode(m) for m in masks]
+    np.testing.assert_array_equal(rle.decode(rle.merge(encoded)), np.logical_or.reduce(masks))
+    np.testing.assert_array_equal(rle.decode(rle.merge(encoded, intersect=True)), np.logical_and.reduce(masks))
+
+
+def test_merge_joins_touching_runs_and_checks_sizes():
+    top, bottom = np.zeros((4, 2), dtype=bool), np.zeros((4, 2), dtype=bool)
+    top[:2, 0] = True
+    bottom[2:, 0] = True
+    merged = rle.merge([rle.encode(top), rle.encode(bottom)])
+    assert merged == rle.encode(top | bottom)
+    assert rle.area(rle.merge([rle.encode(top), rle.encode(bottom)], intersect=True)) == 0
+
+    with pytest.raises(ValueError):
+        rle.merge([rle.encode(top), rle.empty((2, 4))])
+    with pytest.raises(ValueError):
+        rle.merge([])
+
+
+def test_queries_match_dense_mask():
+    mask = _mask((30, 40))
+    encoded = rle.encode(mask)
+    ys, xs = np.nonzero(mask)
+    assert rle.bbox(encoded) == (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+    assert rle.bbox(rle.empty((5, 5))) == (0, 0, 0, 0)
+    assert rle.area_in_box(encoded, 5, 3, 22, 17) == mask[3:17, 5:22].sum()
+    for x, y in [(0, 0), (39, 29), (10, 7), (40, 0), (-1, 3)]:
+        expected = bool(0 <= x < 40 and 0 <= y < 30 and mask[y, x])
+        assert rle.contains(encoded, x, y) == expected
+
+    other = _mask((30, 40), seed=5)
+    expected_iou = (mask & other).sum() / (mask | other).sum()
+    assert rle.iou(encoded, rle.encode(other)) == pytest.approx(expected_iou)
+    assert rle.iou(rle.empty((30, 40)), rle.empty((30, 40))) == 0.0
+
+
+@pytest.mark.parametrize("size", [(240, 320), (181, 247), (30, 20), (60, 80)])
+def test_resize_matches_nearest_neighbour(size):
+    mask = _mask((60, 80))
+    new_h, new_w = size
+    rows = np.minimum(((np.arange(new_h) + 0.5) * 60 / new_h).astype(int), 59)
+    cols = np.minimum(((np.arange(new_w) + 0.5) * 80 / new_w).astype(int), 79)
+
+    resized = rle.resize(rle.encode(mask), size)
+    assert resized["size"] == [new_h, new_w]
+    np.testing.assert_array_equal(rle.decode(resized), mask[np.ix_(rows, cols)])
+
+
+def test_resize_empty_mask():
+    assert rle.resize(rle.empty((4, 4)), (8, 6)) == rle.empty((8, 6))
@@ -0,0 +1,85 @@
+"""
+    Tests for merging ROI re-detections into a stored object list.
+
+    Covers the IoU dedupe (boxes, or masks when both sides have them),
+    id assignment, and dropping truncated copies cut by an ROI edge.
+"""
+
+
+import numpy as np
+
+from photo_contour_shared import rle
+from app.schemas.hotspots import BBox, DetectedObject, RleMask
+from app.services.detection_service import merge_objects
+
+
+FULL = [0.0, 0.0, 1.0, 1.0]
+
+
+def _obj(id: int, box, label: str = "cat", score: float = 0.9, mask=None) -> DetectedObject:
+    return DetectedObject(
+        id=id, label=label, score=score, bbox=BBox(x1=box[0], y1=box[1], x2=box[2], y2=box[3]),
+        contour=[[box[0], box[1]], [box[2], box[1]], [box[2], box[3]]],
+        mask_rle=RleMask(**rle.encode(mask)) if mask is not None else None,
+    )
+
+
+def test_overlapping_same_label_replaces_and_keeps_id():
+    existing = [_obj(0, (0.1, 0.1, 0.4, 0.4)), _obj(3, (0.6, 0.6, 0.9, 0.9))]
+    found = [_obj(0, (0.11, 0.1, 0.41, 0.4), score=0.99)]
+
+    merged = merge_objects(existing, found, FULL)
+    assert [o.id for o in merged] == [0, 3]
+    assert merged[0].score == 0.99
+    assert existing[0].score == 0.9  # input list is not modified
+
+
+def test_new_objects_get_fresh_ids():
+    existing = [_obj(0, (0.1, 0.1, 0.4, 0.4)), _obj(3, (0.6, 0.6, 0.9, 0.9))]
+    found = [
+        _obj(0, (0.1, 0.1, 0.4, 0.4), label="dog"),  # same place, other label
+        _obj(1, (0.45, 0.05, 0.55, 0.15)),           # nothing there yet
+    ]
+
+    merged = merge_objects(existing, found, FULL)
+    assert [(o.id, o.label) for o in merged] == [(0, "cat"), (3, "cat"), (4, "dog"), (5, "cat")]
+
+
+def test_iou_threshold():
+    existing = [_obj(0, (0.0, 0.0, 0.4, 0.4))]
+    found = [_obj(0, (0.1, 0.0, 0.5, 0.4))]  # IoU 0.6
+
+    assert [o.id for o in merge_objects(existing, found, FULL, iou_threshold=0.5)] == [0]
+    assert [o.id for o in merge_objects(existing, found, FULL, iou_threshold=0.7)] == [0, 1]
+
+
+def test_masks_override_box_overlap():
+    size = (100, 100)
+    ring = np.zeros(size, dtype=bool)
+    ring[10:50, 10:50] = True
+    ring[14:46, 14:46] = False  # hollow square
+    inner = np.zeros(size, dtype=bool)
+    inner[18:42, 18:42] = True
+
+    existing = [_obj(0, (0.1, 0.1, 0.5, 0.5), mask=ring)]
+    found = [_obj(0, (0.1, 0.1, 0.5, 0.5), mask=inner)]  # identical boxes, disjoint masks
+    assert [o.id for o in merge_objects(existing, found, FULL)] == [0, 1]
+
+    found = [_obj(0, (0.1, 0.1, 0.5, 0.5), mask=ring)]
+    assert [o.id for o in merge_objects(existing, found, FULL)] == [0]
+
+
+def test_truncated_copy_at_roi_edge_is_dropped():
+    # A wide base object; the ROI only sees its left part, cut at x=0.5
+    existing = [_obj(0, (0.2, 0.2, 0.8, 0.4))]
+    roi = [0.0, 0.0, 0.5, 0.5]
+    truncated = _obj(0, (0.2, 0.2, 0.5, 0.4))
+
+    assert [o.id for o in merge_objects(existing, [truncated], roi)] == [0]
+    # The same box away from the edge is a real, separate detection
+    assert [o.id for o in merge_objects(existing, [truncated], [0.0, 0.0, 0.6, 0.5])] == [0, 1]
+    # A right ROI edge on the image border doesn't truncate anything
+    wide = [_obj(0, (0.2, 0.2, 1.0, 0.4))]
+    right_part = _obj(0, (0.7, 0.2, 1.0, 0.4))  # IoU 0.375, fully inside the base box
+    assert [o.id for o in merge_objects(wide, [right_part], [0.6, 0.0, 1.0, 0.5])] == [0, 1]
+    assert [o.id for o in merge_objects(wide, [right_part], [0.6, 0.0, 0.999, 0.5])] == [0]
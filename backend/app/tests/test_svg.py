@@ -1,7 +1,114 @@
 """
-    Tests for interactive SVG generation.
+    Tests for interactive SVG generation and its render cache.
 
-    Verifies that the SVG builder creates valid documents that embed
-    the original image and correctly represent hotspot coordinates
-    and annotation text.
-"""
\ No newline at end of file
+    The cache is observed the way operators see it: `render_svg` results,
+    the `cache_requests_total` hit/miss counters and the `svg_render_cache`
+    occupancy gauge on /metrics. Renders are keyed on the object geometry
+    itself, and the cache stays within `SVG_RENDER_CACHE_MAX_MB`, counting
+    compressed copies made after a render was cached.
+"""
+
+
+import re
+
+import pytest
+
+from app.config import settings
+from app.schemas.hotspots import BBox, DetectedObject, DetectionResult, HotspotCreate, Polygon
+from app.services import detection_service, svg_service
+from photo_contour_shared.metrics import CACHE_REQUESTS, REGISTRY
+
+
+MIB = 1024 * 1024
+
+
+def _detect(db, image, contour=None, polygons=None) -> None:
+    obj = DetectedObject(
+        id=0, label="poster", score=0.9, contour=contour, polygons=polygons,
+        bbox=BBox(x1=32, y1=24, x2=288, y2=216),
+    )
+    detection_service.store_detection(db, DetectionResult(image_id=image.id, width=320, height=240, objects=[obj]))
+
+
+def _render(db, image, text: str = "Poster") -> svg_service.RenderedSvg:
+    hotspot = HotspotCreate(image_id=image.id, object_id=0, text=text, link="https://example.com")
+    return svg_service.render_svg(db, hotspot)
+
+
+def _lookups() -> tuple:
+    return CACHE_REQUESTS.value(cache="svg_render", result="hit"), CACHE_REQUESTS.value(cache="svg_render", result="miss")
+
+
+def _counted(since: tuple) -> tuple:
+    """(hits, misses) since an earlier `_lookups()`."""
+    hits, misses = _lookups()
+    return hits - since[0], misses - since[1]
+
+
+def _cache_gauge(field: str) -> int:
+    match = re.search(rf'^svg_render_cache\{{field="{field}"\}} (\d+)$', REGISTRY.render(), re.MULTILINE)
+    return int(match.group(1))
+
+
+@pytest.fixture
+def image(db, make_image, monkeypatch):
+    monkeypatch.setattr(settings, "SVG_RENDER_CACHE_SIZE", 100)
+    svg_service._cache_clear()
+    image = make_image()
+    _detect(db, image, contour=[[0.1, 0.1], [0.9, 0.1], [0.9, 0.9], [0.1, 0.9]])
+    yield image
+    svg_service._cache_clear()
+
+
+def test_renders_are_keyed_on_geometry_not_point_count(db, image):
+    before = _lookups()
+    first = _render(db, image)
+    assert _render(db, image) is first
+    assert _counted(before) == (1, 1)
+
+    # Same bbox and point count, different shape
+    _detect(db, image, contour=[[0.1, 0.1], [0.9, 0.1], [0.5, 0.5], [0.1, 0.9]])
+    moved = _render(db, image)
+    assert moved.svg != first.svg
+    assert _counted(before) == (1, 2)
+
+    ring = [[0.1, 0.1], [0.9, 0.1], [0.9, 0.9]]
+    _detect(db, image, polygons=[Polygon(exterior=ring)])
+    solid = _render(db, image)
+    _detect(db, image, polygons=[Polygon(exterior=ring, holes=[[[0.4, 0.4], [0.6, 0.4], [0.5, 0.6]]])])
+    assert _render(db, image).svg != solid.svg
+    assert _counted(before) == (1, 4)
+
+
+def test_cache_is_bounded_by_bytes(db, image, monkeypatch):
+    size = _render(db, image, "Poster A").nbytes
+    monkeypatch.setattr(settings, "SVG_RENDER_CACHE_MAX_MB", 2.5 * size / MIB)
+    _render(db, image, "Poster B")
+    _render(db, image, "Poster C")
+    assert _cache_gauge("entries") == 2
+    assert _cache_gauge("bytes") <= 2.5 * size
+
+    before = _lookups()
+    _render(db, image, "Poster C")
+    _render(db, image, "Poster A")   # the oldest render went first
+    assert _counted(before) == (1, 1)
+
+
+def test_cache_counts_compressed_copies(db, image, monkeypatch):
+    a = _render(db, image, "Poster A")
+    gz = len(svg_service.RenderedSvg(a.svg).encoded("gzip"))
+    b = _render(db, image, "Poster B")
+    monkeypatch.setattr(settings, "SVG_RENDER_CACHE_MAX_MB", (a.nbytes + b.nbytes + gz // 2) / MIB)
+    assert _cache_gauge("bytes") == a.nbytes + b.nbytes
+
+    # Compressing B pushes the cache past its budget, so A (least recently used) goes
+    b.encoded("gzip")
+    assert _cache_gauge("entries") == 1
+    assert _cache_gauge("bytes") == b.nbytes
+    before = _lookups()
+    assert _render(db, image, "Poster B") is b
+    assert _counted(before) == (1, 0)
+
+    # Copies made of an evicted render are not charged to the cache
+    a.encoded("gzip")
+    assert _cache_gauge("bytes") == b.nbytes
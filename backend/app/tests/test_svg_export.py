@@ -0,0 +1,95 @@
+"""
+    Tests for bulk SVG export.
+
+    Exported hotspots become archive entries; anything that can't be
+    rendered is listed in `manifest.json` instead of aborting the archive,
+    and detection runs in the limiter's background lane.
+"""
+
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from app.core.zipstream import stream_zip
+from app.schemas.hotspots import BBox, DetectedObject, DetectionResult, HotspotCreate
+from app.services import detection_service, svg_service
+
+
+def _hotspot(image_id: int, object_id: int, text: str = "Poster") -> HotspotCreate:
+    return HotspotCreate(image_id=image_id, object_id=object_id, text=text, link="https://example.com")
+
+
+def _export(hotspots, format: str = "svg") -> dict:
+    with zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(svg_service.export_svgs(hotspots, format))))) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+@pytest.fixture
+def detections(monkeypatch):
+    """Records the `background` flag of every detection the export runs."""
+    calls = []
+    detect = detection_service.run_yolo_detection
+
+    def spy(db, image_id, params=None, **kwargs):
+        calls.append(kwargs.get("background", False))
+        return detect(db, image_id, params, **kwargs)
+
+    monkeypatch.setattr(detection_service, "run_yolo_detection", spy)
+    svg_service._cache_clear()
+    yield calls
+    svg_service._cache_clear()
+
+
+@pytest.fixture
+def image(db, make_image):
+    image = make_image()
+    obj = DetectedObject(
+        id=0, label="poster", score=0.9,
+        contour=[[0.1, 0.1], [0.5, 0.1], [0.5, 0.5], [0.1, 0.5]],
+        bbox=BBox(x1=32, y1=24, x2=160, y2=120),
+    )
+    detection_service.store_detection(db, DetectionResult(image_id=image.id, width=320, height=240, objects=[obj]))
+    return image
+
+
+def test_failures_are_listed_in_the_manifest(image, detections):
+    files = _export([
+        _hotspot(image.id, 0, "Front poster"),
+        _hotspot(image.id, 0, "Front poster"),      # same name twice
+        _hotspot(image.id, 7),                      # no such object
+        _hotspot(999_999, 0),                       # no such image
+    ])
+    manifest = json.loads(files.pop("manifest.json"))
+
+    names = [f["name"] for f in manifest["files"]]
+    assert len(names) == 2 and len(set(names)) == 2
+    assert sorted(files) == sorted(names)
+    assert all(data.startswith(b"<?xml") and b"<svg" in data for data in files.values())
+    assert sorted((e["image_id"], e["object_id"], e["detail"]) for e in manifest["errors"]) == [
+        (image.id, 7, "Object not found"),
+        (999_999, 0, "Image not found"),
+    ]
+
+
+def test_unexpected_errors_do_not_abort_the_archive(image, detections, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("/secret/path/exploded")
+
+    monkeypatch.setattr(svg_service, "_render_for_export", broken)
+    files = _export([_hotspot(image.id, 0)])
+
+    manifest = json.loads(files.pop("manifest.json"))
+    assert files == {} and manifest["files"] == []
+    assert manifest["errors"] == [
+        {"image_id": image.id, "object_id": 0, "detail": "Export failed (RuntimeError)"}
+    ]
+
+
+def test_export_detects_in_the_background_lane(image, detections):
+    files = _export([_hotspot(image.id, 0)], format="svgz")
+    assert detections == [True]
+    name, = (n for n in files if n != "manifest.json")
+    assert name.endswith(".svgz") and files[name][:2] == b"\x1f\x8b"
@@ -0,0 +1,123 @@
+"""
+    Tests for the animated SVG overlay of a video timeline.
+
+    Checks the SMIL timing (one path per keyframe segment, keyTimes from 0
+    to 1) and that tracked frames move the keyframe contour by their SVG
+    `matrix(a b c d e f)` transform.
+"""
+
+
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.schemas.hotspots import BBox
+from app.schemas.videos import Track, TrackFrame, VideoTimeline
+from app.services.video_service import render_timeline_svg
+
+
+SVG = "{http://www.w3.org/2000/svg}"
+SQUARE = [[0.2, 0.2], [0.4, 0.2], [0.4, 0.4], [0.2, 0.4]]
+W, H, FPS = 200, 100, 10.0
+
+
+def _frame(i: int, contour=None, transform=None) -> TrackFrame:
+    return TrackFrame(
+        frame=i, t=i / FPS, keyframe=contour is not None, contour=contour, transform=transform,
+        bbox=BBox(x1=0.2, y1=0.2, x2=0.4, y2=0.4),
+    )
+
+
+def _timeline(*tracks: Track, frame_count: int = 10) -> VideoTimeline:
+    return VideoTimeline(
+        video_id=1, fps=FPS, frame_count=frame_count, width=W, height=H, processed_frames=frame_count,
+        frame_stride=1, keyframes=[0], tracks=list(tracks),
+    )
+
+
+def _points(d: str) -> np.ndarray:
+    """Pixel points of an "M x,y L x,y ... Z" path."""
+    return np.array([[float(x), float(y)] for x, y in re.findall(r"(-?[\d.]+),(-?[\d.]+)", d)])
+
+
+def _paths(svg: str) -> list:
+    return ET.fromstring(svg).findall(f"{SVG}g/{SVG}path")
+
+
+@pytest.fixture(autouse=True)
+def four_points(monkeypatch):
+    # Resampling a 4-point square to 4 points keeps it as is
+    monkeypatch.setattr(settings, "VIDEO_SVG_MAX_POINTS", 4)
+
+
+def test_tracked_frames_apply_their_transform():
+    rotate = [0.0, 1.0, -1.0, 0.0, 0.5, 0.0]  # 90°: (x, y) -> (-y + 0.5, x)
+    track = Track(id=7, label="car", score=0.9, frames=[
+        _frame(0, contour=SQUARE),
+        _frame(1, transform=[1.0, 0.0, 0.0, 1.0, 0.1, 0.05]),
+        _frame(2, transform=[2.0, 0.0, 0.0, 2.0, 0.0, 0.0]),
+        _frame(3, transform=rotate),
+    ])
+    (path,) = _paths(render_timeline_svg(_timeline(track)))
+    animate = path.find(f"{SVG}animate")
+    values = animate.get("values").split(";")
+
+    square = np.array(SQUARE)
+    expected = [
+        square,
+        square + (0.1, 0.05),
+        square * 2,
+        np.stack([-square[:, 1] + 0.5, square[:, 0]], axis=1),
+    ]
+    assert len(values) == len(expected) + 1  # the last position is held to the end
+    for d, pts in zip(values, expected + expected[-1:]):
+        np.testing.assert_allclose(_points(d), pts * (W, H), atol=0.05)
+    assert path.get("d") == values[0]
+
+
+def test_key_times_span_the_segment():
+    track = Track(id=1, label="car", score=0.9, frames=[
+        _frame(0, contour=SQUARE),
+        *(_frame(i, transform=[1.0, 0.0, 0.0, 1.0, 0.01 * i, 0.0]) for i in (1, 2, 4)),
+    ])
+    (path,) = _paths(render_timeline_svg(_timeline(track)))
+    animate = path.find(f"{SVG}animate")
+    key_times = [float(k) for k in animate.get("keyTimes").split(";")]
+
+    # Segment runs from frame 0 to one frame past the last tracked frame
+    assert key_times == pytest.approx([0.0, 0.2, 0.4, 0.8, 1.0])
+    assert len(key_times) == len(animate.get("values").split(";"))
+    assert animate.get("dur") == "0.500s"
+
+
+def test_each_keyframe_starts_a_new_segment():
+    moved = [[x + 0.3, y] for x, y in SQUARE]
+    track = Track(id=1, label="a&b", score=0.9, frames=[
+        _frame(0, contour=SQUARE),
+        _frame(1, transform=[1.0, 0.0, 0.0, 1.0, 0.1, 0.0]),
+        _frame(5, contour=moved),
+    ])
+    svg = render_timeline_svg(_timeline(track))
+    first, second = _paths(svg)
+
+    np.testing.assert_allclose(_points(second.get("d")), np.array(moved) * (W, H), atol=0.05)
+    visible = [p.find(f"{SVG}set") for p in (first, second)]
+    assert [s.get("begin").split(";")[0] for s in visible] == ["0.000s", "0.500s"]
+    assert [s.get("dur") for s in visible] == ["0.200s", "0.100s"]
+    # A lone keyframe has nothing to interpolate
+    assert second.find(f"{SVG}animate") is None
+    assert first.find(f"{SVG}title").text == "a&b"
+
+
+def test_segment_end_is_clamped_to_the_video():
+    track = Track(id=1, label="car", score=0.9, frames=[
+        _frame(0, contour=SQUARE),
+        _frame(9, transform=[1.0, 0.0, 0.0, 1.0, 0.1, 0.0]),
+    ])
+    (path,) = _paths(render_timeline_svg(_timeline(track, frame_count=10)))
+    animate = path.find(f"{SVG}animate")
+    assert animate.get("dur") == "1.000s"
+    assert animate.get("keyTimes").split(";")[-1] == "1"
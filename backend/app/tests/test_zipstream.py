@@ -0,0 +1,56 @@
+"""
+    Tests for streaming zip archives.
+
+    The streamed chunks must form a valid archive with every entry's data
+    intact, and entries must be yielded as they are written rather than
+    after the whole archive is built.
+"""
+
+
+import io
+import zipfile
+
+from app.core.zipstream import stream_zip
+
+
+def _read(chunks) -> dict:
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        return {info.filename: (archive.read(info), info.compress_type) for info in archive.infolist()}
+
+
+def test_archive_round_trips():
+    entries = [
+        ("a.svg", "<svg>" + "x" * 5000 + "</svg>", zipfile.ZIP_DEFLATED),
+        ("b/raw.bin", bytes(range(256)) * 4, zipfile.ZIP_STORED),
+        ("empty.txt", b"", zipfile.ZIP_DEFLATED),
+        ("ünïcode.json", '{"ok": "✓"}', zipfile.ZIP_DEFLATED),
+    ]
+    files = _read(stream_zip(entries))
+
+    assert list(files) == [name for name, _, _ in entries]
+    for name, data, compression in entries:
+        expected = data.encode("utf-8") if isinstance(data, str) else data
+        assert files[name] == (expected, compression)
+
+
+def test_entries_are_streamed_as_produced():
+    produced = []
+
+    def entries():
+        for i in range(3):
+            produced.append(i)
+            yield f"{i}.txt", f"entry {i}", zipfile.ZIP_DEFLATED
+
+    stream = stream_zip(entries())
+    chunks = [next(stream)]
+    assert produced == [0]   # the first chunk is out before the second entry is made
+    chunks.extend(stream)
+    assert produced == [0, 1, 2]
+    assert {name: data for name, (data, _) in _read(chunks).items()} == {
+        "0.txt": b"entry 0", "1.txt": b"entry 1", "2.txt": b"entry 2",
+    }
+
+
+def test_empty_archive_is_valid():
+    assert _read(stream_zip([])) == {}
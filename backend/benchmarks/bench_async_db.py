@@ -0,0 +1,203 @@
+"""
+    Benchmark: async DB session vs the sync one under concurrent requests.
+
+    Serves the same image-by-id lookup three ways from a throwaway SQLite
+    database and drives them in-process (httpx ASGI transport) with N
+    requests in flight:
+
+      - sync:     `def` route + sync Session (FastAPI's threadpool, which
+                  caps concurrency at its token count - 40 by default)
+      - blocking: `async def` route + sync Session, the old
+                  `get_current_user` pattern (the event loop stalls on I/O)
+      - async:    `async def` route + AsyncSession (aiosqlite)
+
+    Local SQLite answers in microseconds, so every statement sleeps
+    `--latency-ms` inside the driver (a SQL function registered on each
+    connection) to stand in for a network database round trip. Reports
+    throughput, p50/p95 latency and the worst event-loop stall per
+    variant and concurrency level.
+
+    Usage (from backend/):
+        python -m benchmarks.bench_async_db
+        python -m benchmarks.bench_async_db --concurrency 40 200 --latency-ms 50 --variants sync async
+
+    The client runs in the same process, so at high concurrency CPU, not
+    the database, becomes the ceiling for every variant.
+"""
+
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+_WORKDIR = tempfile.mkdtemp(prefix="photo-contour-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_WORKDIR}/bench.db")
+
+import httpx
+import numpy as np
+from anyio import to_thread
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db.base import Base, async_database_url
+from app.models import Image
+
+
+def _with_latency(engine, latency_ms: float) -> None:
+    """Register `db_latency()` (sleeps, returns 0) on every new connection of a sync engine."""
+    def db_latency():
+        time.sleep(latency_ms / 1000)
+        return 0
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("db_latency", 0, db_latency)
+
+
+def _query(image_id: int):
+    return select(Image).where(Image.id == image_id, func.db_latency() == 0)
+
+
+def build_app(url: str, latency_ms: float, pool_size: int) -> tuple:
+    """The three variants on one app, plus the engines to dispose."""
+    pool = dict(pool_size=pool_size, max_overflow=0)
+    sync_engine = create_engine(url, connect_args={"check_same_thread": False}, **pool)
+    async_engine = create_async_engine(async_database_url(url), poolclass=AsyncAdaptedQueuePool, **pool)
+    _with_latency(sync_engine, latency_ms)
+    _with_latency(async_engine.sync_engine, latency_ms)
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    def _found(image):
+        if image is None:
+            raise HTTPException(404, "Image not found")
+        return {"id": image.id, "filename": image.filename}
+
+    app = FastAPI()
+
+    @app.get("/sync/{image_id}")
+    def sync_get(image_id: int, db: Session = Depends(get_db)):
+        return _found(db.execute(_query(image_id)).scalar_one_or_none())
+
+    @app.get("/blocking/{image_id}")
+    async def blocking_get(image_id: int, db: Session = Depends(get_db)):
+        return _found(db.execute(_query(image_id)).scalar_one_or_none())
+
+    @app.get("/async/{image_id}")
+    async def async_get(image_id: int, db: AsyncSession = Depends(get_async_db)):
+        return _found((await db.execute(_query(image_id))).scalar_one_or_none())
+
+    return app, sync_engine, async_engine
+
+
+def seed(url: str, n_images: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(
+            Image(filename=f"img_{i}.jpg", filepath=f"/tmp/img_{i}.jpg", width=640, height=480)
+            for i in range(n_images)
+        )
+        db.commit()
+    engine.dispose()
+
+
+async def _loop_lag(stop: asyncio.Event, interval: float = 0.001) -> float:
+    """Worst delay of a 1 ms timer while the load runs (how long the loop was stuck)."""
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - t0 - interval)
+    return worst * 1000
+
+
+async def run(client: httpx.AsyncClient, variant: str, n_requests: int, concurrency: int, n_images: int) -> dict:
+    latencies = []
+    queue = iter(range(n_requests))
+
+    async def worker():
+        for i in queue:
+            t0 = time.perf_counter()
+            resp = await client.get(f"/{variant}/{i % n_images + 1}")
+            resp.raise_for_status()
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    return {
+        "variant": variant,
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "rps": round(n_requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "max_loop_stall_ms": round(await lag, 2),
+    }
+
+
+async def main_async(args) -> dict:
+    url = os.environ["DATABASE_URL"]
+    seed(url, args.images)
+    app, sync_engine, async_engine = build_app(url, args.latency_ms, args.pool_size)
+
+    runs = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for variant in args.variants:
+            # Warm the pools so connection setup isn't timed
+            await run(client, variant, min(args.pool_size, 20), min(args.pool_size, 20), args.images)
+            for concurrency in args.concurrency:
+                runs.append(await run(client, variant, args.requests, concurrency, args.images))
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+    return {
+        "config": {
+            "latency_ms": args.latency_ms,
+            "pool_size": args.pool_size,
+            "threadpool_tokens": to_thread.current_default_thread_limiter().total_tokens,
+        },
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 40, 100, 200])
+    parser.add_argument("--requests", type=int, default=600, help="requests per run")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated round trip per statement")
+    parser.add_argument("--pool-size", type=int, default=200, help="connections per engine (both variants)")
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--variants", nargs="+", default=["sync", "blocking", "async"],
+                        choices=["sync", "blocking", "async"])
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+    Benchmark: compact SVG path encoding vs the legacy `M x,y ... Z` string.
+
+    Generates noisy closed contours (normalized 0-1, like the detector
+    returns) of increasing size and reports, per encoder configuration,
+    the `d` attribute size, its gzip size and the median encode time.
+
+    Usage (from backend/):
+        python -m benchmarks.bench_path_encoding
+        python -m benchmarks.bench_path_encoding --points 100 1000 50000 --size 4000x3000
+"""
+
+
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+
+from app.services.path_encoding import encode_contour, legacy_path
+
+
+CONFIGS = [
+    ("legacy", None),
+    ("abs p1", dict(precision=1, relative=False)),
+    ("rel p1", dict(precision=1, relative=True)),
+    ("rel p0", dict(precision=0, relative=True)),
+    ("rel p1 smooth", dict(precision=1, relative=True, smooth=True)),
+]
+
+
+def make_contour(n_points: int, seed: int = 0) -> list:
+    """A wobbly closed blob with `n_points` points, in normalized coordinates."""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 2 * np.pi, n_points, endpoint=False)
+    r = 0.3 + 0.05 * np.sin(7 * t) + rng.normal(0, 0.002, n_points)
+    pts = np.stack([0.5 + r * np.cos(t), 0.5 + r * np.sin(t)], axis=1)
+    return pts.tolist()
+
+
+def _time_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[100, 1000, 5000, 20000, 50000])
+    parser.add_argument("--size", default="1920x1080", help="image size WxH in pixels")
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split("x"))
+
+    report = []
+    for n in args.points:
+        contour = make_contour(n)
+        for name, opts in CONFIGS:
+            if opts is None:
+                encode = lambda: legacy_path(contour, w, h)
+            else:
+                encode = lambda: encode_contour(contour, w, h, **opts)
+            d = encode()
+            raw = d.encode()
+            report.append({
+                "points": n,
+                "encoder": name,
+                "bytes": len(raw),
+                "gzip_bytes": len(gzip.compress(raw, mtime=0)),
+                "encode_ms": round(_time_ms(encode, args.repeats), 3),
+            })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+    End-to-end load test: upload → detect → generate-svg under concurrency.
+
+    Starts the real API under uvicorn against a throwaway SQLite database
+    and upload directory, backed by one or more stub YOLO services
+    (`yolo_service/stub_app.py`) with configurable latency, jitter, error
+    rate and contour size. N simulated users then each register, log in
+    and repeat the studio flow until the run time is up:
+
+        POST /images/  →  POST /hotspots/detect/{id}  →  POST /hotspots/generate-svg
+
+    The report (JSON) has throughput, p50/p95/p99/max latency, status
+    codes and error rate per endpoint, plus the configuration, so runs
+    with different settings can be diffed.
+
+    Usage (from backend/):
+        python -m benchmarks.loadtest --users 20 --duration 30
+        python -m benchmarks.loadtest --users 50 --yolo-nodes 3 --stub-latency-ms 150 \\
+            --api-workers 2 --env DETECTION_MAX_CONCURRENCY=8 --output run-a.json
+        python -m benchmarks.loadtest --target http://localhost:8000 --users 10   # existing server
+"""
+
+
+import argparse
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import requests
+from PIL import Image as PILImage
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+STUB_DIR = BACKEND_DIR / "yolo_service"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def _spawn(cmd, cwd: Path, env: dict, log_path: Path) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(cmd, cwd=cwd, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+
+
+@contextmanager
+def running_stack(args, workdir: Path):
+    """Start the stub YOLO nodes and the API; yield the API base URL."""
+    procs = []
+    try:
+        stub_urls = []
+        for n in range(args.yolo_nodes):
+            port = _free_port()
+            procs.append(_spawn(
+                [sys.executable, "-m", "uvicorn", "stub_app:app", "--port", str(port), "--log-level", "warning"],
+                STUB_DIR,
+                {
+                    "STUB_LATENCY_MS": str(args.stub_latency_ms),
+                    "STUB_JITTER_MS": str(args.stub_jitter_ms),
+                    "STUB_OBJECTS": str(args.stub_objects),
+                    "STUB_POINTS": str(args.stub_points),
+                    "STUB_ERROR_RATE": str(args.stub_error_rate),
+                },
+                workdir / f"stub-{n}.log",
+            ))
+            stub_urls.append(f"http://127.0.0.1:{port}")
+        for url in stub_urls:
+            _wait_ready(url + "/ready")
+
+        api_port = _free_port()
+        api_env = {
+            "DATABASE_URL": f"sqlite:///{workdir}/loadtest.db",
+            "UPLOAD_DIR": str(workdir / "uploads"),
+            "DETECTION_BACKEND": "http",
+            "YOLO_SERVICE_URLS": json.dumps([u + "/detect" for u in stub_urls]),
+        }
+        api_env.update(args.env)
+        (workdir / "uploads").mkdir(parents=True, exist_ok=True)
+        # Create the tables up front: with several workers, startup would race on it
+        subprocess.run(
+            [sys.executable, "-c", "from app.db.init_db import init_db; init_db()"],
+            cwd=BACKEND_DIR, env={**os.environ, **api_env}, check=True, stdout=subprocess.DEVNULL,
+        )
+        procs.append(_spawn(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port),
+             "--workers", str(args.api_workers), "--log-level", "warning"],
+            BACKEND_DIR, api_env, workdir / "api.log",
+        ))
+        base = f"http://127.0.0.1:{api_port}"
+        _wait_ready(base + "/ping")
+        yield base
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+def make_jpeg(width: int, height: int, seed: int) -> bytes:
+    """A sharp synthetic JPEG that passes the upload quality check."""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    img[:: 40] = 0
+    buf = io.BytesIO()
+    PILImage.fromarray(img).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and status collection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint: str, elapsed_s: float, status) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(elapsed_s)
+            self.statuses[endpoint][str(status)] += 1
+            if status == "error" or int(status) >= 400:
+                self.errors[endpoint] += 1
+
+    def report(self, wall_s: float) -> dict:
+        out = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            ms = np.asarray(samples) * 1000
+            out[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(samples), 4),
+                "throughput_rps": round(len(samples) / wall_s, 2),
+                "mean_ms": round(float(ms.mean()), 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                "max_ms": round(float(ms.max()), 2),
+                "status_codes": dict(self.statuses[endpoint]),
+            }
+        return out
+
+
+def _call(rec: Recorder, endpoint: str, method, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        resp = method(url, timeout=60, **kwargs)
+    except requests.RequestException:
+        rec.record(endpoint, time.perf_counter() - started, "error")
+        return None
+    rec.record(endpoint, time.perf_counter() - started, resp.status_code)
+    return resp
+
+
+def user_session(base: str, user: int, args, images, rec: Recorder, stop_at: float, flows: list) -> None:
+    """One simulated user: sign up, log in, then loop the studio flow."""
+    s = requests.Session()
+    email = f"load-{uuid.uuid4().hex[:10]}@example.com"
+    s.post(f"{base}/auth/register", json={"email": email, "password": "loadtest"}, timeout=30)
+    resp = _call(rec, "POST /auth/login", s.post, f"{base}/auth/login", json={"email": email, "password": "loadtest"})
+    if resp is None or resp.status_code != 200:
+        return
+    s.headers["Authorization"] = f"Bearer {resp.json()['access_token']}"
+
+    i = 0
+    while time.monotonic() < stop_at and (args.iterations is None or i < args.iterations):
+        started = time.perf_counter()
+        data = images[(user + i) % len(images)]
+        i += 1
+        name = f"load_{user}_{i}_{uuid.uuid4().hex[:6]}.jpg"
+        resp = _call(rec, "POST /images/", s.post, f"{base}/images/", files={"file": (name, data, "image/jpeg")})
+        if resp is None or resp.status_code != 200:
+            continue
+        image_id = resp.json()["id"]
+
+        resp = _call(rec, "POST /hotspots/detect/{image_id}", s.post, f"{base}/hotspots/detect/{image_id}")
+        if resp is None or resp.status_code != 200 or not resp.json()["objects"]:
+            continue
+
+        resp = _call(rec, "POST /hotspots/generate-svg", s.post, f"{base}/hotspots/generate-svg", json={
+            "image_id": image_id,
+            "object_id": resp.json()["objects"][0]["id"],
+            "text": f"Load test {user}/{i}",
+            "link": "https://example.com",
+        })
+        if resp is not None and resp.status_code == 200:
+            flows.append(time.perf_counter() - started)
+
+
+def run(args) -> dict:
+    w, h = (int(v) for v in args.image_size.lower().split("x"))
+    images = [make_jpeg(w, h, seed) for seed in range(4)]
+
+    with tempfile.TemporaryDirectory(prefix="photo-contour-load-") as tmp:
+        stack = running_stack(args, Path(tmp)) if args.target is None else _existing(args.target)
+        with stack as base:
+            rec = Recorder()
+            flows: list = []
+            stop_at = time.monotonic() + args.duration
+            started = time.perf_counter()
+            threads = []
+            for user in range(args.users):
+                t = threading.Thread(target=user_session, args=(base, user, args, images, rec, stop_at, flows))
+                t.start()
+                threads.append(t)
+                time.sleep(args.ramp_up / max(args.users, 1))
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - started
+
+            detection_health = None
+            try:
+                detection_health = requests.get(f"{base}/health/detection", timeout=5).json()
+            except (requests.RequestException, ValueError):
+                pass
+
+    flow_ms = np.asarray(flows) * 1000
+    return {
+        "config": {
+            "users": args.users,
+            "duration_s": args.duration,
+            "iterations": args.iterations,
+            "api_workers": args.api_workers,
+            "yolo_nodes": args.yolo_nodes,
+            "stub_latency_ms": args.stub_latency_ms,
+            "stub_jitter_ms": args.stub_jitter_ms,
+            "stub_objects": args.stub_objects,
+            "stub_points": args.stub_points,
+            "stub_error_rate": args.stub_error_rate,
+            "image_size": args.image_size,
+            "env": args.env,
+            "target": args.target,
+        },
+        "wall_s": round(wall, 2),
+        "flows": {
+            "completed": len(flows),
+            "throughput_per_s": round(len(flows) / wall, 2),
+            "p50_ms": round(float(np.percentile(flow_ms, 50)), 2) if len(flows) else None,
+            "p95_ms": round(float(np.percentile(flow_ms, 95)), 2) if len(flows) else None,
+            "p99_ms": round(float(np.percentile(flow_ms, 99)), 2) if len(flows) else None,
+        },
+        "endpoints": rec.report(wall),
+        "detection_health": detection_health,
+    }
+
+
+@contextmanager
+def _existing(url: str):
+    yield url.rstrip("/")
+
+
+def _env_pair(value: str):
+    key, sep, val = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError("expected KEY=VALUE")
+    return key, val
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to keep issuing flows")
+    parser.add_argument("--iterations", type=int, default=None, help="max flows per user")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which users start")
+    parser.add_argument("--api-workers", type=int, default=1)
+    parser.add_argument("--yolo-nodes", type=int, default=1)
+    parser.add_argument("--stub-latency-ms", type=float, default=80)
+    parser.add_argument("--stub-jitter-ms", type=float, default=20)
+    parser.add_argument("--stub-objects", type=int, default=3)
+    parser.add_argument("--stub-points", type=int, default=500)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--image-size", default="1280x960")
+    parser.add_argument("--env", type=_env_pair, action="append", default=[],
+                        help="extra API setting, e.g. --env DETECTION_MAX_CONCURRENCY=8 (repeatable)")
+    parser.add_argument("--target", default=None, help="load an already running API instead of spawning one")
+    parser.add_argument("--output", default=None, help="write the JSON report here as well")
+    args = parser.parse_args()
+    args.env = dict(args.env)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
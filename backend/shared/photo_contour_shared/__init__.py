@@ -0,0 +1,8 @@
+"""
+    Code shared by the API and the YOLO service.
+
+    Metrics, tracing, request profiling and COCO RLE masks. Stdlib and
+    numpy only (FastAPI is imported lazily by the profiling admin router),
+    so the YOLO service can be deployed without the API package: both
+    install this one (`pip install ./shared`).
+"""
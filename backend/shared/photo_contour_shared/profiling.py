@@ -0,0 +1,256 @@
+"""
+    On-demand request profiling.
+
+    An opt-in sampling profiler for live requests. A request is profiled
+    when it carries `X-Profile: <admin token>` or falls into a configured
+    random fraction. While it runs, a sampler thread walks
+    `sys._current_frames()` every few milliseconds and counts stacks.
+    When the request ends, the counts are written in the "folded" format
+    (`frame;frame;frame count`) that flamegraph.pl, speedscope and
+    inferno read directly.
+
+    The sampler sees every thread in the process (a sync endpoint runs on
+    a threadpool worker, not the thread that started the request). Idle
+    threads blocked in waits/selects are skipped, and each stack is
+    prefixed with its thread name so concurrent work can be told apart.
+
+    Stdlib-only (FastAPI is imported lazily for the admin router) so the
+    YOLO service can use it too.
+"""
+
+
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+
+# Leaf frames that mean "this thread is idle", not doing request work
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("base_events.py", "_run_once"),
+    ("_base.py", "wait"),
+}
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _fold(frame, max_depth: int = 128) -> Optional[str]:
+    """Root-first `;`-joined stack for one thread, or None if the thread is idle."""
+    leaf = frame.f_code
+    if (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class _Sampler(threading.Thread):
+    """Counts folded stacks of all other threads at a fixed interval."""
+
+    def __init__(self, interval_s: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval_s = interval_s
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._done.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _fold(frame)
+                if stack is not None:
+                    self.counts[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.counts
+
+
+class Profiler:
+    """Decides which requests to profile and stores the resulting profiles."""
+
+    def __init__(self, directory: str, token: str = "", sample_rate: float = 0.0,
+                 interval_ms: float = 5.0, keep: int = 200, max_concurrent: int = 2):
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval_s = interval_ms / 1000
+        self.keep = keep
+        self.max_concurrent = max_concurrent
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.sample_rate > 0
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return bool(self.token) and token is not None and hmac.compare_digest(token, self.token)
+
+    def should_profile(self, header: Optional[str]) -> bool:
+        if header is not None and self.authorized(header):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> Optional[_Sampler]:
+        """Begin sampling, or None if too many profiles are already running."""
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                return None
+            self._active += 1
+        sampler = _Sampler(self.interval_s)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: _Sampler, method: str, route: str, elapsed_ms: float) -> str:
+        """Stop sampling and write the folded profile; returns its file name."""
+        try:
+            counts = sampler.stop()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S") + f"{int(time.time() * 1000) % 1000:03d}"
+        slug = _UNSAFE_NAME.sub("_", route).strip("_") or "root"
+        name = f"{stamp}_{method}_{slug}_{int(elapsed_ms)}ms.folded"
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {n}\n" for stack, n in counts.most_common())
+        self._prune()
+        return name
+
+    def _prune(self) -> None:
+        profiles = self.list()
+        for entry in profiles[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, entry["name"]))
+            except OSError:
+                pass
+
+    def list(self) -> List[dict]:
+        """Stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".folded"):
+                st = entry.stat()
+                entries.append({"name": entry.name, "bytes": st.st_size, "created": st.st_mtime})
+        entries.sort(key=lambda e: e["created"], reverse=True)
+        return entries
+
+    def path(self, name: str) -> Optional[str]:
+        """Absolute path of a stored profile, refusing anything outside the directory."""
+        if os.path.basename(name) != name or not name.endswith(".folded"):
+            return None
+        full = os.path.join(self.directory, name)
+        return full if os.path.isfile(full) else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests.
+
+    Profiled responses carry `X-Profile-Id` with the profile's file name,
+    which can be fetched from the admin endpoints.
+    """
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        header = None
+        for key, value in scope.get("headers", ()):
+            if key == b"x-profile":
+                header = value.decode("latin-1")
+                break
+        sampler = self.profiler.start() if self.profiler.should_profile(header) else None
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the body is done so the header can name the profile
+                start_message = message
+                return
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                route = getattr(scope.get("route"), "path", scope["path"])
+                name = self.profiler.finish(sampler, scope["method"], route, (time.perf_counter() - start) * 1000)
+                if start_message is not None:
+                    headers = list(start_message.get("headers", []))
+                    start_message["headers"] = headers + [(b"x-profile-id", name.encode())]
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+            if start_message is not None:
+                # Streaming response: the headers can't wait for the last chunk
+                await send(start_message)
+                start_message = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if sampler.is_alive():
+                # Errored before a complete response: still keep the profile
+                route = getattr(scope.get("route"), "path", scope["path"])
+                self.profiler.finish(sampler, scope["method"], route, (time.perf_counter() - start) * 1000)
+
+
+def admin_router(profiler: Profiler, prefix: str = "/admin/profiles"):
+    """FastAPI router to list and download profiles (requires `X-Admin-Token`)."""
+    from fastapi import APIRouter, Header, HTTPException
+    from fastapi.responses import FileResponse
+
+    router = APIRouter(prefix=prefix, tags=["admin"], include_in_schema=False)
+
+    def _check(token: Optional[str]) -> None:
+        if not profiler.authorized(token):
+            # Same answer whether profiling is off or the token is wrong
+            raise HTTPException(status_code=404, detail="Not found")
+
+    @router.get("")
+    def list_profiles(x_admin_token: Optional[str] = Header(default=None)):
+        """Recent profiles, newest first."""
+        _check(x_admin_token)
+        return {"directory": profiler.directory, "profiles": profiler.list()}
+
+    @router.get("/{name}")
+    def download_profile(name: str, x_admin_token: Optional[str] = Header(default=None)):
+        """One profile in folded-stack format (flamegraph.pl / speedscope)."""
+        _check(x_admin_token)
+        path = profiler.path(name)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return FileResponse(path, media_type="text/plain", filename=name)
+
+    return router
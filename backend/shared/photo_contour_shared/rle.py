@@ -0,0 +1,256 @@
+"""
+    COCO run-length encoded (RLE) masks.
+
+    A mask of size (h, w) is flattened column by column (Fortran order)
+    and stored as alternating run lengths of 0s and 1s, starting with 0s:
+    `{"size": [h, w], "counts": "..."}`. `counts` uses the compressed
+    string form pycocotools writes (LEB128-style 5-bit groups, each run
+    delta-coded against the run two before it), so the dicts interoperate
+    with COCO tooling as-is.
+
+    Everything here works on runs, not pixels: encoding goes from mask
+    tensors straight to runs with one vectorized diff, and area, bbox,
+    point, box-area, union/intersection and IoU queries never build a
+    full-size array. `decode` is there for the rare caller that really
+    needs the dense mask.
+
+    Numpy-only, so the YOLO service shares it with the API.
+"""
+
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+Rle = Dict[str, object]
+
+
+# ── counts string codec (pycocotools' rleToString / rleFrString) ─────────────
+
+def compress_counts(counts: Sequence[int]) -> str:
+    out = []
+    for i, c in enumerate(counts):
+        x = int(c)
+        if i > 2:
+            x -= int(counts[i - 2])
+        more = True
+        while more:
+            ch = x & 0x1F
+            x >>= 5
+            more = (x != -1) if (ch & 0x10) else (x != 0)
+            if more:
+                ch |= 0x20
+            out.append(chr(ch + 48))
+    return "".join(out)
+
+
+def decompress_counts(s: str) -> List[int]:
+    counts: List[int] = []
+    p = 0
+    while p < len(s):
+        x, k, more = 0, 0, True
+        while more:
+            ch = ord(s[p]) - 48
+            x |= (ch & 0x1F) << (5 * k)
+            more = bool(ch & 0x20)
+            p += 1
+            k += 1
+            if not more and ch & 0x10:
+                x |= -1 << (5 * k)
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+
+def _counts(rle: Rle) -> np.ndarray:
+    counts = rle["counts"]
+    return np.asarray(decompress_counts(counts) if isinstance(counts, str) else counts, dtype=np.int64)
+
+
+def _runs(rle: Rle) -> Tuple[np.ndarray, np.ndarray]:
+    """Foreground runs as [start, end) flat (column-major) pixel indices."""
+    bounds = np.cumsum(_counts(rle))
+    starts, ends = bounds[0::2], bounds[1::2]
+    n = min(len(starts), len(ends))
+    keep = ends[:n] > starts[:n]
+    return starts[:n][keep], ends[:n][keep]
+
+
+def _from_runs(starts: np.ndarray, ends: np.ndarray, size: Sequence[int]) -> Rle:
+    """RLE dict from sorted, non-overlapping foreground runs (touching runs are joined)."""
+    h, w = int(size[0]), int(size[1])
+    if len(starts):
+        touching = starts[1:] == ends[:-1]
+        if touching.any():
+            starts = np.concatenate([starts[:1], starts[1:][~touching]])
+            ends = np.concatenate([ends[:-1][~touching], ends[-1:]])
+    bounds = np.empty(2 * len(starts) + 2, dtype=np.int64)
+    bounds[0] = 0
+    bounds[1:-1:2], bounds[2:-1:2] = starts, ends
+    bounds[-1] = h * w
+    counts = np.diff(bounds)
+    if len(counts) > 1 and counts[-1] == 0:
+        counts = counts[:-1]
+    return {"size": [h, w], "counts": compress_counts(counts.tolist())}
+
+
+def _column_segments(rle: Rle) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Foreground runs split at column boundaries: (column, row start, row end) arrays."""
+    h = int(rle["size"][0])
+    starts, ends = _runs(rle)
+    c0, c1 = starts // h, (ends - 1) // h
+    pieces = c1 - c0 + 1
+    cols = np.repeat(c0, pieces) + (np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces))
+    first = np.repeat(c0, pieces) == cols
+    last = np.repeat(c1, pieces) == cols
+    r0 = np.where(first, np.repeat(starts % h, pieces), 0)
+    r1 = np.where(last, np.repeat((ends - 1) % h + 1, pieces), h)
+    return cols, r0, r1
+
+
+# ── encoding ─────────────────────────────────────────────────────────────────
+
+def encode_batch(masks: np.ndarray, offset: Tuple[int, int] = (0, 0), size=None) -> List[Rle]:
+    """
+    RLE for each mask of an (n, h, w) boolean stack.
+
+    `offset` (x, y) and `size` (h, w) place the masks inside a larger
+    frame - e.g. a crop's masks in full-image coordinates - without
+    padding them to that size first.
+    """
+    masks = np.asarray(masks, dtype=bool)
+    n, h, w = masks.shape
+    full_h, full_w = size if size is not None else (h, w)
+    x0, y0 = offset
+
+    # Column-major, one zero row padded above and below every column, so each
+    # run inside a column shows up as a +1 (start) and -1 (end) transition
+    padded = np.zeros((n, w, h + 2), dtype=np.int8)
+    padded[:, :, 1:-1] = masks.transpose(0, 2, 1)
+    edges = np.diff(padded, axis=2)
+    sn, sc, sr = np.nonzero(edges == 1)
+    _, _, er = np.nonzero(edges == -1)
+
+    starts = (sc + x0) * full_h + sr + y0
+    ends = (sc + x0) * full_h + er + y0
+    split = np.searchsorted(sn, np.arange(n + 1))
+    return [
+        _from_runs(starts[split[i]:split[i + 1]], ends[split[i]:split[i + 1]], (full_h, full_w))
+        for i in range(n)
+    ]
+
+
+def encode(mask: np.ndarray) -> Rle:
+    """RLE for one (h, w) boolean mask."""
+    return encode_batch(np.asarray(mask)[None])[0]
+
+
+def empty(size: Sequence[int]) -> Rle:
+    """An all-background mask."""
+    return {"size": [int(size[0]), int(size[1])], "counts": compress_counts([int(size[0]) * int(size[1])])}
+
+
+def decode(rle: Rle) -> np.ndarray:
+    """The dense (h, w) boolean mask."""
+    h, w = int(rle["size"][0]), int(rle["size"][1])
+    counts = _counts(rle)
+    values = np.zeros(len(counts), dtype=bool)
+    values[1::2] = True
+    flat = np.repeat(values, counts)
+    flat = np.pad(flat, (0, h * w - len(flat)))
+    return flat.reshape(w, h).T
+
+
+def translate(rle: Rle, offset: Tuple[int, int], size: Sequence[int]) -> Rle:
+    """Place a mask at `offset` (x, y) inside a larger (h, w) frame."""
+    cols, r0, r1 = _column_segments(rle)
+    full_h = int(size[0])
+    x0, y0 = offset
+    return _from_runs((cols + x0) * full_h + r0 + y0, (cols + x0) * full_h + r1 + y0, size)
+
+
+def resize(rle: Rle, size: Sequence[int]) -> Rle:
+    """
+    The mask scaled into a (h, w) frame of another resolution (nearest
+    neighbour). Only the mask's own box is sampled, so upscaling a small
+    mask into a large frame never allocates a full-size array.
+    """
+    h, w = int(rle["size"][0]), int(rle["size"][1])
+    new_h, new_w = int(size[0]), int(size[1])
+    if (h, w) == (new_h, new_w):
+        return rle
+    x1, y1, x2, y2 = bbox(rle)
+    if x2 <= x1:
+        return empty(size)
+
+    sx, sy = w / new_w, h / new_h
+    tx1, ty1 = int(np.floor(x1 / sx)), int(np.floor(y1 / sy))
+    tx2, ty2 = min(int(np.ceil(x2 / sx)), new_w), min(int(np.ceil(y2 / sy)), new_h)
+    # Source pixel under the centre of every target pixel in the box
+    cols = np.minimum(((np.arange(tx1, tx2) + 0.5) * sx).astype(np.int64), w - 1)
+    rows = np.minimum(((np.arange(ty1, ty2) + 0.5) * sy).astype(np.int64), h - 1)
+    crop = decode(rle)[np.ix_(rows, cols)]
+    return encode_batch(crop[None], offset=(tx1, ty1), size=(new_h, new_w))[0]
+
+
+# ── queries ──────────────────────────────────────────────────────────────────
+
+def area(rle: Rle) -> int:
+    """Foreground pixel count."""
+    return int(_counts(rle)[1::2].sum())
+
+
+def bbox(rle: Rle) -> Tuple[int, int, int, int]:
+    """Tight pixel box (x1, y1, x2, y2), exclusive max; all zeros for an empty mask."""
+    cols, r0, r1 = _column_segments(rle)
+    if len(cols) == 0:
+        return (0, 0, 0, 0)
+    return int(cols.min()), int(r0.min()), int(cols.max()) + 1, int(r1.max())
+
+
+def contains(rle: Rle, x: int, y: int) -> bool:
+    """Whether pixel (x, y) is foreground (binary search over the runs)."""
+    h, w = int(rle["size"][0]), int(rle["size"][1])
+    if not (0 <= x < w and 0 <= y < h):
+        return False
+    bounds = np.cumsum(_counts(rle))
+    return bool(np.searchsorted(bounds, x * h + y, side="right") % 2 == 1)
+
+
+def area_in_box(rle: Rle, x1: int, y1: int, x2: int, y2: int) -> int:
+    """Foreground pixels inside the box [x1, x2) x [y1, y2)."""
+    cols, r0, r1 = _column_segments(rle)
+    inside = (cols >= x1) & (cols < x2)
+    overlap = np.minimum(r1[inside], y2) - np.maximum(r0[inside], y1)
+    return int(np.clip(overlap, 0, None).sum())
+
+
+def merge(rles: Sequence[Rle], intersect: bool = False) -> Rle:
+    """Union (or intersection) of same-size masks, computed on run boundaries."""
+    if not rles:
+        raise ValueError("merge() needs at least one mask")
+    size = rles[0]["size"]
+    if any(list(r["size"]) != list(size) for r in rles):
+        raise ValueError("Masks must have the same size")
+
+    runs = [_runs(r) for r in rles]
+    positions = np.concatenate([np.concatenate([s, e]) for s, e in runs])
+    deltas = np.concatenate([np.concatenate([np.ones_like(s), -np.ones_like(e)]) for s, e in runs])
+    # At equal positions, ends come first so touching runs don't overlap
+    order = np.lexsort((deltas, positions))
+    positions, coverage = positions[order], np.cumsum(deltas[order])
+
+    need = len(rles) if intersect else 1
+    inside = coverage >= need
+    was_inside = np.concatenate([[False], inside[:-1]])
+    starts = positions[inside & ~was_inside]
+    ends = positions[~inside & was_inside]
+    keep = ends > starts
+    return _from_runs(starts[keep], ends[keep], size)
+
+
+def iou(a: Rle, b: Rle) -> float:
+    union = area(merge([a, b]))
+    return area(merge([a, b], intersect=True)) / union if union else 0.0
@@ -0,0 +1,419 @@
+"""
+    Lightweight distributed tracing.
+
+    OpenTelemetry-style spans without the SDK dependency: a span has a
+    128-bit trace id, a 64-bit span id, a parent, attributes and a status.
+    The active span lives in a `contextvars.ContextVar`, so nesting follows
+    the request through async code and Starlette's threadpool.
+
+    Traces cross the HTTP hop to the YOLO service with the W3C
+    `traceparent` header (`inject` on the client, `TracingMiddleware` on
+    the server), so one trace covers auth, DB, the network call, inference
+    and rendering.
+
+    Finished spans are batched by a background thread and exported either
+    as JSON lines to a file (offline analysis) or as OTLP/HTTP JSON to a
+    collector (`<endpoint>/v1/traces`). With no exporter configured,
+    `span()` is close to free: no ids are generated and nothing is queued.
+
+    Like `metrics`, this module is stdlib-only so the YOLO service can
+    import it as well. The tracer is process-wide: only the process's own
+    app should call `configure()`.
+"""
+
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("tracing")
+
+# Span kinds (OTLP enum values)
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "error", "_t0")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int = INTERNAL,
+                 attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self._t0 = time.perf_counter_ns()
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns:
+            return
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+        if _tracer.processor is not None:
+            _tracer.processor.submit(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "service": _tracer.service,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# The active span, or a (trace_id, parent_span_id) pair received from upstream
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+# ── Exporters ─────────────────────────────────────────────────────────────────
+
+class JsonlFileExporter:
+    """Append one JSON object per span to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans))
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """POST spans as OTLP/HTTP JSON to a collector (e.g. http://localhost:4318)."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def _encode(self, spans: List[Span]) -> bytes:
+        otlp_spans = []
+        for s in spans:
+            span = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": s.kind,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id:
+                span["parentSpanId"] = s.parent_id
+            otlp_spans.append(span)
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": _tracer.service}}]},
+                "scopeSpans": [{"scope": {"name": "photo-contour"}, "spans": otlp_spans}],
+            }]
+        }).encode()
+
+    def export(self, spans: List[Span]) -> None:
+        req = urllib.request.Request(
+            self.url, data=self._encode(spans), headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+class BatchProcessor:
+    """Queue finished spans and export them in batches from a daemon thread."""
+
+    def __init__(self, exporter, max_batch: int = 256, interval_s: float = 1.0, max_queue: int = 4096):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval_s = interval_s
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self.dropped_total = 0
+        threading.Thread(target=self._run, name="span-exporter", daemon=True).start()
+
+    def submit(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped_total += 1  # never block a request on the exporter
+
+    def _drain(self, first: Span) -> List[Span]:
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.interval_s)
+            except queue.Empty:
+                continue
+            batch = self._drain(first)
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning("span export failed (%d spans dropped): %s", len(batch), e)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export whatever is queued now (tests, shutdown)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                first = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self.exporter.export(self._drain(first))
+
+
+# ── Tracer ────────────────────────────────────────────────────────────────────
+
+class _Tracer:
+    def __init__(self):
+        self.service = "photo-contour"
+        self.sample_rate = 1.0
+        self.processor: Optional[BatchProcessor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+
+_tracer = _Tracer()
+
+
+def configure(service: str, exporter: str = "none", file_path: str = "./traces/spans.jsonl",
+              otlp_endpoint: str = "http://localhost:4318", sample_rate: float = 1.0) -> None:
+    """Set the service name and exporter ("none" | "file" | "otlp")."""
+    _tracer.service = service
+    _tracer.sample_rate = sample_rate
+    if exporter == "file":
+        _tracer.processor = BatchProcessor(JsonlFileExporter(file_path))
+    elif exporter == "otlp":
+        _tracer.processor = BatchProcessor(OtlpHttpExporter(otlp_endpoint))
+    elif exporter == "none":
+        _tracer.processor = None
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter!r}")
+
+
+def flush() -> None:
+    if _tracer.processor is not None:
+        _tracer.processor.flush()
+
+
+def current_span() -> Optional[Span]:
+    active = _current.get()
+    return active if isinstance(active, Span) else None
+
+
+def _parent() -> Tuple[Optional[str], Optional[str]]:
+    """(trace_id, parent span id) of whatever is active, or (None, None) for a new root."""
+    active = _current.get()
+    if isinstance(active, Span):
+        return active.trace_id, active.span_id
+    if active is not None:
+        return active  # remote parent from `traceparent`
+    return None, None
+
+
+def start_span(name: str, kind: int = INTERNAL, **attributes) -> Optional[Span]:
+    """
+    Start a span without activating it (the caller must `end()` it).
+
+    Returns None when tracing is off or the trace isn't sampled.
+    """
+    if not _tracer.enabled:
+        return None
+    trace_id, parent_id = _parent()
+    if trace_id is None:
+        if random.random() >= _tracer.sample_rate:
+            return None
+        trace_id = "%032x" % random.getrandbits(128)
+    elif trace_id == "":
+        return None  # upstream decided not to sample this trace
+    return Span(name, trace_id, parent_id, kind, attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """Start a span, make it the active one for the block and end it afterwards."""
+    s = start_span(name, kind, **attributes)
+    if s is None:
+        yield None
+        return
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+# ── Propagation ───────────────────────────────────────────────────────────────
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add `traceparent` for the active span (no-op when there is none)."""
+    s = current_span()
+    if s is not None:
+        headers["traceparent"] = s.traceparent
+    return headers
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    W3C `traceparent` -> (trace_id, parent span id); unsampled traces give
+    ("", "") so downstream spans are skipped too. None if absent/invalid.
+    """
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return (parts[1], parts[2]) if flags & 1 else ("", "")
+
+
+def wrap(fn: Callable) -> Callable:
+    """Bind `fn` to a copy of the current context (for executor threads)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def instrument_engine(engine, max_statement: int = 200) -> None:
+    """Emit a CLIENT span for every SQL statement on a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        s = start_span("db.query", CLIENT, **{"db.statement": statement[:max_statement]})
+        conn.info.setdefault("tracing_spans", []).append(s)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("tracing_spans")
+        s = stack.pop() if stack else None
+        if s is not None:
+            s.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("tracing_spans") if context.connection else None
+        s = stack.pop() if stack else None
+        if s is not None:
+            s.record_error(context.original_exception)
+            s.end()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a SERVER span per request.
+
+    Continues the caller's trace when a valid `traceparent` header is
+    present; otherwise starts a new (sampled) trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        header = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                header = value.decode("latin-1")
+                break
+
+        remote = parse_traceparent(header)
+        remote_token = _current.set(remote) if remote is not None else None
+        try:
+            s = start_span(f"{scope['method']} {scope['path']}", SERVER, **{
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+            })
+        finally:
+            if remote_token is not None:
+                _current.reset(remote_token)
+
+        if s is None:
+            # Not sampled: still pass an unsampled marker down so nothing below records
+            token = _current.set(("", ""))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _current.reset(token)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                s.set("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    s.error = f"HTTP {message['status']}"
+            await send(message)
+
+        token = _current.set(s)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            s.record_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                s.name = f"{scope['method']} {route.path}"
+                s.set("http.route", route.path)
+            s.end()
@@ -0,0 +1,101 @@
+"""
+    Benchmark: full-resolution ("retina") vs input-resolution ("proto") masks.
+
+    Runs both mask modes on the given images and reports, per detected
+    object, the post-processing latency (mask → normalized contour) and the
+    memory it needed: the size of the mask tensor handed to contour
+    extraction plus the peak Python/numpy allocation while tracing.
+
+    Usage (from backend/yolo_service, inside the YOLO venv):
+        python bench_masks.py ../static/uploads/cat.jpg ../static/uploads/poster.webp
+"""
+
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import yolo_app
+
+
+def _bench_one(image: np.ndarray, mask_mode: str, subpixel: bool, repeats: int) -> dict:
+    req = yolo_app.DetectRequest(image_path="<memory>", mask_mode=mask_mode, subpixel=subpixel)
+    params = yolo_app.choose_params(req, image.shape[1], image.shape[0])
+    retina = mask_mode == "retina"
+    img_h, img_w = image.shape[:2]
+
+    infer_ms, post_ms, peaks = [], [], []
+    mask_bytes, n_objects, n_points = 0, 0, 0
+
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        results = yolo_app._model(
+            source=image, device=yolo_app.DEVICE, imgsz=params.imgsz,
+            conf=params.conf, max_det=params.max_det, verbose=False, retina_masks=retina,
+        )[0]
+        infer_ms.append((time.perf_counter() - t0) * 1000)
+        if results.masks is None:
+            continue
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        if retina:
+            contours = [yolo_app.normalize_contour(xy, img_w, img_h) for xy in results.masks.xy]
+        else:
+            masks = results.masks.data.cpu().numpy()
+            contours = [
+                ring.exterior
+                for m in masks
+                for ring in yolo_app.mask_to_polygons(m, (img_h, img_w), subpixel=subpixel)
+            ]
+        post_ms.append((time.perf_counter() - t0) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        mask_bytes = results.masks.data.element_size() * results.masks.data.nelement()
+        n_objects = len(results)
+        n_points = sum(len(c) for c in contours)
+
+    per_obj = max(n_objects, 1)
+    return {
+        "mask_mode": mask_mode,
+        "subpixel": subpixel,
+        "imgsz": params.imgsz,
+        "objects": n_objects,
+        "points": n_points,
+        "inference_ms": round(float(np.median(infer_ms)), 2) if infer_ms else None,
+        "postprocess_ms_per_object": round(float(np.median(post_ms)) / per_obj, 3) if post_ms else None,
+        "mask_bytes_per_object": mask_bytes // per_obj,
+        "peak_trace_bytes_per_object": int(np.median(peaks)) // per_obj if peaks else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    yolo_app.load_model()
+
+    report = []
+    for path in args.images:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"skipping unreadable image: {path}")
+            continue
+        for mode, subpixel in (("retina", False), ("proto", False), ("proto", True)):
+            row = _bench_one(image, mode, subpixel, args.repeats)
+            row["image"] = path
+            row["size"] = f"{image.shape[1]}x{image.shape[0]}"
+            report.append(row)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+    Stub YOLO service for load-balancing and load tests.
+
+    Speaks the same HTTP API as `yolo_app` (`/live`, `/ready`, `/detect`)
+    but never loads a model: it sleeps for a configurable latency and
+    returns synthetic contours of a configurable size. Run several on
+    different ports to exercise the backend's multi-node client:
+
+        STUB_LATENCY_MS=80 uvicorn stub_app:app --port 8002
+        STUB_LATENCY_MS=400 uvicorn stub_app:app --port 8003   # a slow node
+
+    Environment:
+        STUB_LATENCY_MS    mean /detect latency (default 50)
+        STUB_JITTER_MS     uniform +/- jitter on that latency (default 10)
+        STUB_OBJECTS       objects per image (default 3)
+        STUB_POINTS        contour points per object (default 200)
+        STUB_ERROR_RATE    fraction of /detect calls answered with 500 (default 0)
+        STUB_READY         "0" to make /ready report 503
+"""
+
+
+from fastapi import FastAPI, HTTPException, Response
+import hashlib
+import math
+import os
+import random
+import time
+
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "50"))
+JITTER_MS  = float(os.getenv("STUB_JITTER_MS", "10"))
+OBJECTS    = int(os.getenv("STUB_OBJECTS", "3"))
+POINTS     = int(os.getenv("STUB_POINTS", "200"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+READY      = os.getenv("STUB_READY", "1") != "0"
+
+LABELS = ["person", "bottle", "chair", "cup", "laptop", "handbag"]
+
+app = FastAPI(title="YOLO Segmentation Service - Stub")
+
+
+@app.get("/live")
+def live():
+    return {"alive": True, "phase": "ready" if READY else "starting"}
+
+
+@app.get("/ready")
+def ready(response: Response):
+    if not READY:
+        response.status_code = 503
+    return {"ready": READY, "phase": "ready" if READY else "starting", "stub": True}
+
+
+@app.post("/detect")
+def detect(req: dict):
+    """Sleep like inference would, then return deterministic fake objects."""
+    time.sleep(max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        raise HTTPException(status_code=500, detail="Injected stub failure")
+
+    key = req.get("image_path") or (req.get("shm") or {}).get("name", "")
+    seed = int.from_bytes(hashlib.sha1(key.encode()).digest()[:4], "little")
+    rng = random.Random(seed)
+
+    objects = []
+    for i in range(OBJECTS):
+        cx, cy = rng.uniform(0.25, 0.75), rng.uniform(0.25, 0.75)
+        rx, ry = rng.uniform(0.05, 0.2), rng.uniform(0.05, 0.2)
+        contour = []
+        for k in range(POINTS):
+            t = 2 * math.pi * k / POINTS
+            wobble = 1 + 0.05 * math.sin(7 * t)
+            contour.append([
+                min(max(cx + rx * wobble * math.cos(t), 0.0), 1.0),
+                min(max(cy + ry * wobble * math.sin(t), 0.0), 1.0),
+            ])
+        objects.append({
+            "id": i,
+            "label": LABELS[(seed + i) % len(LABELS)],
+            "score": round(rng.uniform(0.3, 0.99), 4),
+            "bbox": {"x1": cx - rx, "y1": cy - ry, "x2": cx + rx, "y2": cy + ry},
+            "contour": contour,
+        })
+
+    return {"objects": objects, "params": None}
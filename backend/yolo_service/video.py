@@ -0,0 +1,288 @@
+"""
+    Keyframe detection + optical-flow tracking for videos.
+
+    Full segmentation is far too slow to run on every frame on CPU, so a
+    video is processed as a stream:
+
+      - a decoder thread reads frames into a small bounded queue (OpenCV
+        releases the GIL while decoding, so this overlaps with tracking),
+        skipping `frame_stride - 1` frames between processed ones without
+        decoding them;
+      - every `keyframe_interval` processed frames (or sooner, when most
+        tracks have lost their features) the model runs on the full frame
+        and detections are matched to existing tracks by IoU per label;
+      - in between, features seeded inside each object are followed with
+        one pyramidal Lucas-Kanade call per frame on a downscaled grey
+        image. From those points a similarity transform is fitted per
+        track (RANSAC), which moves that track's keyframe contour.
+
+    Non-keyframes therefore carry only a bbox and a 2x3 transform of the
+    last keyframe contour (SVG `matrix(a b c d e f)` order, normalized
+    coordinates), so contours are reused instead of re-detected.
+
+    Model-agnostic: the caller passes `detect(frame) -> [object dicts]`.
+"""
+
+
+import queue
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+MIN_FEATURES = 4
+MAX_FEATURES = 40
+
+
+def open_video(path: str) -> Tuple[cv2.VideoCapture, dict]:
+    """Open a video and read its metadata (raises ValueError if unreadable)."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video")
+    info = {
+        "fps": float(cap.get(cv2.CAP_PROP_FPS)) or 25.0,
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    return cap, info
+
+
+def iter_frames(cap: cv2.VideoCapture, stride: int = 1, max_frames: Optional[int] = None,
+                buffer: int = 4) -> Iterator[Tuple[int, np.ndarray]]:
+    """(frame index, BGR frame) pairs, decoded ahead on a thread into a bounded queue."""
+    frames: "queue.Queue" = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+    done = object()
+
+    def decode():
+        index = produced = 0
+        try:
+            while not stop.is_set() and (max_frames is None or produced < max_frames):
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frames.put((index, frame))
+                produced += 1
+                # grab() demuxes without decoding - skipped frames cost almost nothing
+                for _ in range(stride - 1):
+                    index += 1
+                    if not cap.grab():
+                        return
+                index += 1
+        finally:
+            frames.put(done)
+
+    thread = threading.Thread(target=decode, name="video-decode", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        while thread.is_alive():
+            # Unblock a producer waiting on a full queue
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=0.05)
+        cap.release()
+
+
+def _iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class _Track:
+    """One object followed across frames."""
+
+    def __init__(self, track_id: int, obj: dict):
+        self.id = track_id
+        self.label = obj["label"]
+        self.score = obj["score"]
+        self.frames: List[dict] = []
+        self.lost = False
+        self.reset(obj)
+
+    def reset(self, obj: dict) -> None:
+        """Start a new segment from a keyframe detection."""
+        self.contour = np.asarray(obj["contour"], dtype=np.float64).reshape(-1, 2)   # normalized
+        b = obj["bbox"]
+        self.bbox = (b["x1"], b["y1"], b["x2"], b["y2"])
+        self.score = max(self.score, obj["score"])
+        self.transform = np.eye(3)   # keyframe contour -> current frame, normalized
+        self.points = None
+        self.lost = False
+
+
+class VideoTracker:
+    """Runs the keyframe / flow loop over a stream of frames."""
+
+    def __init__(self, detect: Callable[[np.ndarray], List[dict]], width: int, height: int,
+                 keyframe_interval: int = 10, match_iou: float = 0.3, flow_max_side: int = 640):
+        self.detect = detect
+        self.width, self.height = width, height
+        self.keyframe_interval = keyframe_interval
+        self.match_iou = match_iou
+        self.scale = min(1.0, flow_max_side / max(width, height))
+        self.tracks: List[_Track] = []
+        self.active: List[_Track] = []
+        self.keyframes: List[int] = []
+        self.detect_ms = 0.0
+        self.flow_ms = 0.0
+        self._prev_gray = None
+        self._since_keyframe = 0
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale < 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def process(self, index: int, t: float, frame: np.ndarray) -> None:
+        gray = self._gray(frame)
+        lost = sum(tr.lost for tr in self.active)
+        if (
+            self._prev_gray is None
+            or self._since_keyframe >= self.keyframe_interval
+            or (self.active and lost * 2 > len(self.active))
+        ):
+            self._keyframe(index, t, frame, gray)
+        else:
+            self._flow(index, t, gray)
+        self._prev_gray = gray
+
+    # ── keyframes ──────────────────────────────────────────────────────────
+
+    def _keyframe(self, index: int, t: float, frame: np.ndarray, gray: np.ndarray) -> None:
+        started = time.perf_counter()
+        objects = self.detect(frame)
+        self.detect_ms += (time.perf_counter() - started) * 1000
+        self.keyframes.append(index)
+        self._since_keyframe = 1
+
+        # Greedy IoU matching per label, best pairs first
+        pairs = []
+        for ti, track in enumerate(self.active):
+            for oi, obj in enumerate(objects):
+                if obj["label"] == track.label:
+                    b = obj["bbox"]
+                    iou = _iou(track.bbox, (b["x1"], b["y1"], b["x2"], b["y2"]))
+                    if iou >= self.match_iou:
+                        pairs.append((iou, ti, oi))
+        used_tracks, used_objects, active = set(), set(), []
+        for _, ti, oi in sorted(pairs, reverse=True):
+            if ti in used_tracks or oi in used_objects:
+                continue
+            used_tracks.add(ti)
+            used_objects.add(oi)
+            self.active[ti].reset(objects[oi])
+            active.append(self.active[ti])
+        for oi, obj in enumerate(objects):
+            if oi not in used_objects:
+                track = _Track(len(self.tracks), obj)
+                self.tracks.append(track)
+                active.append(track)
+        # Tracks with no detection here have ended
+        self.active = active
+
+        for track in self.active:
+            track.points = self._seed(gray, track.contour)
+            track.frames.append({
+                "frame": index, "t": round(t, 4), "keyframe": True,
+                "bbox": dict(zip(("x1", "y1", "x2", "y2"), track.bbox)),
+                "contour": track.contour.tolist(),
+            })
+
+    def _seed(self, gray: np.ndarray, contour: np.ndarray) -> Optional[np.ndarray]:
+        """Trackable corners inside the object's outline (flow-image pixels)."""
+        if len(contour) < 3:
+            return None
+        h, w = gray.shape
+        poly = np.round(contour * (w, h)).astype(np.int32)
+        mask = np.zeros_like(gray)
+        cv2.fillPoly(mask, [poly], 255)
+        pts = cv2.goodFeaturesToTrack(gray, MAX_FEATURES, 0.01, 5, mask=mask)
+        if pts is None or len(pts) < MIN_FEATURES:
+            # Textureless object: fall back to points along its outline
+            step = max(1, len(poly) // MAX_FEATURES)
+            pts = poly[::step].astype(np.float32).reshape(-1, 1, 2)
+        return pts.astype(np.float32)
+
+    # ── in-between frames ──────────────────────────────────────────────────
+
+    def _flow(self, index: int, t: float, gray: np.ndarray) -> None:
+        self._since_keyframe += 1
+        tracked = [tr for tr in self.active if not tr.lost and tr.points is not None]
+        if not tracked:
+            return
+
+        started = time.perf_counter()
+        # One LK call for every track's points
+        old = np.concatenate([tr.points for tr in tracked])
+        new, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, old, None, winSize=(21, 21), maxLevel=3)
+        h, w = gray.shape
+        offset = 0
+        for track in tracked:
+            n = len(track.points)
+            ok = status[offset:offset + n, 0] == 1
+            before, after = old[offset:offset + n][ok], new[offset:offset + n][ok]
+            offset += n
+            if len(after) < MIN_FEATURES:
+                track.lost = True
+                continue
+            step, _ = cv2.estimateAffinePartial2D(before, after, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+            if step is None:
+                track.lost = True
+                continue
+            # Flow-image pixels -> normalized coordinates
+            norm = np.array([[1 / w, 0, 0], [0, 1 / h, 0], [0, 0, 1]])
+            step = norm @ np.vstack([step, [0, 0, 1]]) @ np.linalg.inv(norm)
+            track.transform = step @ track.transform
+            track.points = after.reshape(-1, 1, 2)
+
+            moved = track.contour @ track.transform[:2, :2].T + track.transform[:2, 2]
+            (x1, y1), (x2, y2) = np.clip(moved.min(axis=0), 0, 1), np.clip(moved.max(axis=0), 0, 1)
+            track.bbox = (float(x1), float(y1), float(x2), float(y2))
+            a, c, e = track.transform[0]
+            b, d, f = track.transform[1]
+            track.frames.append({
+                "frame": index, "t": round(t, 4), "keyframe": False,
+                "bbox": dict(zip(("x1", "y1", "x2", "y2"), track.bbox)),
+                "transform": [round(float(v), 6) for v in (a, b, c, d, e, f)],
+            })
+        self.flow_ms += (time.perf_counter() - started) * 1000
+
+
+def track_video(path: str, detect: Callable[[np.ndarray], List[dict]], keyframe_interval: int = 10,
+                frame_stride: int = 1, max_frames: Optional[int] = None, match_iou: float = 0.3,
+                flow_max_side: int = 640) -> dict:
+    """Run the whole pipeline over a video file; returns the timeline dict."""
+    cap, info = open_video(path)
+    tracker = VideoTracker(detect, info["width"], info["height"], keyframe_interval, match_iou, flow_max_side)
+    processed = 0
+    for index, frame in iter_frames(cap, frame_stride, max_frames):
+        tracker.process(index, index / info["fps"], frame)
+        processed += 1
+
+    return {
+        **info,
+        "processed_frames": processed,
+        "frame_stride": frame_stride,
+        "keyframes": tracker.keyframes,
+        "tracks": [
+            {"id": tr.id, "label": tr.label, "score": tr.score, "frames": tr.frames}
+            for tr in tracker.tracks if tr.frames
+        ],
+        "timings_ms": {"detect": round(tracker.detect_ms, 1), "flow": round(tracker.flow_ms, 1)},
+    }
@@ -4,23 +4,88 @@
     Exposes FastAPI endpoints that receive an image path, run YOLOv8 
     segmentation, and return BOTH bounding boxes AND pixel-precise 
     object contours for perfect SVG path generation.
+
+    The model is loaded (and warmed up) in a background thread after the
+    server has bound its port, so `/live` answers immediately while
+    `/ready` only reports success once inference can actually be served.
 """
 
 
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
-from ultralytics import YOLO
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from multiprocessing import resource_tracker, shared_memory
 import numpy as np
+import cv2
+import gc
+import logging
 import os
+import threading
+import time
+
+from photo_contour_shared import metrics, profiling, rle, tracing
+import video
+
+
+logger = logging.getLogger("yolo_service")
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+_process_start = time.perf_counter()
+
+
+# ── Startup configuration (environment driven) ────────────────────────────────
+MODEL_PATH     = os.getenv("YOLO_MODEL_PATH", "yolov8s-seg.pt")
+DEVICE         = os.getenv("YOLO_DEVICE", "cpu")
+WARMUP_SIZES   = [int(s) for s in os.getenv("YOLO_WARMUP_SIZES", "320,480,640,960").split(",") if s.strip()]
+WARMUP_PASSES  = int(os.getenv("YOLO_WARMUP_PASSES", "2"))
+DEFAULT_CONF   = 0.15
+MODEL_STRIDE   = 32
+MAX_IMGSZ      = int(os.getenv("YOLO_MAX_IMGSZ", "1920"))  # cap on an explicit `imgsz`
+
+# Quality tiers: the largest inference size and detection cap a caller
+# is willing to pay for. Latency budgets can only push these *down*.
+QUALITY_TIERS = {
+    "fast":     {"imgsz": 320,  "max_det": 20},
+    "balanced": {"imgsz": 640,  "max_det": 100},
+    "high":     {"imgsz": 1280, "max_det": 300},
+}
+DEFAULT_QUALITY = "balanced"
+
+# Upsampling factor for sub-pixel contour refinement in "proto" mask mode
+SUBPIXEL_FACTOR = int(os.getenv("YOLO_SUBPIXEL_FACTOR", "4"))
 
 
 app = FastAPI(title="YOLO Segmentation Service - Contour Detection")
+app.add_middleware(metrics.MetricsMiddleware, service="yolo")
+
+# Continues the API's trace from the `traceparent` header of each /detect call
+# (the tracer itself is configured at startup - see `_configure_tracing`)
+app.add_middleware(tracing.TracingMiddleware)
+
+# Opt-in request profiling (`X-Profile: <token>`), listed under /admin/profiles
+profiler = profiling.Profiler(
+    directory=os.getenv("YOLO_PROFILING_DIR", "./profiles"),
+    token=os.getenv("YOLO_PROFILING_TOKEN", ""),
+    sample_rate=float(os.getenv("YOLO_PROFILING_SAMPLE_RATE", "0")),
+    interval_ms=float(os.getenv("YOLO_PROFILING_INTERVAL_MS", "5")),
+)
+app.add_middleware(profiling.ProfilingMiddleware, profiler=profiler)
+app.include_router(profiling.admin_router(profiler))
+
+# Loaded lazily by `load_model()` so heavy imports (torch/ultralytics)
+# don't delay the process from binding its port.
+_model = None
+_model_lock = threading.Lock()
+# The ultralytics predictor keeps per-call state: one inference at a time.
+# Held per model call only, so decoding, post-processing and a video's
+# optical flow between keyframes overlap with other requests.
+_inference_lock = threading.Lock()
+_ready = threading.Event()
+_state: Dict[str, object] = {"phase": "starting", "error": None, "timings": {}}
 
-# Load model once
-_model = YOLO("yolov8s-seg.pt")  # detection model
-_model.to("cpu")
+# imgsz -> median warm inference latency (ms), measured during warmup
+_latency_table: Dict[int, float] = {}
 
 
 class BBox(BaseModel):
@@ -30,66 +95,644 @@ class BBox(BaseModel):
     y2: float
 
 
+class Polygon(BaseModel):
+    exterior: List[List[float]]                 # outer ring, normalized 0-1
+    holes: List[List[List[float]]] = []         # inner rings, normalized 0-1
+
+
+class RleMask(BaseModel):
+    size: List[int]                             # [height, width] of the full image
+    counts: str                                 # COCO compressed RLE string
+
+
 class DetectedObject(BaseModel):
     id: int
     label: str
     score: float
     bbox: BBox
     contour: List[List[float]]  # [[x1,y1], [x2,y2], ...] - exact object outline
+    polygons: Optional[List[Polygon]] = None  # every part + holes ("proto" mask mode only)
+    mask_rle: Optional[RleMask] = None        # lossless mask (requested with `rle`)
     
     
+class SharedImage(BaseModel):
+    """A decoded RGB image the caller placed in a POSIX shared-memory segment."""
+    name: str
+    shape: List[int]  # [height, width, 3]
+    dtype: str = "uint8"
+    source_size: Optional[List[int]] = None  # [height, width] before the caller downscaled it
+
+
 class DetectRequest(BaseModel):
     image_path: str
+    shm: Optional[SharedImage] = None  # co-located callers: skip the file read + decode
+    quality: Optional[Literal["fast", "balanced", "high"]] = None
+    latency_budget_ms: Optional[float] = None  # target for model inference only
+    # "retina": upsample every mask to full image size (legacy, most precise)
+    # "proto":  trace contours on input-resolution masks, scale only the points
+    mask_mode: Literal["retina", "proto"] = "retina"
+    subpixel: bool = False  # smooth + upsample the mask crop before tracing ("proto" only)
+    # Filters - applied inside NMS (classes/min_score/max_det) or right after
+    # it (min_area), so dropped objects never reach contour extraction.
+    classes: Optional[List[str]] = None   # allow-list of label names
+    min_score: Optional[float] = None     # overrides the default confidence threshold
+    max_det: Optional[int] = None         # caps the tier/latency-derived maximum
+    min_area: Optional[float] = None      # minimum bbox area as a fraction of the image
+    # Region-of-interest re-detection: run only on this crop (normalized
+    # x1, y1, x2, y2); boxes and contours still come back in full-image space.
+    roi: Optional[List[float]] = None
+    imgsz: Optional[int] = None           # explicit inference size; may upsample a small crop
+    rle: bool = False                     # also return each mask as COCO RLE (`mask_rle`)
+
+
+class InferenceParams(BaseModel):
+    """Parameters actually used for a detection call."""
+    quality: str
+    imgsz: int
+    conf: float
+    max_det: int
+    latency_budget_ms: Optional[float] = None
+    classes: Optional[List[str]] = None
+    min_area: Optional[float] = None
+    estimated_ms: Optional[float] = None  # from the warmup latency table
+    inference_ms: float = 0.0             # measured for this request
+    roi: Optional[List[float]] = None
 
 
 class DetectResponse(BaseModel):
     objects: List[DetectedObject]
+    params: Optional[InferenceParams] = None
+
+
+class VideoDetectRequest(BaseModel):
+    video_path: str
+    keyframe_interval: int = Field(10, ge=1)   # full segmentation every N processed frames
+    frame_stride: int = Field(1, ge=1)         # process every Nth frame (others are skipped undecoded)
+    max_frames: Optional[int] = Field(None, ge=1)
+    match_iou: float = 0.3                     # keyframe detection <-> track association
+    flow_max_side: int = 640                   # optical flow runs on frames downscaled to this
+    # Per-keyframe detection options, as for /detect
+    quality: Optional[Literal["fast", "balanced", "high"]] = None
+    mask_mode: Literal["retina", "proto"] = "retina"
+    classes: Optional[List[str]] = None
+    min_score: Optional[float] = None
+    max_det: Optional[int] = None
+    min_area: Optional[float] = None
+
+
+class TrackFrame(BaseModel):
+    frame: int                                   # index in the source video
+    t: float                                     # seconds
+    keyframe: bool
+    bbox: BBox
+    contour: Optional[List[List[float]]] = None  # keyframes: the detected outline
+    transform: Optional[List[float]] = None      # others: [a, b, c, d, e, f] applied to the last keyframe contour
+
+
+class Track(BaseModel):
+    id: int
+    label: str
+    score: float
+    frames: List[TrackFrame]
+
+
+class VideoDetectResponse(BaseModel):
+    fps: float
+    frame_count: int
+    width: int
+    height: int
+    processed_frames: int
+    frame_stride: int
+    keyframes: List[int]
+    tracks: List[Track]
+    timings_ms: Dict[str, float]
+    params: Optional[InferenceParams] = None
+
+
+def _record_phase(phase: str, started: float) -> None:
+    """Store and log how long a startup phase took."""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _state["timings"][phase] = round(elapsed_ms, 1)
+    logger.info("startup phase %-8s %8.1f ms", phase, elapsed_ms)
+
+
+def load_model():
+    """
+    Import ultralytics, load the weights and run warmup passes.
+
+    Safe to call from several threads; only the first call does the work.
+    Returns the loaded model.
+    """
+    global _model
+    with _model_lock:
+        if _model is not None:
+            return _model
+
+        try:
+            _state["phase"] = "importing"
+            t0 = time.perf_counter()
+            from ultralytics import YOLO
+            _record_phase("import", t0)
+
+            _state["phase"] = "loading"
+            t0 = time.perf_counter()
+            model = YOLO(MODEL_PATH)
+            model.to(DEVICE)
+            _record_phase("load", t0)
+
+            _state["phase"] = "warmup"
+            t0 = time.perf_counter()
+            _warmup(model)
+            _record_phase("warmup", t0)
+        except Exception as e:
+            _state["phase"] = "failed"
+            _state["error"] = str(e)
+            logger.exception("model startup failed")
+            raise
+
+        _model = model
+        _state["phase"] = "ready"
+        _record_phase("total", _process_start)
+        _ready.set()
+        return _model
+
+
+def _warmup(model) -> None:
+    """
+    Run inference on dummy images so graph tracing, allocator growth and
+    kernel selection happen before the first real request.
+    """
+    for size in WARMUP_SIZES:
+        dummy = np.zeros((size, size, 3), dtype=np.uint8)
+        samples = []
+        # One extra untimed pass: the first run at a new size is always cold
+        for n in range(WARMUP_PASSES + 1):
+            t0 = time.perf_counter()
+            model(source=dummy, device=DEVICE, imgsz=size, verbose=False)
+            if n > 0:
+                samples.append((time.perf_counter() - t0) * 1000)
+        if samples:
+            _latency_table[size] = round(float(np.median(samples)), 1)
+            logger.info("warmup imgsz=%d median %.1f ms", size, _latency_table[size])
+
+
+def choose_params(req: DetectRequest, img_w: int, img_h: int) -> InferenceParams:
+    """
+    Pick inference size and detection cap for one request.
+
+    Starts from the quality tier, never upsamples beyond the image's own
+    long side, and if a latency budget is given picks the largest measured
+    size whose warm latency fits in it (falling back to the cheapest one).
+    """
+    quality = req.quality or DEFAULT_QUALITY
+    tier = QUALITY_TIERS[quality]
+
+    # Round the image's long side up to the model stride
+    native = -(-max(img_w, img_h) // MODEL_STRIDE) * MODEL_STRIDE
+    imgsz = max(MODEL_STRIDE, min(tier["imgsz"], native))
+    estimated = None
+
+    if req.imgsz is not None:
+        # Explicit size wins over tier and budget - upsampling a small ROI is the point
+        imgsz = max(MODEL_STRIDE, min(-(-req.imgsz // MODEL_STRIDE) * MODEL_STRIDE, MAX_IMGSZ))
+    elif req.latency_budget_ms is not None and _latency_table:
+        sizes = sorted(s for s in _latency_table if s <= imgsz) or [min(_latency_table)]
+        fitting = [s for s in sizes if _latency_table[s] <= req.latency_budget_ms]
+        imgsz = fitting[-1] if fitting else sizes[0]
+
+    if imgsz in _latency_table:
+        estimated = _latency_table[imgsz]
+
+    # Objects that are too small to resolve at a reduced size are not worth
+    # returning, so the detection cap shrinks with the pixel count.
+    ratio = (imgsz / tier["imgsz"]) ** 2
+    max_det = max(5, min(tier["max_det"], int(round(tier["max_det"] * ratio))))
+    if req.max_det is not None:
+        max_det = max(1, min(max_det, req.max_det))
+
+    return InferenceParams(
+        quality=quality,
+        imgsz=imgsz,
+        conf=req.min_score if req.min_score is not None else DEFAULT_CONF,
+        max_det=max_det,
+        latency_budget_ms=req.latency_budget_ms,
+        classes=req.classes,
+        min_area=req.min_area,
+        estimated_ms=estimated,
+        roi=req.roi,
+    )
+
+
+def class_ids(names: List[str]) -> List[int]:
+    """Map label names to model class ids, rejecting unknown labels."""
+    lookup = {label: idx for idx, label in _model.names.items()}
+    unknown = [n for n in names if n not in lookup]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown classes: {', '.join(unknown)}")
+    return [lookup[n] for n in names]
+
+
+@app.on_event("startup")
+def _configure_tracing():
+    """
+    Configure the tracer only when this app is actually served.
+
+    The in-process detection backend imports this module into the API,
+    where the tracer is a process-wide singleton the API has already set
+    up; startup events never fire there, so the API's config is kept.
+    """
+    if os.getenv("YOLO_TRACING_EXPORTER", "none") != "none":
+        tracing.configure(
+            service="yolo-service",
+            exporter=os.getenv("YOLO_TRACING_EXPORTER"),
+            file_path=os.getenv("YOLO_TRACING_FILE", "./traces/yolo.jsonl"),
+            otlp_endpoint=os.getenv("YOLO_TRACING_OTLP_ENDPOINT", "http://localhost:4318"),
+            sample_rate=float(os.getenv("YOLO_TRACING_SAMPLE_RATE", "1.0")),
+        )
+
+
+@app.on_event("startup")
+def _start_model_loading():
+    """Kick off model loading without blocking the server from binding."""
+    _record_phase("bind", _process_start)
+    threading.Thread(target=load_model, name="model-loader", daemon=True).start()
+
+
+@app.get("/live")
+def live():
+    """Liveness probe - the process is up and serving HTTP."""
+    return {"alive": True, "phase": _state["phase"]}
+
+
+@app.get("/ready")
+def ready(response: Response):
+    """
+    Readiness probe - 200 once the model is loaded and warmed up,
+    503 while starting (or if startup failed).
+    """
+    if not _ready.is_set():
+        response.status_code = 503
+    return {
+        "ready": _ready.is_set(),
+        "phase": _state["phase"],
+        "error": _state["error"],
+        "timings_ms": _state["timings"],
+        "latency_table_ms": _latency_table,
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition (request latency, inference and contour stages)."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.post("/detect", response_model=DetectResponse)
 def detect(req: DetectRequest):
     """Run YOLOv8 segmentation and return object contours."""
     
+    if not _ready.is_set():
+        raise HTTPException(status_code=503, detail=f"Model not ready ({_state['phase']})")
+
+    if req.shm is not None:
+        return _detect_shared(req)
+
     if not os.path.exists(req.image_path):
         raise HTTPException(status_code=404, detail="Image not found")
 
-    results = _model(
-        source=req.image_path,
-        device="cpu",
-        imgsz=640,
-        conf=0.15,
-        verbose=False,
-        retina_masks=True  # High-res masks for precise contours
-    )[0]
-    
+    # Decode once here: we need the size to pick parameters anyway
+    with tracing.span("yolo.decode"):
+        image = cv2.imread(req.image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise HTTPException(status_code=422, detail="Could not decode image")
+
+    return run_detection(image, req)
+
+
+@app.post("/detect-video", response_model=VideoDetectResponse)
+def detect_video(req: VideoDetectRequest):
+    """
+    Track objects through a video: segmentation on keyframes only, optical
+    flow in between (see `video.py`). Returns per-object trajectories.
+    """
+    if not _ready.is_set():
+        raise HTTPException(status_code=503, detail=f"Model not ready ({_state['phase']})")
+    if not os.path.exists(req.video_path):
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    detect_req = DetectRequest(
+        image_path=req.video_path,
+        **req.model_dump(include={"quality", "mask_mode", "classes", "min_score", "max_det", "min_area"}),
+    )
+    used = {}
+
+    def detect(frame: np.ndarray) -> List[dict]:
+        with tracing.span("yolo.video.keyframe"):
+            response = run_detection(frame, detect_req)
+        used.setdefault("params", response.params)
+        return [o.model_dump() for o in response.objects]
+
+    try:
+        with metrics.timed("video_tracking"), tracing.span("yolo.video", path=req.video_path):
+            timeline = video.track_video(
+                req.video_path, detect,
+                keyframe_interval=req.keyframe_interval,
+                frame_stride=req.frame_stride,
+                max_frames=req.max_frames,
+                match_iou=req.match_iou,
+                flow_max_side=req.flow_max_side,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return VideoDetectResponse(**timeline, params=used.get("params"))
+
+
+def _detect_shared(req: DetectRequest) -> DetectResponse:
+    """
+    Run detection directly on the caller's shared-memory RGB array.
+
+    The array is wrapped without copying; the BGR order the model expects is
+    a negative-stride view over the same buffer. The caller owns the segment
+    and unlinks it once the response arrives. If the caller downscaled the
+    image, masks are scaled back to its `source_size`.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=req.shm.name)
+    except FileNotFoundError:
+        # Not co-located (or already gone) - the caller falls back to the path
+        raise HTTPException(status_code=409, detail="Shared memory segment not found")
+
+    # Attaching registers the segment with this process' resource tracker,
+    # which would unlink it at exit even though the caller owns it.
+    resource_tracker.unregister(shm._name, "shared_memory")
+
+    try:
+        rgb = np.ndarray(tuple(req.shm.shape), dtype=np.dtype(req.shm.dtype), buffer=shm.buf)
+        response = run_detection(rgb[..., ::-1], req)
+        del rgb
+    finally:
+        _close_shared(shm)
+
+    # Boxes and contours are normalized; only RLE masks are in pixels, and
+    # they must describe the caller's image, not the downscaled copy
+    source = req.shm.source_size
+    if source and list(source) != list(req.shm.shape[:2]):
+        for obj in response.objects:
+            if obj.mask_rle is not None:
+                obj.mask_rle = RleMask(**rle.resize(obj.mask_rle.model_dump(), source))
+    return response
+
+
+def _close_shared(shm: shared_memory.SharedMemory) -> None:
+    """Close our mapping; lingering array views (e.g. in results) block it until collected."""
+    try:
+        shm.close()
+    except BufferError:
+        gc.collect()
+        try:
+            shm.close()
+        except BufferError:
+            logger.warning("shared memory %s still referenced; leaving mapping to GC", shm.name)
+
+
+def run_detection(image: np.ndarray, req: DetectRequest) -> DetectResponse:
+    """Run segmentation on a decoded BGR image and build the response."""
+    if req.roi is not None:
+        return _run_roi(image, req)
+
+    params = choose_params(req, image.shape[1], image.shape[0])
+    retina = req.mask_mode == "retina"
+
+    with _inference_lock:
+        t0 = time.perf_counter()
+        with metrics.timed("inference"), tracing.span("yolo.inference", imgsz=params.imgsz, mask_mode=req.mask_mode):
+            results = _model(
+                source=image,
+                device=DEVICE,
+                imgsz=params.imgsz,
+                conf=params.conf,
+                max_det=params.max_det,
+                classes=class_ids(req.classes) if req.classes else None,
+                verbose=False,
+                retina_masks=retina  # Full-res masks only when explicitly wanted
+            )[0]
+        params.inference_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    with metrics.timed("contour_extraction"), tracing.span("yolo.postprocess"):
+        return _build_response(results, req, params, retina)
+
+
+def _build_response(results, req: DetectRequest, params: InferenceParams, retina: bool) -> DetectResponse:
+    """Turn raw results into normalized boxes and contours (the post-processing stage)."""
     objects = []
     img_h, img_w = results.orig_shape # Original image dimensions
 
-    if results.masks is not None:
-        for i in range(len(results)):
-            # Get bounding box (still useful for UI)
-            box = results.boxes[i]
-            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-            conf = float(box.conf[0].cpu().numpy())
-            cls = int(box.cls[0].cpu().numpy())
-            label = _model.names[cls]
-            
-            # 🔥 GET CONTOUR from segmentation mask (the magic!)
-            mask_xy = results.masks.xy[i]  # [[x1,y1], [x2,y2], ...]
-            
+    if results.masks is None:
+        return DetectResponse(objects=objects, params=params)
+
+    if req.min_area:
+        # Drop small objects before any mask → polygon work is done
+        wh = results.boxes.xywhn[:, 2:]
+        results = results[wh[:, 0] * wh[:, 1] >= req.min_area]
+        if len(results) == 0:
+            return DetectResponse(objects=objects, params=params)
+
+    boxes = results.boxes
+    xyxy = boxes.xyxy.cpu().numpy()
+    confs = boxes.conf.cpu().numpy()
+    classes = boxes.cls.cpu().numpy().astype(int)
+
+    if retina:
+        # 🔥 GET CONTOUR from the full-resolution segmentation masks
+        segments = results.masks.xy
+    else:
+        # Input-resolution masks: contours are traced there and only the
+        # polygon coordinates are mapped back into image space.
+        masks = results.masks.data.cpu().numpy()
+
+    rles = _encode_masks(results, xyxy, retina) if req.rle else None
+
+    for i in range(len(results)):
+        x1, y1, x2, y2 = xyxy[i]
+        polygons = None
+
+        if retina:
             # Normalize contour points to 0-1 (for SVG viewBox)
-            contour_normalized = [
-                [float(pt[0] / img_w), float(pt[1] / img_h)]
-                for pt in mask_xy
+            contour_normalized = normalize_contour(segments[i], img_w, img_h)
+        else:
+            polygons = mask_to_polygons(masks[i], (img_h, img_w), subpixel=req.subpixel)
+            if not polygons:
+                continue
+            # The largest exterior ring stays the primary outline
+            contour_normalized = max(polygons, key=lambda p: len(p.exterior)).exterior
+
+        objects.append(DetectedObject(
+            id=i,
+            label=_model.names[int(classes[i])],
+            score=float(confs[i]),
+            bbox=BBox(x1=float(x1/img_w), y1=float(y1/img_h),
+                     x2=float(x2/img_w), y2=float(y2/img_h)),
+            contour=contour_normalized,  # 🔥 Exact object outline points!
+            polygons=polygons,
+            mask_rle=rles[i] if rles is not None else None,
+        ))
+
+    return DetectResponse(objects=objects, params=params)
+
+
+def _run_roi(image: np.ndarray, req: DetectRequest) -> DetectResponse:
+    """
+    Detect inside `req.roi` only, then map the results back to the full image.
+
+    The crop is a view (no copy). Normalized crop coordinates map to image
+    ones by u -> x0 + u * crop_width (per axis), applied to boxes, contours
+    and polygon rings alike. `min_area` stays a fraction of the full image.
+    """
+    img_h, img_w = image.shape[:2]
+    x1, y1, x2, y2 = req.roi
+    px1, py1 = int(np.floor(max(0.0, x1) * img_w)), int(np.floor(max(0.0, y1) * img_h))
+    px2, py2 = int(np.ceil(min(1.0, x2) * img_w)), int(np.ceil(min(1.0, y2) * img_h))
+    if px2 - px1 < 2 or py2 - py1 < 2:
+        raise HTTPException(status_code=422, detail="ROI is empty")
+
+    crop_w, crop_h = px2 - px1, py2 - py1
+    area_scale = (img_w * img_h) / (crop_w * crop_h)
+    crop_req = req.model_copy(update={
+        "roi": None,
+        "min_area": req.min_area * area_scale if req.min_area else None,
+    })
+    response = run_detection(image[py1:py2, px1:px2], crop_req)
+
+    offset = np.array([px1 / img_w, py1 / img_h])
+    scale = np.array([crop_w / img_w, crop_h / img_h])
+
+    def to_image(points: List[List[float]]) -> List[List[float]]:
+        if not points:
+            return points
+        return (np.asarray(points, dtype=np.float64) * scale + offset).tolist()
+
+    for obj in response.objects:
+        b = obj.bbox
+        (bx1, by1), (bx2, by2) = to_image([[b.x1, b.y1], [b.x2, b.y2]])
+        obj.bbox = BBox(x1=bx1, y1=by1, x2=bx2, y2=by2)
+        obj.contour = to_image(obj.contour)
+        if obj.polygons:
+            obj.polygons = [
+                Polygon(exterior=to_image(p.exterior), holes=[to_image(h) for h in p.holes])
+                for p in obj.polygons
             ]
-            
-            objects.append(DetectedObject(
-                id=i,
-                label=label,
-                score=conf,
-                bbox=BBox(x1=float(x1/img_w), y1=float(y1/img_h), 
-                         x2=float(x2/img_w), y2=float(y2/img_h)),
-                contour=contour_normalized  # 🔥 Exact object outline points!
-            ))
-
-    return DetectResponse(objects=objects)
\ No newline at end of file
+        if obj.mask_rle is not None:
+            placed = rle.translate(obj.mask_rle.model_dump(), (px1, py1), (img_h, img_w))
+            obj.mask_rle = RleMask(**placed)
+    if response.params is not None:
+        response.params.roi = [px1 / img_w, py1 / img_h, px2 / img_w, py2 / img_h]
+        response.params.min_area = req.min_area
+    return response
+
+
+def _encode_masks(results, xyxy: np.ndarray, retina: bool) -> List[dict]:
+    """
+    COCO RLE of every mask, always in full-image pixels.
+
+    Retina masks already are full size and are encoded as one batch.
+    Input-resolution masks are un-letterboxed and resized per object, but
+    only over the object's box. The encoder then places each box-sized
+    mask in the image frame, so no full-size array is ever allocated.
+    """
+    img_h, img_w = results.orig_shape
+    if retina:
+        return rle.encode_batch((results.masks.data > 0.5).cpu().numpy())
+
+    masks = results.masks.data.cpu().numpy()
+    gain, pad_x, pad_y = _letterbox(masks.shape[1:], (img_h, img_w))
+    out = []
+    for mask, (x1, y1, x2, y2) in zip(masks, xyxy):
+        ix0, iy0 = max(int(np.floor(x1)), 0), max(int(np.floor(y1)), 0)
+        ix1, iy1 = min(int(np.ceil(x2)), img_w), min(int(np.ceil(y2)), img_h)
+        if ix1 <= ix0 or iy1 <= iy0:
+            out.append(rle.empty((img_h, img_w)))
+            continue
+        # Box in mask pixels (same letterbox maths as the contour path)
+        mx0, my0 = int(np.floor(ix0 * gain + pad_x)), int(np.floor(iy0 * gain + pad_y))
+        mx1, my1 = int(np.ceil(ix1 * gain + pad_x)), int(np.ceil(iy1 * gain + pad_y))
+        crop = cv2.resize(mask[my0:my1, mx0:mx1], (ix1 - ix0, iy1 - iy0), interpolation=cv2.INTER_LINEAR)
+        out.append(rle.encode_batch((crop > 0.5)[None], offset=(ix0, iy0), size=(img_h, img_w))[0])
+    return out
+
+
+def _letterbox(mask_shape, orig_shape):
+    """Gain and (x, y) padding that map image pixels into a letterboxed mask."""
+    img_h, img_w = orig_shape
+    mask_h, mask_w = mask_shape[:2]
+    # Same gain/padding maths as ultralytics' scale_coords
+    gain = min(mask_h / img_h, mask_w / img_w)
+    pad_x = round((mask_w - img_w * gain) / 2 - 0.1)
+    pad_y = round((mask_h - img_h * gain) / 2 - 0.1)
+    return gain, pad_x, pad_y
+
+
+def normalize_contour(points: np.ndarray, img_w: int, img_h: int) -> List[List[float]]:
+    """Scale pixel contour points (N, 2) into 0-1 image coordinates."""
+    if len(points) == 0:
+        return []
+    scale = np.array([1.0 / img_w, 1.0 / img_h], dtype=np.float64)
+    return (np.asarray(points, dtype=np.float64).reshape(-1, 2) * scale).tolist()
+
+
+def mask_to_polygons(mask: np.ndarray, orig_shape, subpixel: bool = False) -> List["Polygon"]:
+    """
+    Trace a letterboxed, input-resolution mask into normalized polygons.
+
+    Uses `cv2.RETR_CCOMP` so every connected part becomes its own polygon
+    and holes are kept as inner rings. With `subpixel`, the object's crop is
+    smoothed and upsampled before tracing so the ring follows the soft mask
+    edge instead of the pixel staircase.
+    """
+    img_h, img_w = orig_shape
+    mask_h, mask_w = mask.shape[:2]
+
+    # Undo the letterbox
+    gain, pad_x, pad_y = _letterbox(mask.shape, orig_shape)
+
+    binary = (mask > 0.5).astype(np.uint8)
+    offset = np.zeros(2, dtype=np.float32)
+    factor = 1
+
+    if subpixel:
+        ys, xs = np.nonzero(binary)
+        if len(xs) == 0:
+            return []
+        x0, y0 = max(int(xs.min()) - 2, 0), max(int(ys.min()) - 2, 0)
+        x1, y1 = min(int(xs.max()) + 3, mask_w), min(int(ys.max()) + 3, mask_h)
+        crop = cv2.GaussianBlur(binary[y0:y1, x0:x1].astype(np.float32), (3, 3), 0)
+        factor = SUBPIXEL_FACTOR
+        crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_LINEAR)
+        binary = (crop > 0.5).astype(np.uint8)
+        offset[:] = (x0, y0)
+
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return []
+
+    scale = np.array([1.0 / (gain * img_w), 1.0 / (gain * img_h)], dtype=np.float32)
+    shift = offset - np.array([pad_x, pad_y], dtype=np.float32)
+
+    def to_image(contour: np.ndarray) -> List[List[float]]:
+        # Upsampled pixel centres sit at (p + 0.5) / factor - 0.5 in mask pixels
+        # (identity when factor is 1), matching how cv2.resize samples
+        pts = (contour.reshape(-1, 2).astype(np.float32) + 0.5) / factor - 0.5 + shift
+        return np.clip(pts * scale, 0.0, 1.0).tolist()
+
+    polygons = []
+    for idx, (_, _, first_child, parent) in enumerate(hierarchy[0]):
+        if parent != -1 or len(contours[idx]) < 3:
+            continue
+        holes = []
+        child = first_child
+        while child != -1:
+            if len(contours[child]) >= 3:
+                holes.append(to_image(contours[child]))
+            child = hierarchy[0][child][0]
+        polygons.append(Polygon(exterior=to_image(contours[idx]), holes=holes))
+
+    return polygons